@@ -1,14 +1,120 @@
-import os
-import webbrowser
+import asyncio
+import html
+import re
+import sys
+import threading
 from pathlib import Path
 from config import Config
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Bearer token允许的字符（RFC 6750 token68），拒绝粘贴时带进来的空白和引号
+_TOKEN_PATTERN = re.compile(r"[A-Za-z0-9._~+/=-]+")
+
+_CALLBACK_PAGE = """<!DOCTYPE html>
+<html lang="zh">
+<head><meta charset="utf-8"><title>Pulsoid 认证</title></head>
+<body>
+<h3>Pulsoid to VRChat OSC Bridge</h3>
+<p id="status">粘贴Pulsoid页面上显示的token：</p>
+<form id="form" method="post" action="/token">
+<input type="hidden" name="state" value="{state}">
+<input name="token" size="40" placeholder="xxxxxxxx-xxxx-xxxx-xxxx-xxxxxxxxxxxx">
+<button type="submit">提交</button>
+</form>
+<script>
+// 重定向到本地时token在URL片段中，不会发给服务器，由页面转交
+const params = new URLSearchParams(location.hash.slice(1));
+const token = params.get("access_token");
+if (token) {{
+  const body = new URLSearchParams({{token: token, state: params.get("state") || ""}});
+  history.replaceState(null, "", "/");
+  fetch("/token", {{method: "POST", body: body}})
+    .then(response => response.text())
+    .then(text => {{ document.getElementById("status").textContent = text; }});
+}}
+</script>
+</body>
+</html>
+"""
+
+
+def is_valid_token_format(token):
+    return bool(token) and len(token) <= 512 and _TOKEN_PATTERN.fullmatch(token) is not None
+
+
+class AuthCallbackServer:
+    """本地HTTP监听：接收浏览器提交的token（Pulsoid重定向的URL片段或手动粘贴）"""
+
+    def __init__(self, state: str, on_token, host: str = None, port: int = None):
+        self.state = state
+        self.on_token = on_token
+        self.host = host or Config.AUTH_CALLBACK_HOST
+        self.port = Config.AUTH_CALLBACK_PORT if port is None else port
+        self.runner = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}/"
+
+    async def start(self):
+        """启动监听，端口被占用时返回False"""
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_get("/", self._handle_page)
+        app.router.add_get("/callback", self._handle_page)
+        app.router.add_post("/token", self._handle_token)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        try:
+            site = web.TCPSite(self.runner, self.host, self.port)
+            await site.start()
+        except OSError as e:
+            logger.warning(f"本地认证监听启动失败: {e}")
+            await self.runner.cleanup()
+            self.runner = None
+            return False
+        # 端口为0时取实际绑定的端口
+        self.port = self.runner.addresses[0][1]
+        return True
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
+
+    async def _handle_page(self, request):
+        from aiohttp import web
+
+        return web.Response(
+            text=_CALLBACK_PAGE.format(state=html.escape(self.state)),
+            content_type="text/html",
+            charset="utf-8"
+        )
+
+    async def _handle_token(self, request):
+        from aiohttp import web
+
+        data = await request.post()
+        # state随页面下发，其他网页无法读取，用于拒绝跨站提交
+        if data.get("state") != self.state:
+            return web.Response(status=403, text="state不匹配，请从认证流程打开的页面提交")
+        token = (data.get("token") or "").strip()
+        if not is_valid_token_format(token):
+            return web.Response(status=400, text="token格式不正确，请重新粘贴")
+        self.on_token(token)
+        return web.Response(text="Token已收到，可以关闭此页面")
+
+
 class PulsoidAuth:
     def __init__(self):
         self.token_path = self._get_token_path()
+        # 认证进行中时等待token的future，终端输入和本地页面都提交到这里
+        self._pending = None
+        self._loop = None
+        self._stdin_reader = None
     
     def _get_token_path(self):
         """确定token文件路径 - 始终在当前程序目录下"""
@@ -44,15 +150,78 @@ class PulsoidAuth:
             logger.error(f"保存token失败: {e}")
             return False
     
-    def start_auth(self):
-        """开始认证流程"""
+    async def validate_token(self, token):
+        """向Pulsoid校验token：有效返回True，被拒绝返回False，网络错误时返回None（不阻止启动）"""
+        import aiohttp
+        
+        timeout = aiohttp.ClientTimeout(total=Config.AUTH_VALIDATE_TIMEOUT)
+        try:
+            async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with session.get(
+                    Config.PULSOID_VALIDATE_URL,
+                    headers={"Authorization": f"Bearer {token}"}
+                ) as response:
+                    if response.status in (401, 403):
+                        return False
+                    if response.status != 200:
+                        logger.warning(f"校验token时服务器返回 {response.status}")
+                        return None
+                    data = await response.json(content_type=None)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            logger.warning(f"校验token失败: {e}")
+            return None
+        
+        if Config.PULSOID_SCOPE not in data.get("scopes", [Config.PULSOID_SCOPE]):
+            logger.error(f"token缺少 {Config.PULSOID_SCOPE} 权限")
+            return False
+        return True
+    
+    def _submit(self, token):
+        """在事件循环线程中调用：接受第一个格式正确的token"""
+        if self._pending is None or self._pending.done():
+            return
+        if is_valid_token_format(token):
+            self._pending.set_result(token)
+        elif token:
+            print("Token格式不正确，请重新输入")
+        else:
+            print("Token不能为空，请重新输入")
+    
+    def _read_stdin(self):
+        """后台线程：逐行读取终端输入，转交给事件循环"""
+        for line in sys.stdin:
+            self._loop.call_soon_threadsafe(self._submit, line.strip())
+    
+    def _start_stdin_reader(self):
+        # 线程在整个进程内只启动一次；守护线程不会阻止退出
+        if self._stdin_reader is None and sys.stdin is not None and not sys.stdin.closed:
+            self._stdin_reader = threading.Thread(target=self._read_stdin, name="auth-stdin", daemon=True)
+            self._stdin_reader.start()
+    
+    async def start_auth(self):
+        """开始认证流程：打开浏览器，等待终端输入或本地页面提交token，不阻塞事件循环"""
+        # 只有交互式认证才需要浏览器模块
+        import webbrowser
+        
+        self._loop = asyncio.get_running_loop()
+        self._pending = self._loop.create_future()
+        state = Config.get_uuid(True)
+        server = AuthCallbackServer(state, self._submit)
+        listening = await server.start()
+        
         print("\n=== Pulsoid 认证 ===")
         print("正在打开认证页面...")
         
-        auth_url = Config.get_auth_url()
+        redirect_uri = None
+        if listening and Config.AUTH_LOCAL_REDIRECT:
+            # Pulsoid把token放在重定向地址的URL片段中，由本地页面自动提交
+            redirect_uri = f"{server.url}callback"
+        auth_url = Config.get_auth_url(state=state, redirect_uri=redirect_uri)
         try:
-            webbrowser.open(auth_url)
+            opened = await self._loop.run_in_executor(None, webbrowser.open, auth_url)
             print(f"认证URL: {auth_url}")
+            if not opened:
+                print("请手动打开上面的URL进行认证")
         except Exception as e:
             logger.error(f"无法打开浏览器: {e}")
             print(f"请手动打开以下URL进行认证:")
@@ -60,22 +229,30 @@ class PulsoidAuth:
         
         print("\n请在浏览器中完成认证，然后复制获得的token")
         print("Token格式类似: xxxxxxxx-xxxx-xxxx-xxxx-xxxxxxxxxxxx")
+        if listening:
+            print(f"可以粘贴到这里，也可以提交到本地页面: {server.url}")
+        print("\n请输入Auth Token: ", end="", flush=True)
+        self._start_stdin_reader()
         
-        while True:
-            token = input("\n请输入Auth Token: ").strip()
-            if token:
-                if self.save_token(token):
-                    print("Token保存成功!")
+        try:
+            while True:
+                token = await self._pending
+                if await self._loop.run_in_executor(None, self.save_token, token):
+                    print("\nToken保存成功!")
                     return token
-                else:
-                    print("Token保存失败，请重试")
-            else:
-                print("Token不能为空，请重新输入")
+                print("\nToken保存失败，请重试")
+                self._pending = self._loop.create_future()
+        finally:
+            self._pending = None
+            await server.stop()
     
-    def get_valid_token(self):
-        """获取有效的token，如果没有则启动认证流程"""
-        token = self.read_token()
+    async def get_valid_token(self):
+        """获取token：在线程中读取保存的token，没有时启动认证流程"""
+        token = await asyncio.get_running_loop().run_in_executor(None, self.read_token)
+        if token and not is_valid_token_format(token):
+            logger.warning("保存的token格式不正确，重新认证")
+            token = None
         if not token:
             print("无token，开始认证流程...")
-            token = self.start_auth()
-        return token
\ No newline at end of file
+            token = await self.start_auth()
+        return token
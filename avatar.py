@@ -0,0 +1,228 @@
+"""
+按当前模型过滤OSC参数
+
+VRChat在OSC输出端口（默认9001）上发送 /avatar/change（参数为模型ID），
+并为每个模型写出OSC配置文件：
+  <VRChat OSC目录>/<usr_...>/Avatars/<avtr_...>.json
+其中 parameters[].input.address 是该模型可以接收的参数地址。
+AvatarTracker 监听模型切换，读取并缓存该模型的参数列表，让 VRChatOSCClient 只发送模型拥有的参数。
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+from collections import OrderedDict
+from pathlib import Path
+
+from config import Config
+from osc_bundle import osc_string, parse_message
+
+logger = logging.getLogger(__name__)
+
+AVATAR_CHANGE_ADDRESS = "/avatar/change"
+# VRChat在输出端口上还会发送模型的全部参数值，先按前缀过滤，只解析模型切换消息
+_AVATAR_CHANGE_PREFIX = osc_string(AVATAR_CHANGE_ADDRESS)
+# 模型ID会拼接到文件路径中，只接受字母、数字、下划线和连字符
+_AVATAR_ID = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+def default_osc_directory():
+    """VRChat写出OSC配置文件的目录（Windows下位于LocalLow）"""
+    home = Path(os.environ.get("USERPROFILE") or Path.home())
+    return home / "AppData" / "LocalLow" / "VRChat" / "VRChat" / "OSC"
+
+
+def parse_avatar_config(data):
+    """从模型OSC配置中取出可以接收的参数地址"""
+    addresses = set()
+    for parameter in data.get("parameters") or []:
+        address = (parameter.get("input") or {}).get("address")
+        if address:
+            addresses.add(address)
+    return frozenset(addresses)
+
+
+class AvatarConfigCache:
+    """按模型ID缓存参数地址集合（LRU）
+
+    每个模型的配置文件只解析一次；文件被VRChat重写（修改时间变化）时重新解析。
+    """
+
+    def __init__(self, directory=None, capacity: int = None):
+        self.directory = Path(directory) if directory else default_osc_directory()
+        self.capacity = capacity or Config.AVATAR_CACHE_SIZE
+        # 模型ID -> (文件修改时间, 参数地址集合)
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def find(self, avatar_id: str):
+        """查找模型的配置文件，多个VRChat账号都有时取最新的一个"""
+        if not _AVATAR_ID.match(avatar_id):
+            return None
+        latest = None
+        try:
+            users = list(self.directory.iterdir())
+        except OSError:
+            return None
+        for user in users:
+            path = user / "Avatars" / f"{avatar_id}.json"
+            try:
+                mtime = path.stat().st_mtime_ns
+            except OSError:
+                continue
+            if latest is None or mtime > latest[0]:
+                latest = (mtime, path)
+        return latest
+
+    def get(self, avatar_id: str):
+        """获取模型的参数地址集合，找不到配置文件时返回None"""
+        found = self.find(avatar_id)
+        if found is None:
+            self._entries.pop(avatar_id, None)
+            return None
+        mtime, path = found
+
+        entry = self._entries.get(avatar_id)
+        if entry is not None and entry[0] == mtime:
+            self._entries.move_to_end(avatar_id)
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        try:
+            # VRChat写出的文件带BOM
+            with open(path, 'r', encoding='utf-8-sig') as f:
+                addresses = parse_avatar_config(json.load(f))
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning(f"无法读取模型OSC配置 {path}: {e}")
+            return None
+
+        self._entries[avatar_id] = (mtime, addresses)
+        self._entries.move_to_end(avatar_id)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+        return addresses
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class AvatarListener(asyncio.DatagramProtocol):
+    """接收VRChat的OSC输出，只处理 /avatar/change"""
+
+    def __init__(self, on_avatar_change):
+        self.on_avatar_change = on_avatar_change
+        self.transport = None
+        self.datagrams = 0
+        self.changes = 0
+
+    @classmethod
+    async def create(cls, on_avatar_change, host: str = None, port: int = None):
+        loop = asyncio.get_running_loop()
+        _, listener = await loop.create_datagram_endpoint(
+            lambda: cls(on_avatar_change),
+            local_addr=(
+                host or Config.AVATAR_LISTEN_IP,
+                Config.AVATAR_LISTEN_PORT if port is None else port
+            )
+        )
+        return listener
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.datagrams += 1
+        if not data.startswith(_AVATAR_CHANGE_PREFIX):
+            return
+        try:
+            _, args = parse_message(data)
+        except ValueError as e:
+            logger.debug(f"忽略无效的OSC消息: {e}")
+            return
+        if args and isinstance(args[0], str):
+            self.changes += 1
+            self.on_avatar_change(args[0])
+
+    def close(self):
+        if self.transport:
+            self.transport.close()
+            self.transport = None
+
+
+class AvatarTracker:
+    """跟踪当前模型，并把模型拥有的参数告诉 VRChatOSCClient
+
+    配置文件在后台线程中读取；找不到配置时（例如VRChat还没写出文件）发送全部参数，
+    并在 AVATAR_CONFIG_RETRY 秒后再查找一次。
+    """
+
+    def __init__(self, osc_client, cache: AvatarConfigCache = None, host: str = None, port: int = None):
+        self.osc_client = osc_client
+        self.cache = cache if cache is not None else AvatarConfigCache(Config.VRCHAT_OSC_DIR)
+        self.host = host
+        self.port = port
+        self.listener = None
+        self.avatar_id = None
+        self._lock = asyncio.Lock()
+        self._tasks = set()
+        self._retry_handle = None
+
+    async def start(self):
+        try:
+            self.listener = await AvatarListener.create(self.on_avatar_change, self.host, self.port)
+        except OSError as e:
+            # 端口可能已被其他OSC工具占用，此时照常发送全部参数
+            logger.warning(f"无法监听VRChat OSC输出，不按模型过滤参数: {e}")
+            return False
+        sockname = self.listener.transport.get_extra_info("sockname")
+        logger.info(f"正在监听VRChat模型切换 {sockname[0]}:{sockname[1]}")
+        return True
+
+    def on_avatar_change(self, avatar_id: str):
+        if self._retry_handle:
+            self._retry_handle.cancel()
+            self._retry_handle = None
+        self.avatar_id = avatar_id
+        task = asyncio.get_running_loop().create_task(self._apply(avatar_id, retry=True))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _apply(self, avatar_id: str, retry: bool):
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            if avatar_id != self.avatar_id:
+                # 等待期间又切换了模型
+                return
+            addresses = await loop.run_in_executor(None, self.cache.get, avatar_id)
+            if avatar_id != self.avatar_id:
+                return
+
+        self.osc_client.set_avatar_parameters(addresses)
+        if addresses is None:
+            logger.info(f"模型 {avatar_id} 没有OSC配置，发送全部参数")
+            if retry and Config.AVATAR_CONFIG_RETRY:
+                self._retry_handle = loop.call_later(Config.AVATAR_CONFIG_RETRY, self._retry, avatar_id)
+        else:
+            logger.info(f"切换到模型 {avatar_id}，发送 {self.osc_client.active_parameter_count} 个参数")
+
+    def _retry(self, avatar_id: str):
+        self._retry_handle = None
+        task = asyncio.get_running_loop().create_task(self._apply(avatar_id, retry=False))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def stop(self):
+        if self._retry_handle:
+            self._retry_handle.cancel()
+            self._retry_handle = None
+        if self.listener:
+            self.listener.close()
+            self.listener = None
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
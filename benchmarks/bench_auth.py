@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+认证流程基准测试（本地替身，不连接Pulsoid）
+1. warm_start：token文件已存在，校验接口有 --validate-delay 秒的网络延迟，
+   测量从 initialize() 开始到收到第一个心率OSC数据报的时间：
+     serial       先等待校验完成再初始化（原先的串行顺序）
+     concurrent   校验与OSC初始化、WebSocket连接同时进行（当前实现）
+2. interactive：没有token时启动认证流程，--submit-after 秒后通过本地页面提交token，
+   测量等待期间事件循环的最大延迟（原先 input() 会阻塞整个事件循环）
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import re
+import socket
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from aiohttp import ClientSession, web
+
+from config import Config
+from main import PulsoidVRChatBridge
+from standin import PulsoidStandInServer, percentile
+from bench_startup import FirstPacketSink
+
+
+async def start_validate_server(delay):
+    """模拟 /api/v1/token/validate，每个请求延迟 delay 秒"""
+    async def handle(request):
+        await asyncio.sleep(delay)
+        return web.json_response({"scopes": [Config.PULSOID_SCOPE], "expires_in": 3600})
+
+    app = web.Application()
+    app.router.add_get("/api/v1/token/validate", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner, f"http://127.0.0.1:{runner.addresses[0][1]}/api/v1/token/validate"
+
+
+async def first_heart_rate(server, sink, port, serial):
+    sink.reset()
+    bridge = PulsoidVRChatBridge(
+        osc_ip="127.0.0.1", osc_port=port, websocket_url=server.url,
+        serve_metrics=False, track_avatar=False
+    )
+    started = time.perf_counter()
+    if serial:
+        # 原先的顺序：认证全部完成后才开始初始化
+        token = await bridge.auth.get_valid_token()
+        await bridge.auth.validate_token(token)
+        bridge.token = token
+    run_task = asyncio.create_task(bridge.run())
+    await asyncio.wait_for(sink.done.wait(), 10)
+    elapsed = sink.first_heart_rate - started
+    await bridge.shutdown()
+    await run_task
+    return elapsed
+
+
+async def warm_start(args):
+    server = await PulsoidStandInServer(rate=args.rate).start()
+    validator, Config.PULSOID_VALIDATE_URL = await start_validate_server(args.validate_delay)
+    loop = asyncio.get_running_loop()
+    transport, sink = await loop.create_datagram_endpoint(FirstPacketSink, local_addr=("127.0.0.1", 0))
+    port = transport.get_extra_info("sockname")[1]
+
+    results = {}
+    try:
+        for mode in ("serial", "concurrent"):
+            values = sorted([
+                await first_heart_rate(server, sink, port, mode == "serial") for _ in range(args.runs)
+            ])
+            results[mode] = {"p50_ms": percentile(values, 0.5) * 1000, "max_ms": values[-1] * 1000}
+    finally:
+        transport.close()
+        await validator.cleanup()
+        await server.stop()
+    return results
+
+
+async def interactive(args):
+    from auth import PulsoidAuth
+
+    auth = PulsoidAuth()
+    lag = 0.0
+    done = asyncio.Event()
+
+    async def probe():
+        nonlocal lag
+        while not done.is_set():
+            expected = time.perf_counter() + 0.01
+            await asyncio.sleep(0.01)
+            lag = max(lag, time.perf_counter() - expected)
+
+    probe_task = asyncio.create_task(probe())
+    started = time.perf_counter()
+    token_task = asyncio.create_task(auth.get_valid_token())
+    await asyncio.sleep(args.submit_after)
+    # 像浏览器一样打开本地页面，取出state后提交token
+    url = f"http://{Config.AUTH_CALLBACK_HOST}:{Config.AUTH_CALLBACK_PORT}/"
+    async with ClientSession() as session:
+        async with session.get(url) as response:
+            state = re.search(r'name="state" value="([^"]*)"', await response.text())[1]
+        async with session.post(url + "token", data={"token": "benchmark-token", "state": state}) as response:
+            status = response.status
+    token = await token_task
+    elapsed = time.perf_counter() - started
+    done.set()
+    await probe_task
+    return {
+        "submit_status": status,
+        "token_received": token == "benchmark-token",
+        "wait_s": elapsed,
+        "max_loop_lag_ms": lag * 1000,
+    }
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="认证流程基准测试")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--rate", type=float, default=20.0, help="替身服务器每秒的心率帧数")
+    parser.add_argument("--validate-delay", type=float, default=0.2, help="校验接口的响应延迟（秒）")
+    parser.add_argument("--submit-after", type=float, default=1.0, help="交互认证中多久后提交token（秒）")
+    parser.add_argument("--output", help="把JSON结果写入文件")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    Config.METRICS_PORT = None
+    Config.METRICS_LOG_INTERVAL = 0
+    with tempfile.TemporaryDirectory() as directory:
+        token_file = Path(directory) / "token.txt"
+        token_file.write_text("benchmark-token", encoding="utf-8")
+        Config.TOKEN_FILE = str(token_file)
+        warm = asyncio.run(warm_start(args))
+        token_file.unlink()
+        # 不打开浏览器
+        import webbrowser
+        webbrowser.open = lambda url: False
+        Config.AUTH_CALLBACK_PORT = free_port()
+        # 认证提示输出到stderr，stdout只保留JSON结果
+        with contextlib.redirect_stdout(sys.stderr):
+            prompt = asyncio.run(interactive(args))
+
+    result = {"validate_delay_s": args.validate_delay, "warm_start": warm, "interactive": prompt}
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
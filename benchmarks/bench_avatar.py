@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+按模型过滤参数的基准测试
+1. 模型OSC配置缓存：首次解析（含读文件）与缓存命中的每次查找耗时，配置含 --avatar-parameters 个参数。
+2. 用本地VRChat替身在几个参数不同的模型之间切换，VRChatOSCClient + AvatarTracker 发送心率，
+   接收端解析每个数据报，检查收到的地址都属于当前模型，并与不过滤时比较每个样本的消息数和字节数。
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import struct
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from avatar import AvatarConfigCache, AvatarTracker
+from config import Config
+from osc_bundle import BUNDLE_HEADER, parse_message
+from osc_client import VRChatOSCClient
+from standin import VRChatOutputStandIn
+
+_INT32 = struct.Struct(">i")
+
+ALL_PARAMETERS = [
+    "Heartrate", "HeartRateFloat", "Heartrate2", "HeartRateFloat01",
+    "Heartrate3", "HeartRateInt", "HeartBeatToggle", "PulsoidConnected",
+]
+
+# 切换顺序中的模型：全部参数、只有整数心率、完全没有心率参数
+AVATARS = {
+    "avtr_bench-full": ALL_PARAMETERS,
+    "avtr_bench-int": ["HeartRateInt", "HeartBeatToggle"],
+    "avtr_bench-none": [],
+}
+
+
+class AddressSink(asyncio.DatagramProtocol):
+    """解析收到的消息和bundle，按地址计数"""
+
+    def __init__(self):
+        self.transport = None
+        self.addresses = []
+        self.messages = 0
+        self.bytes = 0
+
+    @property
+    def port(self):
+        return self.transport.get_extra_info("sockname")[1]
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.bytes += len(data)
+        if data.startswith(BUNDLE_HEADER[:8]):
+            offset = len(BUNDLE_HEADER)
+            while offset < len(data):
+                size = _INT32.unpack_from(data, offset)[0]
+                self._message(data[offset + 4:offset + 4 + size])
+                offset += 4 + size
+        else:
+            self._message(data)
+
+    def _message(self, data):
+        self.messages += 1
+        self.addresses.append(parse_message(data)[0])
+
+    def reset(self):
+        self.addresses = []
+        self.messages = 0
+        self.bytes = 0
+
+
+def bench_cache(directory, avatar_parameters, lookups):
+    names = [f"Param{i}" for i in range(avatar_parameters)]
+    VRChatOutputStandIn(directory, {"avtr_bench-large": names}).write_configs()
+    cache = AvatarConfigCache(directory)
+    started = time.perf_counter_ns()
+    addresses = cache.get("avtr_bench-large")
+    first_us = (time.perf_counter_ns() - started) / 1000
+    assert len(addresses) == avatar_parameters
+    started = time.perf_counter_ns()
+    for _ in range(lookups):
+        cache.get("avtr_bench-large")
+    hit_us = (time.perf_counter_ns() - started) / lookups / 1000
+    return {"parameters": avatar_parameters, "first_parse_us": first_us, "cached_lookup_us": hit_us}
+
+
+async def bench_filter(directory, samples, track):
+    loop = asyncio.get_running_loop()
+    _, sink = await loop.create_datagram_endpoint(AddressSink, local_addr=("127.0.0.1", 0))
+    client = VRChatOSCClient(ip="127.0.0.1", port=sink.port)
+    await client.connect()
+    tracker = None
+    vrchat = VRChatOutputStandIn(directory, AVATARS).write_configs()
+    if track:
+        tracker = AvatarTracker(client, AvatarConfigCache(directory), port=0)
+        await tracker.start()
+        vrchat.port = tracker.listener.transport.get_extra_info("sockname")[1]
+    await vrchat.start()
+
+    per_avatar = {}
+    violations = 0
+    for avatar_id, names in AVATARS.items():
+        vrchat.change(avatar_id)
+        await asyncio.sleep(0.05)
+        sink.reset()
+        for i in range(samples):
+            client.send_heart_rate(60 + i % 100)
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.05)
+        allowed = {f"/avatar/parameters/{name}" for name in names}
+        if track:
+            violations += sum(1 for address in sink.addresses if address not in allowed)
+        per_avatar[avatar_id] = {
+            "messages_per_sample": sink.messages / samples,
+            "bytes_per_sample": sink.bytes / samples,
+        }
+
+    vrchat.close()
+    if tracker:
+        await tracker.stop()
+    client.disconnect()
+    sink.transport.close()
+    return {"per_avatar": per_avatar, "violations": violations}
+
+
+async def run(args, directory):
+    return {
+        "filtered": await bench_filter(directory, args.samples, track=True),
+        "unfiltered": await bench_filter(directory, args.samples, track=False),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="按模型过滤参数的基准测试")
+    parser.add_argument("--samples", type=int, default=500, help="每个模型发送的样本数")
+    parser.add_argument("--avatar-parameters", type=int, default=256, help="缓存测试中模型的参数个数")
+    parser.add_argument("--lookups", type=int, default=10000)
+    parser.add_argument("--output", help="把JSON结果写入文件")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+    # 每个样本都发送全部（当前模型的）参数，便于比较
+    Config.OSC_CHANGE_DRIVEN = False
+    Config.HEARTBEAT_SYNC = False
+    with tempfile.TemporaryDirectory() as directory:
+        result = {"cache": bench_cache(directory, args.avatar_parameters, args.lookups)}
+        result.update(asyncio.run(run(args, directory)))
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
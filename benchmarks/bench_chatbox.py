@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+聊天框输出基准测试
+1. 限速：以 1/10/100/1000 Hz 的频率把变化的心率交给启用了聊天框的 VRChatOSCClient，
+   本地接收端记录每条 /chatbox/input 的到达时间，检查任意长度为 w 的时间窗口内的消息数都不超过
+   令牌桶允许的上限 burst + ceil(w / interval) - 1（窗口缩短 --tolerance 秒，扣除接收端的计时抖动），
+   并统计模板渲染次数。
+2. 每样本CPU：ChatboxOutput.update 与每个样本都渲染并编码文本的做法对比。
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from chatbox import CHATBOX_ADDRESS, ChatboxOutput, chatbox_message
+from config import Config
+from osc_client import VRChatOSCClient
+
+RATES = (1, 10, 100, 1000)
+PREFIX = CHATBOX_ADDRESS.encode()
+
+
+class ChatboxSink(asyncio.DatagramProtocol):
+    def __init__(self):
+        self.arrivals = []
+
+    def datagram_received(self, data, addr):
+        if data.startswith(PREFIX):
+            self.arrivals.append(time.monotonic())
+
+
+def heart_rate_at(t):
+    # 每秒大约变化几次的心率
+    return 90 + 30 * ((t * 0.37) % 1) + (int(t * 7) % 3)
+
+
+def max_in_window(arrivals, window):
+    """任意长度为window的时间窗口内最多的消息数"""
+    best = 0
+    start = 0
+    for end, arrival in enumerate(arrivals):
+        while arrival - arrivals[start] >= window:
+            start += 1
+        best = max(best, end - start + 1)
+    return best
+
+
+async def rate_limit(rate, args):
+    loop = asyncio.get_running_loop()
+    transport, sink = await loop.create_datagram_endpoint(ChatboxSink, local_addr=("127.0.0.1", 0))
+    client = VRChatOSCClient(ip="127.0.0.1", port=transport.get_extra_info("sockname")[1])
+    await client.connect()
+    started = time.monotonic()
+    samples = 0
+    while True:
+        now = time.monotonic()
+        if now - started >= args.duration:
+            break
+        client.send_heart_rate(int(heart_rate_at(now - started)))
+        samples += 1
+        await asyncio.sleep(max(0.0, started + samples / rate - time.monotonic()))
+    await asyncio.sleep(0.1)
+    stats = client.chatbox.stats()
+    client.disconnect()
+    transport.close()
+
+    interval = client.chatbox.bucket.interval
+    burst = client.chatbox.bucket.burst
+    windows = {}
+    violations = 0
+    for window in (interval, interval * 4, 10.0):
+        allowed = burst + math.ceil(window / interval) - 1
+        observed = max_in_window(sink.arrivals, window - args.tolerance)
+        windows[f"{window:g}s"] = {"max_messages": observed, "allowed": allowed}
+        violations += observed > allowed
+    return {
+        "samples": samples,
+        "received": len(sink.arrivals),
+        "renders": stats["renders"],
+        "deferred": stats["deferred"],
+        "replaced": stats["replaced"],
+        "windows": windows,
+        "violations": violations,
+    }
+
+
+def cpu_per_update(iterations):
+    values = [int(heart_rate_at(i / 1000)) for i in range(iterations)]
+    output = ChatboxOutput(lambda message: 1, interval=1e-9, burst=1 << 30)
+    started = time.perf_counter_ns()
+    now = 0.0
+    for value in values:
+        now += 0.001
+        output.update(value, now)
+    cached = (time.perf_counter_ns() - started) / iterations
+
+    template = Config.CHATBOX_TEMPLATE
+    started = time.perf_counter_ns()
+    for value in values:
+        chatbox_message(template.format(bpm=value))
+    naive = (time.perf_counter_ns() - started) / iterations
+    return {"chatbox_output_ns": cached, "render_every_sample_ns": naive, "renders": output.renders}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="聊天框输出基准测试")
+    parser.add_argument("--duration", type=float, default=12.0, help="每个输入频率的测试时长（秒）")
+    parser.add_argument("--rates", type=float, nargs="+", default=list(RATES))
+    parser.add_argument("--iterations", type=int, default=200000)
+    parser.add_argument("--tolerance", type=float, default=0.02, help="接收端计时抖动的容差（秒）")
+    parser.add_argument("--output", help="把JSON结果写入文件")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    Config.CHATBOX_ENABLED = True
+    Config.HEARTBEAT_SYNC = False
+    result = {
+        "interval": Config.CHATBOX_INTERVAL,
+        "burst": Config.CHATBOX_BURST,
+        "rates": {f"{rate:g}": asyncio.run(rate_limit(rate, args)) for rate in args.rates},
+        "cpu": cpu_per_update(args.iterations),
+    }
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+WebSocket帧解码基准测试
+帧来自录制的会话文件（--session，否则先生成一段合成会话），按Pulsoid的格式重新序列化，
+并混入少量格式不同（键顺序不同、多余字段）和非心率的消息。比较每帧解码耗时：
+  dict_json        原实现：json.loads 成字典后逐项取值
+  json             FrameDecoder，标准库json，无快速路径
+  fast_json        FrameDecoder，快速路径 + 标准库json回退
+  orjson           FrameDecoder，orjson，无快速路径（未安装orjson时跳过）
+  fast_orjson      FrameDecoder，快速路径 + orjson回退（未安装orjson时跳过）
+  auto             FrameDecoder 默认配置
+"""
+
+import argparse
+import json
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from frame_decoder import FrameDecoder, load_json_backend
+from recorder import SessionFile, SessionRecorder
+
+
+def synthesize(path, count):
+    recorder = SessionRecorder(path, flush_interval=0)
+    started_at = int(time.time() * 1000)
+    for i in range(count):
+        recorder.record(60 + (i * 7) % 120, started_at + i * 1000)
+    recorder.close()
+
+
+def load_frames(path, spaced: bool):
+    """把会话中的样本序列化为Pulsoid帧，每100帧混入3个其他格式的消息"""
+    separators = (", ", ": ") if spaced else (",", ":")
+    frames = []
+    with SessionFile(path) as session:
+        for index, (measured_at, _, heart_rate) in enumerate(session):
+            frames.append(json.dumps(
+                {"measured_at": measured_at, "data": {"heart_rate": heart_rate}}, separators=separators
+            ))
+            if index % 100 == 0:
+                frames.append(json.dumps({"data": {"heart_rate": heart_rate}, "measured_at": measured_at}))
+                frames.append(json.dumps({"measured_at": measured_at, "data": {"heart_rate": heart_rate, "rr": []}}))
+                frames.append(json.dumps({"type": "ping"}))
+    return frames
+
+
+def dict_json(message):
+    data = json.loads(message)
+    if 'measured_at' in data and 'data' in data:
+        heart_rate = data['data'].get('heart_rate')
+        if heart_rate is not None:
+            return heart_rate, data.get('measured_at')
+    return None
+
+
+def bench(decode, frames, rounds):
+    decoded = 0
+    best = None
+    for _ in range(rounds):
+        started = time.perf_counter_ns()
+        for frame in frames:
+            if decode(frame) is not None:
+                decoded += 1
+        elapsed = time.perf_counter_ns() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return {"ns_per_frame": best / len(frames), "decoded": decoded // rounds}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WebSocket帧解码基准测试")
+    parser.add_argument("--session", help="录制的会话文件（.phr），省略时生成合成会话")
+    parser.add_argument("--samples", type=int, default=100000, help="合成会话的样本数")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--output", help="把JSON结果写入文件")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    with tempfile.TemporaryDirectory() as directory:
+        path = args.session
+        if not path:
+            path = Path(directory) / "session.phr"
+            synthesize(path, args.samples)
+        frame_sets = {"compact": load_frames(path, False), "spaced": load_frames(path, True)}
+
+    decoders = {
+        "dict_json": dict_json,
+        "json": FrameDecoder("json", fast_path=False).decode,
+        "fast_json": FrameDecoder("json", fast_path=True).decode,
+    }
+    if load_json_backend("orjson")[0] == "orjson":
+        decoders["orjson"] = FrameDecoder("orjson", fast_path=False).decode
+        decoders["fast_orjson"] = FrameDecoder("orjson", fast_path=True).decode
+    auto = FrameDecoder()
+    decoders["auto"] = auto.decode
+
+    result = {
+        "frames": len(frame_sets["compact"]),
+        "auto": {"backend": auto.backend, "fast_path": auto.fast_path},
+    }
+    for name, frames in frame_sets.items():
+        result[name] = {decoder: bench(decode, frames, args.rounds) for decoder, decode in decoders.items()}
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
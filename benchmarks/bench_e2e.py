@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+端到端延迟基准测试
+使用本地Pulsoid替身服务器驱动 PulsoidWebSocketClient 和 VRChatOSCClient，
+测量从替身服务器发出帧到OSC数据报到达本地接收端的延迟，以及最大可持续消息速率。
+结果以JSON输出，便于跨版本跟踪性能回归。
+
+注意：替身服务器、桥接和接收端运行在同一个事件循环中，测量结果包含替身本身的开销。
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from config import Config
+from osc_client import VRChatOSCClient
+from pipeline import CoalescingPipeline
+from websocket_client import PulsoidWebSocketClient
+from standin import OscSink, PulsoidStandInServer, percentile
+
+DEFAULT_RATES = [1, 10, 50, 100, 250, 500, 1000, 2000, 5000]
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+            capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def summarize(latencies_ns):
+    values = sorted(latencies_ns)
+    if not values:
+        return {"p50_ms": None, "p99_ms": None, "max_ms": None}
+    return {
+        "p50_ms": percentile(values, 0.50) / 1e6,
+        "p99_ms": percentile(values, 0.99) / 1e6,
+        "max_ms": values[-1] / 1e6,
+    }
+
+
+async def run_rate(rate, duration, warmup, coalesce, change_driven):
+    """以指定速率运行一轮，返回该轮的统计结果"""
+    server = await PulsoidStandInServer(rate=rate).start()
+    sink = await OscSink.create(server)
+
+    osc_client = VRChatOSCClient(ip="127.0.0.1", port=sink.port)
+    osc_client.change_driven = change_driven
+    await osc_client.connect()
+    on_heart_rate = osc_client.send_heart_rate
+    pipeline = None
+    if coalesce:
+        pipeline = CoalescingPipeline(osc_client.send_heart_rate)
+        pipeline.start()
+        on_heart_rate = pipeline.submit
+    websocket_client = PulsoidWebSocketClient(
+        token="benchmark",
+        on_heart_rate=on_heart_rate,
+        url=server.url
+    )
+    client_task = asyncio.create_task(websocket_client.run_with_reconnect())
+
+    try:
+        await asyncio.sleep(warmup)
+        sink.reset()
+        sent_before = server.sent
+        coalesced_before = pipeline.mailbox.coalesced if pipeline else 0
+        started = time.perf_counter()
+        await asyncio.sleep(duration)
+        elapsed = time.perf_counter() - started
+        sent = server.sent - sent_before
+        received = sink.samples
+        coalesced = (pipeline.mailbox.coalesced if pipeline else 0) - coalesced_before
+    finally:
+        await websocket_client.stop()
+        if pipeline:
+            await pipeline.stop()
+        await server.stop()
+        client_task.cancel()
+        try:
+            await client_task
+        except asyncio.CancelledError:
+            pass
+        osc_client.disconnect()
+        sink.close()
+
+    result = {
+        "rate": rate,
+        "duration_s": elapsed,
+        "sent": sent,
+        "received": received,
+        "coalesced": coalesced,
+        "osc": osc_client.get_stats(),
+        # 合并丢弃的样本是有意跳过的，不算作丢失
+        "delivered_ratio": (received + coalesced) / sent if sent else 0.0,
+        "throughput_per_s": received / elapsed if elapsed else 0.0,
+    }
+    result.update(summarize(sink.latencies_ns))
+    return result
+
+
+async def run(args):
+    results = []
+    max_sustainable = None
+    for rate in args.rates:
+        result = await run_rate(rate, args.duration, args.warmup, args.coalesce, args.change_driven)
+        sustainable = (
+            result["delivered_ratio"] >= args.min_delivery
+            and result["p99_ms"] is not None
+            and result["p99_ms"] <= args.max_p99_ms
+        )
+        result["sustainable"] = sustainable
+        results.append(result)
+        print(
+            f"rate={rate:>6} sent={result['sent']:>7} recv={result['received']:>7} "
+            f"p50={result['p50_ms'] or 0:.3f}ms p99={result['p99_ms'] or 0:.3f}ms "
+            f"max={result['max_ms'] or 0:.3f}ms {'ok' if sustainable else 'saturated'}",
+            file=sys.stderr
+        )
+        if sustainable:
+            max_sustainable = rate
+        elif args.stop_on_saturation:
+            break
+
+    return {
+        "benchmark": "e2e_latency",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "osc_use_bundle": Config.OSC_USE_BUNDLE,
+        "coalesce": args.coalesce,
+        "change_driven": args.change_driven,
+        "criteria": {"min_delivery": args.min_delivery, "max_p99_ms": args.max_p99_ms},
+        "max_sustainable_rate": max_sustainable,
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rates", type=float, nargs="+", default=DEFAULT_RATES, help="依次测试的帧速率（帧/秒）")
+    parser.add_argument("--duration", type=float, default=5.0, help="每个速率的测量时长（秒）")
+    parser.add_argument("--warmup", type=float, default=1.0, help="每个速率开始测量前的预热时长（秒）")
+    parser.add_argument("--min-delivery", type=float, default=0.99, help="判定可持续的最低送达比例")
+    parser.add_argument("--max-p99-ms", type=float, default=50.0, help="判定可持续的p99延迟上限（毫秒）")
+    parser.add_argument("--coalesce", action="store_true", help="在接收和发送之间插入最新值合并流水线")
+    parser.add_argument("--change-driven", action="store_true",
+                        help="启用变化驱动发送（默认关闭，以便每个样本都能在接收端计时）")
+    parser.add_argument("--stop-on-saturation", action="store_true", help="遇到第一个不可持续的速率即停止")
+    parser.add_argument("--output", help="把JSON结果写入文件（默认输出到stdout）")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
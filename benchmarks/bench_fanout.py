@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+多目标发送基准测试
+把同一串心率样本发送到 1/2/4/8 个本地OSC接收端，比较：
+  shared       VRChatOSCClient 多目标模式：编码一次，共用一个UDP套接字
+  per_client   每个目标一个独立的 VRChatOSCClient（各自编码、各自的套接字）
+关闭变化检测和限速，每个样本都发送全部参数，测量每个样本的发送耗时。
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from config import Config
+from osc_client import VRChatOSCClient
+from standin import OscSink
+
+# 每批发送的样本数，批之间让出事件循环
+BATCH = 5
+
+
+async def run_clients(clients, samples):
+    for client in clients:
+        await client.connect()
+    heart_rates = [60 + i % 100 for i in range(samples)]
+    elapsed = 0
+    for offset in range(0, samples, BATCH):
+        started = time.perf_counter_ns()
+        for heart_rate in heart_rates[offset:offset + BATCH]:
+            for client in clients:
+                client.send_heart_rate(heart_rate)
+        elapsed += time.perf_counter_ns() - started
+        # 让接收端读走数据报，避免内核缓冲区溢出丢包（不计入耗时）
+        await asyncio.sleep(0.001)
+    for client in clients:
+        client.disconnect()
+    return elapsed / samples / 1000
+
+
+async def bench(count, samples):
+    sinks = [await OscSink.create() for _ in range(count)]
+    targets = [("127.0.0.1", sink.port, None) for sink in sinks]
+
+    shared_us = await run_clients([VRChatOSCClient(destinations=targets)], samples)
+    await asyncio.sleep(0.2)
+    shared_received = sum(sink.samples for sink in sinks)
+    for sink in sinks:
+        sink.reset()
+
+    per_client_us = await run_clients(
+        [VRChatOSCClient(ip=host, port=port) for host, port, _ in targets], samples
+    )
+    await asyncio.sleep(0.2)
+    per_client_received = sum(sink.samples for sink in sinks)
+    for sink in sinks:
+        sink.close()
+    return {
+        "shared_us_per_sample": shared_us,
+        "per_client_us_per_sample": per_client_us,
+        "shared_received": shared_received,
+        "per_client_received": per_client_received,
+    }
+
+
+async def run(args):
+    # 预热
+    await bench(1, min(args.samples, 1000))
+    return {
+        "samples": args.samples,
+        "destinations": {str(count): await bench(count, args.samples) for count in (1, 2, 4, 8)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多目标发送基准测试")
+    parser.add_argument("--samples", type=int, default=5000)
+    parser.add_argument("--output", help="把JSON结果写入文件")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+    # 每个样本都发送全部参数，心跳节拍不参与
+    Config.OSC_CHANGE_DRIVEN = False
+    Config.HEARTBEAT_SYNC = False
+    Config.OSC_KEEPALIVE_INTERVAL = 3600
+    result = asyncio.run(run(args))
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+HeartBeatToggle节拍调度器抖动测试
+以给定BPM运行调度器（可周期性改变BPM），统计每拍实际唤醒时间相对计划时刻的偏差，
+并检查长时间运行后累计的拍数与理论值一致（无漂移）。
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config import Config
+from heartbeat import HeartBeatScheduler
+
+
+async def run(args):
+    loop = asyncio.get_running_loop()
+    beats = 0
+
+    def on_beat():
+        nonlocal beats
+        beats += 1
+
+    scheduler = HeartBeatScheduler(on_beat, max_bpm=args.max_bpm, spin_margin=args.spin_margin)
+    bpms = args.bpm
+    started = loop.time()
+    expected = 0.0
+    segment = args.duration / len(bpms)
+    for bpm in bpms:
+        scheduler.update(bpm)
+        # 模拟约每秒一个心率样本，值不变时调度器不应重新规划
+        segment_end = loop.time() + segment
+        while loop.time() < segment_end:
+            await asyncio.sleep(min(1.0, segment_end - loop.time()))
+            scheduler.update(bpm)
+        expected += segment * bpm / 60
+    elapsed = loop.time() - started
+    scheduler.stop()
+
+    result = scheduler.stats()
+    result.update({
+        "spin_margin_s": args.spin_margin,
+        "duration_s": elapsed,
+        "bpm_schedule": bpms,
+        "beats_expected": expected,
+        "beats_counted": beats,
+    })
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--bpm", type=float, nargs="+", default=[72, 120, 180],
+                        help="依次使用的BPM，运行时长平均分配")
+    parser.add_argument("--duration", type=float, default=30.0, help="总运行时长（秒）")
+    parser.add_argument("--spin-margin", type=float, default=Config.HEARTBEAT_SPIN_MARGIN,
+                        help="提前唤醒并忙等的时长（秒），0表示只依赖事件循环定时器")
+    parser.add_argument("--max-bpm", type=int, default=600, help="调度器允许的最高BPM")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+插值输出引擎基准测试
+在不同tick频率和滤波器下运行 VRChatOSCClient 的插值输出，
+报告每tick的CPU耗时、CPU占用率以及tick计算路径的内存分配。
+"""
+
+import argparse
+import asyncio
+import json
+import socket
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config import Config
+from interpolation import FILTERS
+from osc_client import VRChatOSCClient
+
+
+def tick_cost(client, ticks=10000):
+    """直接调用tick计算路径（滤波 + 编码 + 发送），返回 (每tick微秒, 每tick净增内存块)"""
+    engine = client.interpolator
+    engine.update(72)
+    output = engine.output
+    step = engine.filter.step
+    for _ in range(100):
+        output(step())
+    before = sys.getallocatedblocks()
+    started = time.perf_counter()
+    for i in range(ticks):
+        if i % 100 == 0:
+            engine.filter.set_target(60 + i % 120)
+        output(step())
+    elapsed = time.perf_counter() - started
+    return elapsed / ticks * 1e6, (sys.getallocatedblocks() - before) / ticks
+
+
+async def run_case(filter_name, rate, duration, port):
+    Config.INTERPOLATION_ENABLED = True
+    Config.INTERPOLATION_RATE = rate
+    Config.INTERPOLATION_FILTER = filter_name
+    client = VRChatOSCClient(ip="127.0.0.1", port=port)
+    client.min_interval = 0
+    client.beat_scheduler = None
+    await client.connect()
+
+    cpu_start = time.process_time()
+    started = time.perf_counter()
+    heart_rate = 70
+    while time.perf_counter() - started < duration:
+        # 约每秒一个心率样本
+        heart_rate = 60 + (heart_rate + 7) % 120
+        client.send_heart_rate(heart_rate)
+        await asyncio.sleep(1.0)
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_start
+    ticks = client.interpolator.ticks
+    client.interpolator.stop()
+
+    compute_us, blocks_per_tick = tick_cost(client)
+    client.disconnect()
+    return {
+        "filter": filter_name,
+        "rate_hz": rate,
+        "ticks": ticks,
+        "cpu_percent": cpu / elapsed * 100,
+        # 进程总CPU（含事件循环唤醒开销）摊到每个tick
+        "process_cpu_us_per_tick": cpu / ticks * 1e6 if ticks else None,
+        "compute_us_per_tick": compute_us,
+        "net_blocks_per_tick": blocks_per_tick,
+    }
+
+
+async def run(args):
+    sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sink.bind(("127.0.0.1", 0))
+    sink.setblocking(False)
+    port = sink.getsockname()[1]
+
+    results = []
+    for filter_name in args.filters:
+        for rate in args.rates:
+            result = await run_case(filter_name, rate, args.duration, port)
+            results.append(result)
+            print(
+                f"{filter_name:<7}{rate:>5} Hz  CPU {result['cpu_percent']:.3f}%  "
+                f"进程 {result['process_cpu_us_per_tick']:.1f} us/tick  计算 {result['compute_us_per_tick']:.2f} us/tick  "
+                f"净增块/tick {result['net_blocks_per_tick']:.4f}",
+                file=sys.stderr
+            )
+            try:
+                while True:
+                    sink.recv(65536)
+            except BlockingIOError:
+                pass
+    sink.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rates", type=float, nargs="+", default=[10, 20, 30, 60])
+    parser.add_argument("--filters", nargs="+", default=list(FILTERS), choices=list(FILTERS))
+    parser.add_argument("--duration", type=float, default=3.0, help="每种组合运行的时长（秒）")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+心率日志对事件循环的阻塞时间基准测试
+对比原来的同步处理器 + f-string + 每条记录重新格式化时间，
+与队列模式 + %-style惰性参数 + 按秒缓存时间戳（以及按样本采样）的每样本阻塞时间。
+控制台输出重定向到 os.devnull，文件输出写入临时目录。
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from logger import ColoredFormatter, setup_logging, stop_logging
+
+
+class LegacyColoredFormatter(ColoredFormatter):
+    """原实现：每条记录都调用 datetime.fromtimestamp(...).strftime"""
+
+    def format(self, record):
+        color = self.COLORS.get(record.levelname, '')
+        timestamp = datetime.fromtimestamp(record.created).strftime('%H:%M:%S')
+        return f"{color}[{timestamp}] {record.levelname}: {record.getMessage()}{self.reset}"
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def measure(log_sample, samples, interval):
+    durations = []
+    perf = time.perf_counter_ns
+    for i in range(samples):
+        heart_rate = 60 + i % 120
+        started = perf()
+        log_sample(i, heart_rate)
+        durations.append(perf() - started)
+        if interval:
+            # 模拟样本之间事件循环空闲，后台线程有机会写出日志
+            time.sleep(interval)
+    return {
+        "mean_us": sum(durations) / len(durations) / 1000,
+        "p99_us": percentile(durations, 0.99) / 1000,
+        "max_us": max(durations) / 1000,
+    }
+
+
+def run_case(name, use_queue, legacy, sample_every, samples, interval, workdir):
+    os.chdir(workdir)
+    setup_logging(level=logging.INFO, log_to_file=True, use_queue=use_queue)
+    if legacy:
+        for handler in logging.getLogger().handlers:
+            if isinstance(handler.formatter, ColoredFormatter):
+                handler.setFormatter(LegacyColoredFormatter(use_color=True))
+    log = logging.getLogger("bench")
+
+    if legacy:
+        def log_sample(i, heart_rate):
+            log.info(f"心率: {heart_rate} bpm")
+    else:
+        def log_sample(i, heart_rate):
+            if i % sample_every == 0:
+                log.info("心率: %d bpm", heart_rate)
+
+    result = measure(log_sample, samples, interval)
+    stop_logging()
+    result["case"] = name
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--samples", type=int, default=5000)
+    parser.add_argument("--interval", type=float, default=0.001,
+                        help="样本之间的空闲时间（秒），0表示连续调用（后台线程会与调用方争抢GIL）")
+    parser.add_argument("--sample-every", type=int, default=10, help="采样模式下每N个样本输出一行")
+    args = parser.parse_args()
+
+    cases = [
+        ("legacy-sync", False, True, 1),
+        ("sync-lazy-cached", False, False, 1),
+        ("queue-lazy-cached", True, False, 1),
+        (f"queue-sampled-1/{args.sample_every}", True, False, args.sample_every),
+    ]
+
+    real_stdout = sys.stdout
+    results = []
+    with tempfile.TemporaryDirectory() as workdir, open(os.devnull, "w", encoding="utf-8") as devnull:
+        cwd = os.getcwd()
+        try:
+            for name, use_queue, legacy, sample_every in cases:
+                sys.stdout = devnull
+                try:
+                    result = run_case(name, use_queue, legacy, sample_every, args.samples, args.interval, workdir)
+                finally:
+                    sys.stdout = real_stdout
+                results.append(result)
+                print(
+                    f"{name:<22} 平均 {result['mean_us']:8.2f} us  p99 {result['p99_us']:8.2f} us  "
+                    f"最大 {result['max_us']:9.2f} us",
+                    file=sys.stderr
+                )
+        finally:
+            logging.getLogger().handlers.clear()
+            logging.shutdown()
+            os.chdir(cwd)
+
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+参数映射基准测试
+比较每个样本把心率换算并写入OSC编码缓冲区的耗时：
+  dict_loop        原实现：每个样本构建 [{'address', 'args': {'type', 'value'}}] 列表，逐项查字典并按类型分发
+  builtin          内置参数表（预先绑定写入函数的扁平列表）
+  profile_expr     从映射配置编译的表达式函数（与内置参数相同的换算）
+  profile_lut      从映射配置编译的查找表
+不包含UDP发送，只测量换算和编码。
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mapping import compile_profile
+from osc_bundle import OscBundleEncoder
+from osc_client import HEART_RATE_PARAMETERS
+
+# 与内置参数等价的映射配置
+EXPR_PROFILE = [
+    {"address": "Heartrate", "type": "f", "expr": "hr / 127 - 1"},
+    {"address": "HeartRateFloat", "type": "f", "expr": "hr / 127 - 1"},
+    {"address": "Heartrate2", "type": "f", "expr": "hr / 255"},
+    {"address": "HeartRateFloat01", "type": "f", "expr": "hr / 255"},
+    {"address": "Heartrate3", "type": "i"},
+    {"address": "HeartRateInt", "type": "i"},
+    {"address": "HeartBeatToggle", "type": "b"},
+]
+
+# 同样的参数改用查找表
+LUT_PROFILE = [
+    {"address": "Heartrate", "type": "f", "lut": [hr / 127 - 1 for hr in range(256)]},
+    {"address": "HeartRateFloat", "type": "f", "lut": [hr / 127 - 1 for hr in range(256)]},
+    {"address": "Heartrate2", "type": "f", "lut": {"0": 0, "255": 1}},
+    {"address": "HeartRateFloat01", "type": "f", "lut": {"0": 0, "255": 1}},
+    {"address": "Heartrate3", "type": "i", "lut": list(range(256))},
+    {"address": "HeartRateInt", "type": "i", "lut": list(range(256))},
+    {"address": "HeartBeatToggle", "type": "b"},
+]
+
+
+def flat_fields(parameters, encoder):
+    """与 VRChatOSCClient 相同的预绑定方式"""
+    setters = {'f': encoder.set_float, 'i': encoder.set_int, 'b': encoder.set_bool}
+    fields = []
+    toggle = None
+    for index, (_, type_tag, transform) in enumerate(parameters):
+        if type_tag == 'b' and transform is None:
+            toggle = index
+        else:
+            fields.append((index, setters[type_tag], transform))
+    return fields, toggle
+
+
+def make_flat(parameters):
+    encoder = OscBundleEncoder([(address, type_tag) for address, type_tag, _ in parameters])
+    fields, toggle = flat_fields(parameters, encoder)
+    state = [False]
+
+    def encode(heart_rate):
+        for index, setter, transform in fields:
+            setter(index, transform(heart_rate))
+        encoder.set_bool(toggle, state[0])
+        state[0] = not state[0]
+
+    return encode
+
+
+def make_dict_loop():
+    encoder = OscBundleEncoder([(address, type_tag) for address, type_tag, _ in HEART_RATE_PARAMETERS])
+    state = [False]
+
+    def encode(heart_rate):
+        heartrates = [
+            {'address': '/avatar/parameters/Heartrate', 'args': {'type': 'f', 'value': heart_rate / 127 - 1}},
+            {'address': "/avatar/parameters/HeartRateFloat", 'args': {'type': "f", 'value': heart_rate / 127 - 1}},
+            {'address': "/avatar/parameters/Heartrate2", 'args': {'type': "f", 'value': heart_rate / 255}},
+            {'address': "/avatar/parameters/HeartRateFloat01", 'args': {'type': "f", 'value': heart_rate / 255}},
+            {'address': "/avatar/parameters/Heartrate3", 'args': {'type': "i", 'value': heart_rate}},
+            {'address': "/avatar/parameters/HeartRateInt", 'args': {'type': "i", 'value': heart_rate}},
+            {'address': "/avatar/parameters/HeartBeatToggle", 'args': {'type': "b", 'value': state[0]}},
+        ]
+        for element in heartrates:
+            address = element['address']
+            value = element['args']['value']
+            type_tag = element['args']['type']
+            index = encoder.index(address)
+            if type_tag == 'f':
+                encoder.set_float(index, value)
+            elif type_tag == 'i':
+                encoder.set_int(index, value)
+            else:
+                encoder.set_bool(index, value)
+            if address == "/avatar/parameters/HeartBeatToggle":
+                state[0] = not state[0]
+
+    return encode
+
+
+def bench(encode, iterations):
+    samples = [40 + i % 160 for i in range(1024)]
+    for i in range(2000):
+        encode(samples[i & 1023])
+    started = time.perf_counter_ns()
+    for i in range(iterations):
+        encode(samples[i & 1023])
+    return (time.perf_counter_ns() - started) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="参数映射基准测试")
+    parser.add_argument("--iterations", type=int, default=200000)
+    parser.add_argument("--output", help="把JSON结果写入文件")
+    args = parser.parse_args()
+
+    started = time.perf_counter_ns()
+    expr_profile = compile_profile(EXPR_PROFILE)
+    compile_expr_us = (time.perf_counter_ns() - started) / 1000
+    started = time.perf_counter_ns()
+    lut_profile = compile_profile(LUT_PROFILE)
+    compile_lut_us = (time.perf_counter_ns() - started) / 1000
+
+    # 编译结果必须与内置参数一致
+    for heart_rate in range(256):
+        for (_, _, builtin), (_, _, expr), (_, _, lut) in zip(HEART_RATE_PARAMETERS, expr_profile, lut_profile):
+            if builtin is None:
+                continue
+            expected = builtin(heart_rate)
+            assert abs(expr(heart_rate) - expected) < 1e-9, heart_rate
+            assert abs(lut(heart_rate) - expected) < 1e-9, heart_rate
+
+    result = {
+        "iterations": args.iterations,
+        "compile_us": {"profile_expr": compile_expr_us, "profile_lut": compile_lut_us},
+        "ns_per_sample": {
+            "dict_loop": bench(make_dict_loop(), args.iterations),
+            "builtin": bench(make_flat(HEART_RATE_PARAMETERS), args.iterations),
+            "profile_expr": bench(make_flat(expr_profile), args.iterations),
+            "profile_lut": bench(make_flat(lut_profile), args.iterations),
+        },
+    }
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
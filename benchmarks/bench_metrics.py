@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+指标记录开销基准测试
+测量每个心率样本在热路径上的指标记录耗时（record_frame + record_send）以及单次直方图observe的耗时。
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from metrics import BridgeMetrics, Histogram
+
+
+def bench(fn, iterations):
+    for _ in range(1000):
+        fn()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=200000)
+    args = parser.parse_args()
+
+    histogram = Histogram()
+    values = [0.00005 * (i % 4000) for i in range(1024)]
+    position = 0
+
+    def observe():
+        nonlocal position
+        histogram.observe(values[position & 1023])
+        position += 1
+
+    metrics = BridgeMetrics()
+    measured_at = int(time.time() * 1000)
+
+    def record_sample():
+        metrics.record_frame(measured_at)
+        metrics.record_send()
+
+    def baseline():
+        pass
+
+    overhead = bench(baseline, args.iterations)
+    result = {
+        "histogram_observe_us": bench(observe, args.iterations) - overhead,
+        "record_sample_us": bench(record_sample, args.iterations) - overhead,
+        "call_overhead_us": overhead,
+    }
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+OSC发送路径基准测试
+对比原来的逐条send_message路径与预编码bundle的每样本CPU时间和内存分配
+"""
+
+import argparse
+import asyncio
+import socket
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pythonosc import udp_client
+
+from config import Config
+from osc_client import VRChatOSCClient
+
+
+class LegacyOSCSender:
+    """原实现：每个样本构建参数字典列表，并调用七次SimpleUDPClient.send_message"""
+
+    def __init__(self, port):
+        self.client = udp_client.SimpleUDPClient("127.0.0.1", port)
+        self.hb_toggle = False
+
+    def send_heart_rate(self, heart_rate):
+        heartrates = [
+            {'address': '/avatar/parameters/Heartrate', 'args': {'type': 'f', 'value': heart_rate / 127 - 1}},
+            {'address': "/avatar/parameters/HeartRateFloat", 'args': {'type': "f", 'value': heart_rate / 127 - 1}},
+            {'address': "/avatar/parameters/Heartrate2", 'args': {'type': "f", 'value': heart_rate / 255}},
+            {'address': "/avatar/parameters/HeartRateFloat01", 'args': {'type': "f", 'value': heart_rate / 255}},
+            {'address': "/avatar/parameters/Heartrate3", 'args': {'type': "i", 'value': heart_rate}},
+            {'address': "/avatar/parameters/HeartRateInt", 'args': {'type': "i", 'value': heart_rate}},
+            {'address': "/avatar/parameters/HeartBeatToggle", 'args': {'type': "b", 'value': self.hb_toggle}},
+        ]
+        for element in heartrates:
+            address = element['address']
+            self.client.send_message(address, element['args']['value'])
+            if address == "/avatar/parameters/HeartBeatToggle":
+                self.hb_toggle = not self.hb_toggle
+        return True
+
+
+def measure(send, samples):
+    """返回 (每样本CPU微秒, 每样本临时分配峰值字节, 每样本净增内存块)"""
+    for i in range(1000):
+        send(60 + i % 120)
+
+    start = time.process_time()
+    for i in range(samples):
+        send(60 + i % 120)
+    cpu_us = (time.process_time() - start) / samples * 1e6
+
+    alloc_samples = min(samples, 2000)
+    peak_total = 0
+    tracemalloc.start()
+    blocks_before = sys.getallocatedblocks()
+    for i in range(alloc_samples):
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        send(60 + i % 120)
+        peak_total += tracemalloc.get_traced_memory()[1] - current
+    blocks = sys.getallocatedblocks() - blocks_before
+    tracemalloc.stop()
+    return cpu_us, peak_total / alloc_samples, blocks / alloc_samples
+
+
+def drain(sink):
+    try:
+        while True:
+            sink.recv(65536)
+    except BlockingIOError:
+        pass
+
+
+async def run(samples):
+    # 本地接收端，避免ICMP端口不可达影响结果
+    sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sink.bind(("127.0.0.1", 0))
+    sink.setblocking(False)
+    port = sink.getsockname()[1]
+    Config.OSC_IP = "127.0.0.1"
+    Config.OSC_PORT = port
+
+    print(f"{'路径':<14}{'CPU/样本(us)':>14}{'临时分配B/样本':>16}{'净增块/样本':>12}{'数据报/样本':>12}")
+
+    legacy = LegacyOSCSender(port)
+    cpu_us, peak, blocks = measure(legacy.send_heart_rate, samples)
+    print(f"{'legacy':<14}{cpu_us:>14.2f}{peak:>16.1f}{blocks:>12.2f}{7:>12}")
+    drain(sink)
+
+    for name, use_bundle in (("per-message", False), ("bundle", True)):
+        client = VRChatOSCClient()
+        client.use_bundle = use_bundle
+        # 比较的是每样本发送路径本身，关闭变化检测
+        client.change_driven = False
+        client.beat_scheduler = None
+        await client.connect()
+        cpu_us, peak, blocks = measure(client.send_heart_rate, samples)
+        datagrams = 1 if use_bundle else 7
+        print(f"{name:<14}{cpu_us:>14.2f}{peak:>16.1f}{blocks:>12.2f}{datagrams:>12}")
+        client.disconnect()
+        drain(sink)
+
+    sink.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--samples", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(run(args.samples))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+--profile 开销基准测试
+用模拟的WebSocket连接把 --frames 个心率帧交给 PulsoidWebSocketClient.listen()，
+经过解码、新鲜度过滤、处理函数和OSC发送（本地UDP接收端），比较每帧耗时：
+  off          不开启分析（各阶段方法保持原样，热路径上没有额外代码）
+  timers       只开启分阶段计时
+  full         分阶段计时 + cProfile + tracemalloc（--profile 的默认配置）
+另外输出单次计时包装本身的开销，以及 timers 模式下各阶段的计时结果。
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+import types
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from config import Config
+from main import PulsoidVRChatBridge
+from profiling import Profiler
+from standin import OscSink
+
+
+class ReplaySocket:
+    """按顺序返回预先生成的帧，代替WebSocket连接"""
+
+    def __init__(self, frames):
+        self.frames = frames
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for frame in self.frames:
+            yield frame
+
+
+def make_frames(count):
+    started_at = int(time.time() * 1000) - count * 1000
+    return [
+        json.dumps({"measured_at": started_at + i * 1000, "data": {"heart_rate": 60 + i % 120}})
+        for i in range(count)
+    ]
+
+
+async def run_once(frames, port, profiler):
+    bridge = PulsoidVRChatBridge(
+        token="benchmark", osc_ip="127.0.0.1", osc_port=port,
+        serve_metrics=False, track_avatar=False, profiler=profiler
+    )
+    if not await bridge.initialize():
+        raise RuntimeError("初始化失败")
+    client = bridge.websocket_client
+    if profiler is None:
+        # 不开启分析时各阶段必须是原来的方法
+        assert isinstance(bridge.on_heart_rate_received, types.MethodType)
+        assert isinstance(client.decoder.decode, types.MethodType)
+        assert isinstance(bridge.osc_client.send_heart_rate, types.MethodType)
+    client.websocket = ReplaySocket(frames)
+    client.last_message_at = time.monotonic()
+    started = time.perf_counter_ns()
+    await client.listen()
+    elapsed = time.perf_counter_ns() - started
+    bridge.osc_client.disconnect()
+    return elapsed / len(frames)
+
+
+async def measure(args):
+    sink = await OscSink.create()
+    frames = make_frames(args.frames)
+    modes = {
+        "off": lambda: None,
+        "timers": lambda: Profiler(cprofile=False, tracemalloc_frames=0),
+        "full": lambda: Profiler(),
+    }
+    results = {name: [] for name in modes}
+    stages = None
+    for _ in range(args.rounds):
+        for name, factory in modes.items():
+            profiler = factory()
+            if profiler is not None:
+                profiler.start()
+            results[name].append(await run_once(frames, sink.port, profiler))
+            if profiler is not None:
+                profiler.stop()
+                if name == "timers":
+                    stages = profiler.summary()
+    sink.close()
+    return {name: min(values) for name, values in results.items()}, stages
+
+
+def wrapper_overhead(iterations):
+    """计时包装本身的开销：包装空函数与直接调用之差"""
+    class Target:
+        def noop(self, value):
+            return value
+
+    plain = Target()
+    wrapped = Target()
+    Profiler(cprofile=False, tracemalloc_frames=0).instrument(wrapped, "noop", "noop")
+
+    def loop(target):
+        call = target.noop
+        started = time.perf_counter_ns()
+        for i in range(iterations):
+            call(i)
+        return (time.perf_counter_ns() - started) / iterations
+
+    return min(loop(wrapped) for _ in range(3)) - min(loop(plain) for _ in range(3))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="--profile 开销基准测试")
+    parser.add_argument("--frames", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--iterations", type=int, default=1000000)
+    parser.add_argument("--output", help="把JSON结果写入文件")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    Config.METRICS_ENABLED = False
+    Config.PIPELINE_COALESCE = False
+    Config.AUTH_VALIDATE_TOKEN = False
+    Config.INTERPOLATION_ENABLED = False
+    per_frame, stages = asyncio.run(measure(args))
+    result = {
+        "frames": args.frames,
+        "ns_per_frame": per_frame,
+        "profile_overhead_ratio": {
+            name: per_frame[name] / per_frame["off"] - 1 for name in ("timers", "full")
+        },
+        "wrapper_ns_per_call": wrapper_overhead(args.iterations),
+        "stages": stages,
+    }
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
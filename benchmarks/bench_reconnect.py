@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+重连数据中断基准测试
+使用本地Pulsoid替身服务器注入故障，测量 PulsoidWebSocketClient 从最后一帧到恢复后
+第一帧之间的数据中断时长：
+  drop     服务器直接断开连接
+  stall    连接保持打开但不再推送数据、也不响应ping（半开连接），分别测试启用/禁用备用连接
+  idle     连接正常但传感器不再有数据（ping照常响应），统计 --idle-seconds 秒内的连接和停滞次数，
+           期望不重连
+  outage   服务器在一段时间内拒绝新连接
+  herd     多个客户端同时经历服务中断，统计各自恢复时间的分布
+结果以JSON输出。
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from config import Config
+from websocket_client import PulsoidWebSocketClient
+from standin import PulsoidStandInServer, percentile
+
+
+class FrameClock:
+    """记录收到每一帧的时间"""
+
+    def __init__(self):
+        self.last = None
+        self.arrived = asyncio.Event()
+
+    def __call__(self, heart_rate):
+        self.last = time.monotonic()
+        self.arrived.set()
+
+    async def next_after(self, moment, timeout):
+        """等待moment之后的第一帧，返回其到达时间"""
+        deadline = time.monotonic() + timeout
+        while self.last is None or self.last <= moment:
+            self.arrived.clear()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            try:
+                await asyncio.wait_for(self.arrived.wait(), remaining)
+            except asyncio.TimeoutError:
+                return None
+        return self.last
+
+
+async def start_client(server, clock):
+    client = PulsoidWebSocketClient(token="benchmark", on_heart_rate=clock, url=server.url)
+    task = asyncio.create_task(client.run_with_reconnect())
+    return client, task
+
+
+async def stop_client(client, task):
+    await client.stop()
+    await asyncio.wait_for(task, 15)
+
+
+async def measure_gap(rate, scenario, warmup, timeout, outage):
+    server = await PulsoidStandInServer(rate=rate).start()
+    clock = FrameClock()
+    client, task = await start_client(server, clock)
+    try:
+        await asyncio.sleep(warmup)
+        last_before = clock.last
+        if scenario == "drop":
+            server.drop()
+        elif scenario == "stall":
+            server.stall()
+        elif scenario == "outage":
+            server.refuse(outage)
+        first_after = await clock.next_after(last_before, timeout)
+        return {
+            "gap_ms": (first_after - last_before) * 1000 if first_after else None,
+            "stall_timeout_ms": client.stall_timeout() * 1000,
+            "stats": dict(client.stats),
+        }
+    finally:
+        await stop_client(client, task)
+        await server.stop()
+
+
+async def measure_idle(rate, warmup, duration):
+    server = await PulsoidStandInServer(rate=rate).start()
+    clock = FrameClock()
+    client, task = await start_client(server, clock)
+    try:
+        await asyncio.sleep(warmup)
+        server.idle()
+        await asyncio.sleep(duration)
+        return {
+            "idle_seconds": duration,
+            "connects": client.stats["connects"],
+            "stalls": client.stats["stalls"],
+            "failovers": client.stats["failovers"],
+            "idle_detected": client.stats["idle"],
+        }
+    finally:
+        await stop_client(client, task)
+        await server.stop()
+
+
+async def measure_herd(rate, clients, outage, warmup, timeout):
+    server = await PulsoidStandInServer(rate=rate).start()
+    clocks = [FrameClock() for _ in range(clients)]
+    running = [await start_client(server, clock) for clock in clocks]
+    try:
+        await asyncio.sleep(warmup)
+        started = time.monotonic()
+        server.refuse(outage)
+        recovered = await asyncio.gather(*(clock.next_after(started, timeout) for clock in clocks))
+        # 以服务恢复的时刻为零点
+        values = sorted((moment - started - outage) * 1000 for moment in recovered if moment)
+        return {
+            "clients": clients,
+            "outage_ms": outage * 1000,
+            "recovered": len(values),
+            "after_outage_p50_ms": percentile(values, 0.5),
+            "after_outage_max_ms": values[-1] if values else None,
+            "spread_stdev_ms": statistics.pstdev(values) if len(values) > 1 else 0.0,
+        }
+    finally:
+        for client, task in running:
+            await stop_client(client, task)
+        await server.stop()
+
+
+async def run(args):
+    results = {}
+    for scenario in args.scenarios:
+        if scenario == "herd":
+            results["herd"] = await measure_herd(
+                args.rate, args.clients, args.outage, args.warmup, args.timeout
+            )
+            continue
+        if scenario == "idle":
+            results["idle"] = await measure_idle(args.rate, args.warmup, args.idle_seconds)
+            print(f"idle: {results['idle']}", file=sys.stderr)
+            continue
+        variants = [True, False] if scenario == "stall" else [Config.STANDBY_ENABLED]
+        for standby in variants:
+            Config.STANDBY_ENABLED = standby
+            gaps = []
+            last = None
+            for _ in range(args.runs):
+                last = await measure_gap(args.rate, scenario, args.warmup, args.timeout, args.outage)
+                if last["gap_ms"] is not None:
+                    gaps.append(last["gap_ms"])
+            gaps.sort()
+            name = f"{scenario}_standby" if scenario == "stall" and standby else scenario
+            results[name] = {
+                "runs": args.runs,
+                "gap_p50_ms": percentile(gaps, 0.5),
+                "gap_max_ms": gaps[-1] if gaps else None,
+                "timeouts": args.runs - len(gaps),
+                "stall_timeout_ms": last["stall_timeout_ms"],
+                "last_run_stats": last["stats"],
+            }
+            print(f"{name}: {results[name]}", file=sys.stderr)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="重连数据中断基准测试")
+    parser.add_argument("--rate", type=float, default=10.0, help="替身服务器每秒推送的帧数")
+    parser.add_argument("--scenarios", nargs="+", default=["drop", "stall", "outage", "herd", "idle"],
+                        choices=["drop", "stall", "outage", "herd", "idle"])
+    parser.add_argument("--runs", type=int, default=5, help="每个场景的重复次数")
+    parser.add_argument("--warmup", type=float, default=1.5, help="注入故障前的运行时间（秒）")
+    parser.add_argument("--outage", type=float, default=2.0, help="outage/herd场景的服务中断时长（秒）")
+    parser.add_argument("--idle-seconds", type=float, default=60.0, help="idle场景传感器没有数据的时长（秒）")
+    parser.add_argument("--clients", type=int, default=20, help="herd场景的客户端数")
+    parser.add_argument("--timeout", type=float, default=60.0, help="等待恢复的超时（秒）")
+    parser.add_argument("--output", help="把JSON结果写入文件")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+    result = {
+        "rate": args.rate,
+        "config": {
+            "initial_reconnect_delay": Config.INITIAL_RECONNECT_DELAY,
+            "max_reconnect_delay": Config.MAX_RECONNECT_DELAY,
+            "stall_interval_multiplier": Config.STALL_INTERVAL_MULTIPLIER,
+            "standby_interval_multiplier": Config.STANDBY_INTERVAL_MULTIPLIER,
+            "stall_ping_timeout": Config.STALL_PING_TIMEOUT,
+        },
+        "results": asyncio.run(run(args)),
+    }
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
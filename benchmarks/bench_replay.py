@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+会话录制与回放基准测试
+1. 生成一段合成会话（默认24小时、每秒1个样本），比较二进制会话文件和等量日志文本的大小，
+   并测量录制（每样本耗时）和mmap读取的吞吐。
+2. 用 PulsoidVRChatBridge 全速回放该会话到本地OSC接收端，测量回放用时、回放的样本数（replayed）、
+   桥接处理的样本数（handled，应与replayed相同）和接收端收到的带心率的数据报数（osc_samples）。
+   全速回放不受 OSC_MAX_SEND_RATE 限速；变化驱动发送只在心率数值变化时发送，
+   合成会话的心率变化平缓，相邻样本常常相同，因此 osc_samples 少于样本数。
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from main import PulsoidVRChatBridge
+from recorder import SessionFile, SessionRecorder
+from standin import OscSink
+
+# 与 pulsoid_vrchat.log 中一行心率日志的格式相同
+LOG_LINE = "2024-01-01 12:00:00,000 - __main__ - INFO - 心率: {} bpm\n"
+
+
+def generate(path, hours, rate):
+    """写入合成会话，返回样本数和每样本录制耗时（微秒）"""
+    samples = int(hours * 3600 * rate)
+    started_at = time.time_ns() // 1000
+    interval_us = int(1e6 / rate)
+    recorder = SessionRecorder(path, flush_interval=0)
+    started = time.perf_counter()
+    for i in range(samples):
+        received_at = started_at + i * interval_us
+        heart_rate = int(75 + 25 * math.sin(i / 600) + 10 * math.sin(i / 37))
+        recorder.record(heart_rate, received_at // 1000, received_at)
+    recorder.close()
+    return samples, (time.perf_counter() - started) / samples * 1e6
+
+
+def read_throughput(path):
+    started = time.perf_counter()
+    total = 0
+    with SessionFile(path) as session:
+        count = len(session)
+        for _, _, heart_rate in session:
+            total += heart_rate
+    elapsed = time.perf_counter() - started
+    return count / elapsed, total / count
+
+
+async def replay(path):
+    sink = await OscSink.create()
+    bridge = PulsoidVRChatBridge(
+        osc_ip="127.0.0.1",
+        osc_port=sink.port,
+        serve_metrics=False,
+        replay_file=path,
+        replay_speed=0
+    )
+    started = time.perf_counter()
+    await bridge.run()
+    elapsed = time.perf_counter() - started
+    sink.close()
+    return {
+        "seconds": elapsed,
+        "replayed": bridge.replay_source.replayed,
+        "handled": bridge.samples,
+        "osc_samples": sink.samples,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="会话录制与回放基准测试")
+    parser.add_argument("--hours", type=float, default=24.0, help="合成会话时长（小时）")
+    parser.add_argument("--rate", type=float, default=1.0, help="每秒样本数")
+    parser.add_argument("--output", help="把JSON结果写入文件")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "session.phr"
+        samples, record_us = generate(path, args.hours, args.rate)
+        reads_per_second, mean_bpm = read_throughput(path)
+        log_bytes = len(LOG_LINE.format(75).encode("utf-8")) * samples
+        result = {
+            "samples": samples,
+            "file_bytes": os.path.getsize(path),
+            "equivalent_log_bytes": log_bytes,
+            "record_us_per_sample": record_us,
+            "mmap_read_samples_per_second": reads_per_second,
+            "mean_bpm": mean_bpm,
+            "replay": asyncio.run(replay(path)),
+        }
+    result["replay"]["speedup"] = samples / args.rate / result["replay"]["seconds"]
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
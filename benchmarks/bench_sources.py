@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+输入源基准测试
+1. 轮询：PulsoidPollingClient 轮询本地最新心率替身接口（1 Hz，可取到前有 --latency 秒延迟），
+   分别在传感器间隔无抖动和有 --jitter 秒抖动时，与固定间隔轮询（1 s / 0.25 s）和
+   每次请求新建会话（不复用连接）对比：每个样本的请求数、新建连接数、样本可以取到到送出的延迟。
+2. 切换：桥接以 auto 和 websocket 输入源运行，WebSocket替身在 --outage 秒内拒绝连接，
+   本地OSC接收端记录心率到达时间，比较中断开始到测试结束之间最长的数据空白和中断期间收到的样本数，
+   以及 auto 时切换到轮询和切回WebSocket的次数。
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from config import Config
+from main import PulsoidVRChatBridge
+from sources import PulsoidPollingClient
+from standin import OscSink, PulsoidRestStandIn, PulsoidStandInServer, percentile
+
+
+class FixedIntervalClient(PulsoidPollingClient):
+    """固定间隔轮询，作为对照"""
+
+    def __init__(self, *args, interval=1.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.interval = interval
+
+    def _deliver(self, *args):
+        super()._deliver(*args)
+        return self.interval
+
+    def _miss(self, sent_at=None):
+        return self.interval
+
+
+class UnpooledClient(PulsoidPollingClient):
+    """每次请求新建会话和连接，作为对照"""
+
+    async def _poll(self, session):
+        async with self._session() as own:
+            return await super()._poll(own)
+
+
+async def poll_once(factory, jitter, args):
+    server = await PulsoidRestStandIn(rate=1.0, latency=args.latency, jitter=jitter).start()
+    latencies = []
+
+    def on_heart_rate(heart_rate):
+        latencies.append((time.perf_counter_ns() - server.emitted_at[heart_rate]) / 1e6)
+
+    client = factory(on_heart_rate, server.url)
+    task = asyncio.create_task(client.run())
+    await asyncio.sleep(args.duration)
+    await client.stop()
+    await task
+    await server.stop()
+
+    # 去掉开始几个样本（还在估计采样间隔）
+    steady = sorted(latencies[args.warmup:])
+    return {
+        "samples": client.stats["samples"],
+        "polls_per_sample": client.stats["polls"] / max(1, client.stats["samples"]),
+        "not_modified": client.stats["not_modified"],
+        "connections": client.stats["connections"],
+        "latency_ms_mean": statistics.fmean(steady) if steady else None,
+        "latency_ms_p95": percentile(steady, 0.95),
+        "latency_ms_max": steady[-1] if steady else None,
+    }
+
+
+async def polling(args):
+    modes = {
+        "adaptive": lambda on, url: PulsoidPollingClient("benchmark", on, url=url),
+        "fixed_1s": lambda on, url: FixedIntervalClient("benchmark", on, url=url, interval=1.0),
+        "fixed_250ms": lambda on, url: FixedIntervalClient("benchmark", on, url=url, interval=0.25),
+        "adaptive_unpooled": lambda on, url: UnpooledClient("benchmark", on, url=url),
+    }
+    results = {}
+    for jitter in (0.0, args.jitter):
+        results[f"jitter_{jitter:g}s"] = {
+            name: await poll_once(factory, jitter, args) for name, factory in modes.items()
+        }
+    return results
+
+
+class ArrivalSink(OscSink):
+    """记录每个心率样本到达的时间"""
+
+    def __init__(self, server=None):
+        super().__init__(server)
+        self.arrivals = []
+
+    def datagram_received(self, data, addr):
+        if data.find(self.MARKER) >= 0:
+            self.arrivals.append(time.monotonic())
+
+
+async def failover_once(input_source, args):
+    websocket_server = await PulsoidStandInServer(rate=1.0).start()
+    rest_server = await PulsoidRestStandIn(rate=1.0, latency=args.latency).start()
+    sink = await ArrivalSink.create()
+    bridge = PulsoidVRChatBridge(
+        token="benchmark", osc_ip="127.0.0.1", osc_port=sink.port,
+        websocket_url=websocket_server.url, poll_url=rest_server.url, input_source=input_source,
+        serve_metrics=False, track_avatar=False
+    )
+    task = asyncio.create_task(bridge.run())
+    await asyncio.sleep(args.settle)
+    outage_started = time.monotonic()
+    websocket_server.refuse(args.outage)
+    await asyncio.sleep(args.outage)
+    outage_ended = time.monotonic()
+    await asyncio.sleep(args.settle)
+    ended = time.monotonic()
+    await bridge.shutdown()
+    await task
+
+    # 从中断前最后一个样本到测试结束，没有样本的时间也算作空白
+    before = [t for t in sink.arrivals if t < outage_started]
+    points = before[-1:] + [t for t in sink.arrivals if outage_started <= t < ended] + [ended]
+    gaps = [b - a for a, b in zip(points, points[1:])]
+    result = {
+        "max_gap_seconds": max(gaps),
+        "samples_during_outage": sum(outage_started <= t < outage_ended for t in sink.arrivals),
+        "expected_during_outage": int(args.outage),
+        "websocket_connects": bridge.websocket_client.stats["connects"],
+    }
+    if bridge.failover:
+        result["failover"] = dict(bridge.failover.stats)
+        result["polling"] = dict(bridge.polling_client.stats)
+    sink.close()
+    await websocket_server.stop()
+    await rest_server.stop()
+    return result
+
+
+async def failover(args):
+    return {source: await failover_once(source, args) for source in ("auto", "websocket")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="输入源基准测试")
+    parser.add_argument("--duration", type=float, default=40.0, help="每种轮询方式的测试时长（秒）")
+    parser.add_argument("--warmup", type=int, default=5, help="不计入延迟统计的开始样本数")
+    parser.add_argument("--latency", type=float, default=0.05, help="替身接口中样本可以取到前的延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.3, help="传感器采样间隔的抖动（秒）")
+    parser.add_argument("--outage", type=float, default=30.0, help="WebSocket中断时长（秒）")
+    parser.add_argument("--settle", type=float, default=10.0, help="中断前后的正常运行时长（秒）")
+    parser.add_argument("--output", help="把JSON结果写入文件")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    Config.METRICS_ENABLED = False
+    Config.HEARTBEAT_SYNC = False
+    Config.INTERPOLATION_ENABLED = False
+    # 中断结束后WebSocket按退避重连，限制最长等待，让恢复落在 --settle 之内
+    Config.MAX_RECONNECT_DELAY = 4
+    result = {
+        "stale_after": Config.SOURCE_STALE_AFTER,
+        "polling": asyncio.run(polling(args)),
+        "failover": asyncio.run(failover(args)),
+    }
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+样本新鲜度过滤基准测试（离线模拟，不需要网络）
+模拟每秒1个样本的会话：传感器时钟与本机相差 --skew 秒，传输延迟为基础延迟加指数抖动，
+约1%的帧与下一帧乱序到达，每 --outage-every 秒发生一次 --outage 秒的中断（中断期间的帧在恢复时集中到达），
+会话中途传感器时钟向后校正一次。比较：
+  unfiltered      全部发送
+  filtered        StalenessFilter 丢弃过时和乱序样本
+  extrapolated    StalenessFilter 并按趋势外推
+输出发送的样本数、实际年龄超过预算的样本数、发送样本的最大年龄、
+发送值与发送时刻真实心率的平均绝对误差，以及每样本处理耗时。
+"""
+
+import argparse
+import json
+import math
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from staleness import StalenessFilter
+
+
+def true_heart_rate(t):
+    return 90 + 30 * math.sin(t / 120) + 10 * math.sin(t / 17)
+
+
+def simulate(args):
+    """返回按到达顺序排列的 (到达时间, measured_at毫秒, 心率, 测量时刻)"""
+    rng = random.Random(args.seed)
+    frames = []
+    jump_at = args.duration / 2
+    for second in range(int(args.duration)):
+        t = float(second)
+        skew = args.skew + (args.clock_jump if t >= jump_at else 0.0)
+        measured_at = int((t - skew) * 1000)
+        arrival = t + args.latency + rng.expovariate(1 / args.jitter)
+        phase = t % args.outage_every
+        if args.outage_every - args.outage <= phase:
+            # 中断期间的帧在恢复时集中到达
+            arrival = max(arrival, t - phase + args.outage_every + 0.01 * (phase - args.outage_every + args.outage))
+        frames.append([arrival, measured_at, round(true_heart_rate(t)), t])
+    frames.sort()
+    # 约1%的帧被额外延迟到下一帧之后到达
+    for i in range(len(frames) - 1):
+        if rng.random() < 0.01:
+            frames[i][0] = frames[i + 1][0] + 0.005
+    frames.sort()
+    return frames
+
+
+def evaluate(frames, staleness, budget):
+    delivered = 0
+    late = 0
+    max_age = 0.0
+    error = 0.0
+    started = time.perf_counter_ns()
+    for arrival, measured_at, heart_rate, t in frames:
+        value = heart_rate
+        if staleness is not None:
+            value = staleness.admit(heart_rate, measured_at, arrival)
+            if value is None:
+                continue
+        delivered += 1
+        age = arrival - t
+        max_age = max(max_age, age)
+        if age > budget:
+            late += 1
+        error += abs(value - true_heart_rate(arrival))
+    elapsed = time.perf_counter_ns() - started
+    return {
+        "delivered": delivered,
+        "older_than_budget": late,
+        "max_age_s": max_age,
+        "mean_abs_error_bpm": error / delivered if delivered else None,
+        "ns_per_sample": elapsed / len(frames),
+        "filter": staleness.stats() if staleness is not None else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="样本新鲜度过滤基准测试")
+    parser.add_argument("--duration", type=float, default=3600, help="会话时长（秒）")
+    parser.add_argument("--skew", type=float, default=37.0, help="本机时钟领先传感器的秒数")
+    parser.add_argument("--clock-jump", type=float, default=5.0, help="会话中途传感器时钟向后校正的秒数")
+    parser.add_argument("--latency", type=float, default=0.08, help="基础传输延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.03, help="指数抖动的均值（秒）")
+    parser.add_argument("--outage", type=float, default=6.0, help="每次中断的时长（秒）")
+    parser.add_argument("--outage-every", type=float, default=300.0, help="中断间隔（秒）")
+    parser.add_argument("--budget", type=float, default=3.0, help="MAX_SAMPLE_AGE")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="把JSON结果写入文件")
+    args = parser.parse_args()
+
+    frames = simulate(args)
+    # 判定"过时"的标准：比基础传输延迟多等待超过预算
+    budget = args.latency + args.budget
+    result = {
+        "samples": len(frames),
+        "unfiltered": evaluate(frames, None, budget),
+        "filtered": evaluate(frames, StalenessFilter(max_age=args.budget, extrapolate=False), budget),
+        "extrapolated": evaluate(frames, StalenessFilter(max_age=args.budget, extrapolate=True), budget),
+    }
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+冷启动基准测试
+1. 用 python -X importtime 统计导入 main 模块的耗时，列出最慢的模块，
+   并检查只在连接后才需要的重量级依赖是否已经推迟导入。
+2. 以子进程方式启动 main.py（连接本地Pulsoid替身服务器和OSC接收端），
+   测量从进程启动到收到第一个OSC数据报、以及第一个心率数据报的时间。
+结果以JSON输出，便于跨版本跟踪。
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from standin import PulsoidStandInServer, percentile
+
+# 启动时不应导入的模块（推迟到真正需要时）
+DEFERRED_MODULES = ("websockets", "pythonosc", "colorama", "webbrowser", "uuid", "aiohttp")
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s+)(\S+)")
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+            capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def measure_imports(runs, top):
+    """多次运行 -X importtime，返回 main 的累计导入耗时和最慢的顶层模块"""
+    totals = []
+    modules = {}
+    loaded = set()
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import main"],
+            cwd=ROOT, capture_output=True, text=True
+        )
+        for line in result.stderr.splitlines():
+            match = _IMPORTTIME_LINE.match(line)
+            if not match:
+                continue
+            cumulative = int(match.group(2))
+            depth = (len(match.group(3)) - 1) // 2
+            name = match.group(4)
+            loaded.add(name.split(".")[0])
+            if name == "main" and depth == 0:
+                totals.append(cumulative)
+            elif depth <= 1:
+                modules.setdefault(name, []).append(cumulative)
+
+    slowest = sorted(
+        ((name, sorted(values)[len(values) // 2]) for name, values in modules.items()),
+        key=lambda item: item[1], reverse=True
+    )[:top]
+    totals.sort()
+    return {
+        "main_import_ms": totals[len(totals) // 2] / 1000 if totals else None,
+        "slowest_modules_ms": {name: value / 1000 for name, value in slowest},
+        "deferred_modules_loaded": [name for name in DEFERRED_MODULES if name in loaded],
+    }
+
+
+class FirstPacketSink(asyncio.DatagramProtocol):
+    """记录第一个数据报和第一个心率数据报的到达时间"""
+
+    MARKER = b"/avatar/parameters/Heartrate3\x00"
+
+    def __init__(self):
+        self.first_packet = None
+        self.first_heart_rate = None
+        self.done = asyncio.Event()
+
+    def datagram_received(self, data, addr):
+        now = time.perf_counter()
+        if self.first_packet is None:
+            self.first_packet = now
+        if self.first_heart_rate is None and self.MARKER in data:
+            self.first_heart_rate = now
+            self.done.set()
+
+    def reset(self):
+        self.first_packet = None
+        self.first_heart_rate = None
+        self.done.clear()
+
+
+async def measure_first_packet(runs, timeout):
+    server = await PulsoidStandInServer(rate=10).start()
+    loop = asyncio.get_running_loop()
+    transport, sink = await loop.create_datagram_endpoint(
+        FirstPacketSink, local_addr=("127.0.0.1", 0)
+    )
+    port = transport.get_extra_info("sockname")[1]
+
+    first_packet = []
+    first_heart_rate = []
+    try:
+        # 在临时目录中运行，避免读写仓库里的token文件和日志
+        with tempfile.TemporaryDirectory() as cwd:
+            for _ in range(runs):
+                sink.reset()
+                started = time.perf_counter()
+                process = await asyncio.create_subprocess_exec(
+                    sys.executable, str(ROOT / "main.py"),
+                    "--token", "benchmark",
+                    "--websocket-url", server.url,
+                    "--osc", f"127.0.0.1:{port}",
+                    cwd=cwd,
+                    stdout=asyncio.subprocess.DEVNULL,
+                    stderr=asyncio.subprocess.DEVNULL,
+                    env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+                )
+                try:
+                    await asyncio.wait_for(sink.done.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                finally:
+                    process.terminate()
+                    await process.wait()
+
+                if sink.first_packet is not None:
+                    first_packet.append(sink.first_packet - started)
+                if sink.first_heart_rate is not None:
+                    first_heart_rate.append(sink.first_heart_rate - started)
+    finally:
+        transport.close()
+        await server.stop()
+
+    def summarize(values):
+        values = sorted(values)
+        if not values:
+            return {"p50_ms": None, "max_ms": None}
+        return {"p50_ms": percentile(values, 0.5) * 1000, "max_ms": values[-1] * 1000}
+
+    return {
+        "runs": runs,
+        "first_packet": summarize(first_packet),
+        "first_heart_rate": summarize(first_heart_rate),
+        "timeouts": runs - len(first_heart_rate),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="冷启动基准测试")
+    parser.add_argument("--runs", type=int, default=10, help="重复次数，取中位数")
+    parser.add_argument("--top", type=int, default=10, help="列出最慢的模块数")
+    parser.add_argument("--timeout", type=float, default=10.0, help="等待第一个心率数据报的超时（秒）")
+    parser.add_argument("--output", help="把JSON结果写入文件")
+    args = parser.parse_args()
+
+    result = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "imports": measure_imports(args.runs, args.top),
+        "startup": asyncio.run(measure_first_packet(args.runs, args.timeout)),
+    }
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
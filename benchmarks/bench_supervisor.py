@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+多进程监督模式扩展性基准测试
+本地替身服务器在独立进程中为每个租户按 --rate 推送心率帧，
+supervisor.py 分别用 1/2/4/8 个工作进程运行 --tenants 个租户，测量稳定后的：
+  samples_per_second   所有工作进程每秒处理的样本数（期望值为 租户数 × rate）
+  delivery_ratio       处理样本数 / 期望样本数
+  cpu_us_per_sample    工作进程CPU时间 / 样本数
+  osc_datagrams        本地OSC接收端每秒收到的数据报
+  rss_bytes            所有工作进程的常驻内存之和
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from config import Config
+from standin import OscSink, PulsoidStandInServer
+from supervisor import ShardedSupervisor
+
+WORKER_COUNTS = (1, 2, 4, 8)
+
+
+def standin_main(rate, ports):
+    """替身服务器进程：启动后把端口发回基准进程，直到被结束"""
+    async def serve():
+        server = await PulsoidStandInServer(rate=rate).start()
+        ports.send(server.port)
+        ports.close()
+        await asyncio.Event().wait()
+
+    asyncio.run(serve())
+
+
+def start_standins(count, rate):
+    context = multiprocessing.get_context("spawn")
+    processes, urls = [], []
+    for _ in range(count):
+        receiver, sender = context.Pipe(duplex=False)
+        process = context.Process(target=standin_main, args=(rate, sender), daemon=True)
+        process.start()
+        sender.close()
+        urls.append(f"ws://127.0.0.1:{receiver.recv()}/api/v1/data/real_time")
+        receiver.close()
+        processes.append(process)
+    return processes, urls
+
+
+def write_tenants(path, count, urls, osc_port):
+    tenants = [
+        {
+            "name": f"tenant{i}",
+            "token": "standin",
+            "osc": f"127.0.0.1:{osc_port}",
+            "websocket_url": urls[i % len(urls)],
+        }
+        for i in range(count)
+    ]
+    Path(path).write_text(json.dumps({"tenants": tenants}), encoding="utf-8")
+
+
+async def measure(path, workers, args, sink):
+    supervisor = ShardedSupervisor(
+        path, workers=workers, report_interval=args.report_interval, log_level=logging.WARNING
+    )
+    task = asyncio.create_task(supervisor.run())
+    await asyncio.sleep(args.warmup)
+
+    before = supervisor.report()
+    sink.reset()
+    started = time.monotonic()
+    await asyncio.sleep(args.duration)
+    after = supervisor.report()
+    elapsed = time.monotonic() - started
+    datagrams = sink.datagrams
+
+    await supervisor.shutdown()
+    await task
+
+    samples = after["samples"] - before["samples"]
+    cpu = after["cpu_seconds"] - before["cpu_seconds"]
+    expected = args.tenants * args.rate
+    return {
+        "workers_started": after["workers"],
+        "active_tenants": after["active"],
+        "samples_per_second": samples / elapsed,
+        "delivery_ratio": samples / elapsed / expected,
+        "cpu_us_per_sample": cpu / samples * 1e6 if samples else None,
+        "osc_datagrams_per_second": datagrams / elapsed,
+        "rss_bytes": after["rss_bytes"],
+    }
+
+
+async def run(args, path, urls):
+    sink = await OscSink.create()
+    write_tenants(path, args.tenants, urls, sink.port)
+    results = {}
+    for workers in args.workers:
+        results[str(workers)] = await measure(path, workers, args, sink)
+    sink.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多进程监督模式扩展性基准测试")
+    parser.add_argument("--tenants", type=int, default=64)
+    parser.add_argument("--rate", type=float, default=20.0, help="每个租户每秒的心率帧数")
+    parser.add_argument("--workers", type=int, nargs="+", default=list(WORKER_COUNTS))
+    parser.add_argument("--standins", type=int, default=1, help="替身服务器进程数")
+    parser.add_argument("--warmup", type=float, default=3.0)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--report-interval", type=float, default=0.5)
+    parser.add_argument("--output", help="把JSON结果写入文件")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    Config.METRICS_PORT = None
+    processes, urls = start_standins(args.standins, args.rate)
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "tenants.json")
+            results = asyncio.run(run(args, path, urls))
+    finally:
+        for process in processes:
+            process.kill()
+
+    result = {
+        "cpu_count": os.cpu_count(),
+        "tenants": args.tenants,
+        "rate": args.rate,
+        "expected_samples_per_second": args.tenants * args.rate,
+        "workers": results,
+    }
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
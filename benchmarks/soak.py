@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+长时间运行内存测试
+生成 --days 天的合成会话（每秒 --rate 个样本），用 PulsoidVRChatBridge 全速回放到本地OSC接收端，
+心率日志写入按大小轮转的日志文件。滑动平均使用按样本推进的模拟时钟，窗口按会话时间正常滚动。
+每 --checkpoint-hours 会话小时等待日志队列写空、执行gc后记录一次tracemalloc总量和RSS，
+预热（--warmup-hours）之后的增长超过容差时以非零状态退出，并列出增长最多的分配位置。
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import logger as bridge_logger
+import rolling_stats
+from bench_replay import generate
+from config import Config
+from main import PulsoidVRChatBridge
+from standin import OscSink
+from tenants import current_rss
+
+
+async def drain_log_queue():
+    """等待后台日志线程写完队列中的记录，返回等待前的队列长度"""
+    listener = bridge_logger._queue_listener
+    if listener is None:
+        return 0
+    depth = listener.queue.qsize()
+    while listener.queue.qsize():
+        await asyncio.sleep(0.01)
+    return depth
+
+
+def slope_per_hour(points):
+    """最小二乘斜率（字节/会话小时）"""
+    if len(points) < 2:
+        return 0.0
+    xs = [x for x, _ in points]
+    ys = [y for _, y in points]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    denominator = sum((x - mean_x) ** 2 for x in xs)
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / denominator if denominator else 0.0
+
+
+async def soak(path, args):
+    sink = await OscSink.create()
+    bridge = PulsoidVRChatBridge(
+        osc_ip="127.0.0.1",
+        osc_port=sink.port,
+        serve_metrics=False,
+        track_avatar=False,
+        replay_file=path,
+        replay_speed=0
+    )
+    # 滑动平均的时间按样本推进，会话时间而不是实际时间
+    rolling_stats.time = types.SimpleNamespace(monotonic=lambda: bridge.samples / args.rate)
+
+    checkpoint_samples = int(args.checkpoint_hours * 3600 * args.rate)
+    checkpoints = []
+    snapshots = {}
+    run_task = asyncio.create_task(bridge.run())
+    next_checkpoint = checkpoint_samples
+    max_log_queue = 0
+    while not run_task.done():
+        await asyncio.sleep(0.05)
+        if bridge.samples < next_checkpoint and not run_task.done():
+            continue
+        max_log_queue = max(max_log_queue, await drain_log_queue())
+        gc.collect()
+        hours = bridge.samples / args.rate / 3600
+        traced, _ = tracemalloc.get_traced_memory()
+        checkpoints.append({"hours": hours, "traced_bytes": traced, "rss_bytes": current_rss()})
+        if hours >= args.warmup_hours and "warm" not in snapshots:
+            snapshots["warm"] = tracemalloc.take_snapshot()
+        next_checkpoint += checkpoint_samples
+    snapshots["end"] = tracemalloc.take_snapshot()
+    await run_task
+    sink.close()
+    return bridge, checkpoints, snapshots, max_log_queue
+
+
+def main():
+    parser = argparse.ArgumentParser(description="长时间运行内存测试")
+    parser.add_argument("--days", type=float, default=3.0, help="合成会话时长（天）")
+    parser.add_argument("--rate", type=float, default=1.0, help="每秒样本数")
+    parser.add_argument("--checkpoint-hours", type=float, default=6.0)
+    parser.add_argument("--warmup-hours", type=float, default=6.0)
+    parser.add_argument("--traced-tolerance-kb", type=float, default=64.0, help="预热后tracemalloc总量允许的增长")
+    parser.add_argument("--rss-tolerance-mb", type=float, default=4.0, help="预热后RSS允许的增长")
+    parser.add_argument("--log-max-bytes", type=int, default=1024 * 1024, help="测试中日志文件的轮转大小")
+    parser.add_argument("--output", help="把JSON结果写入文件")
+    args = parser.parse_args()
+
+    Config.METRICS_LOG_INTERVAL = 0
+    Config.LOG_BACKUP_COUNT = 2
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "session.phr"
+        samples, _ = generate(path, args.days * 24, args.rate)
+        # 日志文件写到临时目录
+        os.chdir(directory)
+        bridge_logger.setup_logging(
+            level=logging.INFO, log_to_file=True, use_queue=True,
+            max_bytes=args.log_max_bytes, log_to_console=False
+        )
+        tracemalloc.start(1)
+        started = time.perf_counter()
+        bridge, checkpoints, snapshots, max_log_queue = asyncio.run(soak(path, args))
+        elapsed = time.perf_counter() - started
+        bridge_logger.stop_logging()
+        tracemalloc.stop()
+        log_files = sorted(Path(directory).glob("pulsoid_vrchat.log*"))
+        log_bytes = sum(file.stat().st_size for file in log_files)
+        os.chdir(Path(__file__).resolve().parent)
+
+    warm = next(point for point in checkpoints if point["hours"] >= args.warmup_hours)
+    end = checkpoints[-1]
+    after_warmup = [point for point in checkpoints if point["hours"] >= args.warmup_hours]
+    traced_growth = end["traced_bytes"] - warm["traced_bytes"]
+    rss_growth = end["rss_bytes"] - warm["rss_bytes"] if end["rss_bytes"] and warm["rss_bytes"] else 0
+    passed = (
+        traced_growth <= args.traced_tolerance_kb * 1024
+        and rss_growth <= args.rss_tolerance_mb * 1024 * 1024
+    )
+    result = {
+        "session_days": args.days,
+        "samples": samples,
+        "handled": bridge.samples,
+        "seconds": elapsed,
+        "traced_growth_bytes": traced_growth,
+        "traced_slope_bytes_per_hour": slope_per_hour([(p["hours"], p["traced_bytes"]) for p in after_warmup]),
+        "rss_growth_bytes": rss_growth,
+        "max_log_queue": max_log_queue,
+        "log_files": len(log_files),
+        "log_bytes": log_bytes,
+        "log_cap_bytes": args.log_max_bytes * (Config.LOG_BACKUP_COUNT + 1),
+        "checkpoints": checkpoints,
+        "passed": passed,
+    }
+    if not passed:
+        result["top_growth"] = [
+            str(stat) for stat in snapshots["end"].compare_to(snapshots["warm"], "lineno")[:10]
+        ]
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+本地Pulsoid替身服务器（WebSocket实时接口和HTTP最新心率接口）和OSC接收端
+用于在不连接 wss://dev.pulsoid.net 的情况下测试和测量桥接程序
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import struct
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import websockets
+
+from osc_bundle import osc_string
+
+# 心率取值循环范围，用于在接收端把OSC数据报对应回发送时间
+HEART_RATE_MIN = 40
+HEART_RATE_SPAN = 160
+
+_INT32 = struct.Struct(">i")
+
+
+def percentile(sorted_values, fraction):
+    """已排序列表的百分位数（最近秩）"""
+    if not sorted_values:
+        return None
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+class PulsoidStandInServer:
+    """模拟Pulsoid实时接口的WebSocket服务器
+
+    每个连接按固定频率推送 {"measured_at": ..., "data": {"heart_rate": ...}} 帧，
+    并记录每个心率值最近一次的发送时间（perf_counter_ns），供接收端计算延迟。
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, rate: float = 1.0):
+        self.host = host
+        self.port = port
+        self.rate = rate
+        self.server = None
+        self.sent = 0
+        self.emitted_at = [0] * (HEART_RATE_MIN + HEART_RATE_SPAN)
+        self._sequence = 0
+        # 故障注入：当前连接、半开的连接、传感器没有数据的连接、拒绝新连接的截止时间
+        self.connections = set()
+        self.stalled = set()
+        self.idle_connections = set()
+        self.refuse_until = 0.0
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}/api/v1/data/real_time"
+
+    async def start(self):
+        self.server = await websockets.serve(self._handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self.server:
+            # 半开的连接不读取数据，收不到关闭握手，直接断开
+            self.drop_stalled()
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+
+    def next_frame(self):
+        """生成下一帧并记录发送时间"""
+        heart_rate = HEART_RATE_MIN + self._sequence % HEART_RATE_SPAN
+        self._sequence += 1
+        self.emitted_at[heart_rate] = time.perf_counter_ns()
+        return json.dumps({
+            "measured_at": int(time.time() * 1000),
+            "data": {"heart_rate": heart_rate}
+        })
+
+    def drop(self):
+        """直接断开所有当前连接（不做关闭握手），模拟网络中断"""
+        for websocket in list(self.connections):
+            websocket.transport.abort()
+
+    def stall(self):
+        """让所有当前连接停止推送并停止读取（ping没有pong），模拟半开连接"""
+        for websocket in self.connections:
+            websocket.transport.pause_reading()
+        self.stalled.update(self.connections)
+
+    def drop_stalled(self):
+        for websocket in list(self.stalled):
+            websocket.transport.abort()
+
+    def idle(self):
+        """让所有当前连接停止推送但保持正常（ping照常响应），模拟传感器没有数据（例如手表被摘下）"""
+        self.idle_connections.update(self.connections)
+
+    def refuse(self, duration: float):
+        """断开所有当前连接，并在接下来的duration秒内立即关闭新连接，模拟服务中断"""
+        self.refuse_until = asyncio.get_running_loop().time() + duration
+        self.drop()
+
+    async def _handle(self, websocket, path=None):
+        loop = asyncio.get_running_loop()
+        if loop.time() < self.refuse_until:
+            await websocket.close(1013, "try again later")
+            return
+        self.connections.add(websocket)
+        started = loop.time()
+        emitted = 0
+        try:
+            while True:
+                if websocket in self.stalled or websocket in self.idle_connections:
+                    await websocket.wait_closed()
+                    return
+                # 按绝对时间计算应发送的帧数，高频率时每次唤醒批量发送
+                due = int((loop.time() - started) * self.rate) + 1
+                while emitted < due:
+                    await websocket.send(self.next_frame())
+                    emitted += 1
+                    self.sent += 1
+                await asyncio.sleep(max(0.0, started + emitted / self.rate - loop.time()))
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            self.connections.discard(websocket)
+            self.stalled.discard(websocket)
+            self.idle_connections.discard(websocket)
+
+
+class PulsoidRestStandIn:
+    """模拟Pulsoid最新心率接口（GET /api/v1/data/heart_rate/latest）的HTTP服务器
+
+    传感器按 rate 产生样本，第n个样本在 n/rate 秒加上 [0, jitter) 秒的随机抖动时测量，
+    再过 latency 秒才能从接口取到。响应带 ETag，请求的 If-None-Match 相同时返回304。
+    emitted_at 记录每个心率值可以取到的时间（perf_counter_ns），与 OscSink 配合计算延迟。
+    """
+
+    PATH = "/api/v1/data/heart_rate/latest"
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, rate: float = 1.0,
+                 latency: float = 0.05, jitter: float = 0.0, etag: bool = True):
+        self.host = host
+        self.port = port
+        self.rate = rate
+        self.latency = latency
+        self.jitter = jitter
+        self.etag = etag
+        self.runner = None
+        self.started = None
+        self.emitted_at = [0] * (HEART_RATE_MIN + HEART_RATE_SPAN)
+        self.requests = 0
+        self.not_modified = 0
+        self.unavailable_until = 0.0
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}{self.PATH}"
+
+    async def start(self):
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_get(self.PATH, self._handle)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.host, self.port)
+        await site.start()
+        self.port = self.runner.addresses[0][1]
+        self.started = (time.time(), time.perf_counter_ns())
+        return self
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
+
+    def fail(self, duration: float):
+        """在接下来的duration秒内返回503"""
+        self.unavailable_until = time.monotonic() + duration
+
+    def _measured(self, n):
+        """第n个样本的测量时间（相对启动的秒数）"""
+        return n / self.rate + self.jitter * random.Random(n).random()
+
+    def latest(self):
+        """当前可以取到的最新样本序号，还没有样本时返回None"""
+        elapsed = time.time() - self.started[0] - self.latency
+        n = math.floor(elapsed * self.rate)
+        while n >= 0 and self._measured(n) > elapsed:
+            n -= 1
+        return n if n >= 0 else None
+
+    async def _handle(self, request):
+        from aiohttp import web
+
+        self.requests += 1
+        if time.monotonic() < self.unavailable_until:
+            return web.Response(status=503)
+        n = self.latest()
+        if n is None:
+            return web.Response(status=412)
+        heart_rate = HEART_RATE_MIN + n % HEART_RATE_SPAN
+        measured = self._measured(n)
+        self.emitted_at[heart_rate] = self.started[1] + int((measured + self.latency) * 1e9)
+        headers = {}
+        if self.etag:
+            headers["ETag"] = f'"{n}"'
+            if request.headers.get("If-None-Match") == headers["ETag"]:
+                self.not_modified += 1
+                return web.Response(status=304, headers=headers)
+        body = json.dumps({
+            "measured_at": int((self.started[0] + measured) * 1000),
+            "data": {"heart_rate": heart_rate}
+        })
+        return web.Response(text=body, content_type="application/json", headers=headers)
+
+
+class OscSink(asyncio.DatagramProtocol):
+    """本地OSC接收端，记录每个心率样本从替身服务器发出到OSC到达的延迟"""
+
+    MARKER = b"/avatar/parameters/Heartrate3\x00\x00\x00,i\x00\x00"
+
+    def __init__(self, server: PulsoidStandInServer = None):
+        self.server = server
+        self.transport = None
+        self.datagrams = 0
+        self.samples = 0
+        self.latencies_ns = []
+
+    @property
+    def port(self):
+        return self.transport.get_extra_info("sockname")[1]
+
+    @classmethod
+    async def create(cls, server=None, host="127.0.0.1", port=0):
+        loop = asyncio.get_running_loop()
+        _, sink = await loop.create_datagram_endpoint(
+            lambda: cls(server), local_addr=(host, port)
+        )
+        return sink
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        arrived = time.perf_counter_ns()
+        self.datagrams += 1
+        offset = data.find(self.MARKER)
+        if offset < 0:
+            return
+        self.samples += 1
+        if self.server is not None:
+            heart_rate = _INT32.unpack_from(data, offset + len(self.MARKER))[0]
+            if 0 <= heart_rate < len(self.server.emitted_at):
+                emitted = self.server.emitted_at[heart_rate]
+                if emitted:
+                    self.latencies_ns.append(arrived - emitted)
+
+    def reset(self):
+        self.datagrams = 0
+        self.samples = 0
+        self.latencies_ns = []
+
+    def close(self):
+        if self.transport:
+            self.transport.close()
+
+
+class VRChatOutputStandIn:
+    """模拟VRChat的OSC输出：写出模型OSC配置文件，并发送 /avatar/change
+
+    avatars: {模型ID: [参数名, ...]}，配置文件按VRChat的目录结构写到 directory 下。
+    每次切换模型后，和VRChat一样再发送该模型的各个参数值。
+    """
+
+    USER_ID = "usr_00000000-0000-0000-0000-000000000000"
+
+    def __init__(self, directory, avatars, host: str = "127.0.0.1", port: int = 9001):
+        self.directory = Path(directory)
+        self.avatars = avatars
+        self.host = host
+        self.port = port
+        self.transport = None
+        self.changes = 0
+
+    def write_configs(self):
+        avatars_dir = self.directory / self.USER_ID / "Avatars"
+        avatars_dir.mkdir(parents=True, exist_ok=True)
+        for avatar_id, names in self.avatars.items():
+            config = {
+                "id": avatar_id,
+                "name": avatar_id,
+                "parameters": [
+                    {
+                        "name": name,
+                        "input": {"address": f"/avatar/parameters/{name}", "type": "Float"},
+                        "output": {"address": f"/avatar/parameters/{name}", "type": "Float"},
+                    }
+                    for name in names
+                ],
+            }
+            # VRChat写出的文件带BOM
+            path = avatars_dir / f"{avatar_id}.json"
+            path.write_text(json.dumps(config, indent=2), encoding="utf-8-sig")
+        return self
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        self.transport, _ = await loop.create_datagram_endpoint(
+            asyncio.DatagramProtocol, remote_addr=(self.host, self.port)
+        )
+        return self
+
+    def change(self, avatar_id: str):
+        self.transport.sendto(
+            osc_string("/avatar/change") + osc_string(",s") + osc_string(avatar_id)
+        )
+        for name in self.avatars.get(avatar_id, []):
+            self.transport.sendto(
+                osc_string(f"/avatar/parameters/{name}") + osc_string(",f") + b"\x00\x00\x00\x00"
+            )
+        self.changes += 1
+
+    def close(self):
+        if self.transport:
+            self.transport.close()
+
+
+async def serve_forever(args):
+    server = await PulsoidStandInServer(args.host, args.port, args.rate).start()
+    print(f"Pulsoid替身服务器: {server.url} ({args.rate} 帧/秒)")
+    rest = None
+    if args.rest_port is not None:
+        rest = await PulsoidRestStandIn(args.host, args.rest_port, args.rate).start()
+        print(f"最新心率替身接口: {rest.url}")
+    sink = None
+    if args.osc_port is not None:
+        sink = await OscSink.create(server, args.host, args.osc_port)
+        print(f"OSC接收端: {args.host}:{sink.port}")
+    vrchat = None
+    if args.avatar_dir:
+        # 轮流切换两个参数不同的模型
+        vrchat = VRChatOutputStandIn(args.avatar_dir, {
+            "avtr_standin-full": ["Heartrate", "HeartRateFloat", "Heartrate2", "HeartRateFloat01",
+                                  "Heartrate3", "HeartRateInt", "HeartBeatToggle", "PulsoidConnected"],
+            "avtr_standin-small": ["HeartRateInt", "HeartBeatToggle"],
+        }, args.host, args.avatar_port).write_configs()
+        await vrchat.start()
+        print(f"VRChat模型配置: {args.avatar_dir}，模型切换发送到 {args.host}:{args.avatar_port}")
+    try:
+        while True:
+            await asyncio.sleep(5)
+            if sink:
+                print(f"已发送 {server.sent} 帧，OSC收到 {sink.samples} 个样本")
+            if rest:
+                print(f"最新心率接口收到 {rest.requests} 次请求（304 {rest.not_modified} 次）")
+            if vrchat:
+                avatar_id = list(vrchat.avatars)[vrchat.changes % len(vrchat.avatars)]
+                vrchat.change(avatar_id)
+                print(f"切换模型: {avatar_id}")
+    finally:
+        await server.stop()
+        if rest:
+            await rest.stop()
+        if sink:
+            sink.close()
+        if vrchat:
+            vrchat.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rate", type=float, default=1.0, help="每个连接每秒推送的帧数")
+    parser.add_argument("--osc-port", type=int, default=None, help="同时启动OSC接收端")
+    parser.add_argument("--rest-port", type=int, default=None, help="同时启动最新心率HTTP替身接口（用于 --poll-url）")
+    parser.add_argument("--avatar-dir", default=None,
+                        help="写出模型OSC配置到该目录，并每5秒发送一次模型切换（配合 VRCHAT_OSC_DIR）")
+    parser.add_argument("--avatar-port", type=int, default=9001, help="模型切换发送到的端口")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve_forever(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
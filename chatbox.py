@@ -0,0 +1,171 @@
+"""
+VRChat聊天框心率输出（/chatbox/input）
+
+- 令牌桶限速：每 CHATBOX_INTERVAL 秒补充一个令牌，最多积累 CHATBOX_BURST 个，任何输入频率下都不超过上限；
+  没有令牌时只保留最新的一条，拿到下一个令牌时发送
+- 模板只在显示的数值变化时渲染，渲染结果按数值缓存为编码好的OSC消息，数值来回变化时也不重复渲染
+- 显示内容不变时每 CHATBOX_REFRESH_INTERVAL 秒重发一次（同样消耗令牌）
+"""
+
+import asyncio
+import logging
+import time
+from typing import Callable
+
+from config import Config
+from osc_bundle import osc_string
+
+logger = logging.getLogger(__name__)
+
+CHATBOX_ADDRESS = "/chatbox/input"
+# VRChat聊天框最多显示144个字符
+MAX_CHATBOX_LENGTH = 144
+
+
+def chatbox_prefix(sound: bool = False) -> bytes:
+    """/chatbox/input 消息中文本之前的部分：地址和类型标签（文本、立即发送不打开键盘、是否播放提示音）"""
+    return osc_string(CHATBOX_ADDRESS) + osc_string(",sTT" if sound else ",sTF")
+
+
+def chatbox_message(text: str, sound: bool = False) -> bytes:
+    """编码一条聊天框消息，超出长度的文本被截断"""
+    return chatbox_prefix(sound) + osc_string(text[:MAX_CHATBOX_LENGTH])
+
+
+class TokenBucket:
+    """令牌桶：每 interval 秒补充一个令牌，最多 burst 个，初始为满"""
+
+    __slots__ = ("interval", "burst", "tokens", "updated_at")
+
+    def __init__(self, interval: float, burst: int = 1):
+        self.interval = interval
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated_at = None
+
+    def _refill(self, now: float):
+        if self.updated_at is not None and now > self.updated_at:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated_at) / self.interval)
+        self.updated_at = now
+
+    def take(self, now: float) -> bool:
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def delay(self, now: float) -> float:
+        """距离下一个令牌的秒数"""
+        self._refill(now)
+        return max(0.0, (1 - self.tokens) * self.interval)
+
+
+class ChatboxOutput:
+    """把心率渲染为聊天框文本并限速发送，send 接收编码好的OSC消息"""
+
+    def __init__(self, send: Callable[[bytes], int], template: str = None, interval: float = None,
+                 burst: int = None, refresh_interval: float = None, sound: bool = None, cache_size: int = 256):
+        self.send = send
+        self.template = template or Config.CHATBOX_TEMPLATE
+        # 模板错误在启动时报告，而不是每个样本都渲染失败
+        try:
+            self.template.format(bpm=0)
+        except (KeyError, IndexError, ValueError, AttributeError, TypeError) as e:
+            raise ValueError(f"聊天框模板无效（只能使用 {{bpm}}）: {self.template!r} ({e!r})") from None
+        self.bucket = TokenBucket(
+            Config.CHATBOX_INTERVAL if interval is None else interval,
+            Config.CHATBOX_BURST if burst is None else burst
+        )
+        self.refresh_interval = Config.CHATBOX_REFRESH_INTERVAL if refresh_interval is None else refresh_interval
+        self._prefix = chatbox_prefix(Config.CHATBOX_SOUND if sound is None else sound)
+        # 显示值 -> 编码好的消息，超过 cache_size 时淘汰最早加入的
+        self._cache = {}
+        self.cache_size = cache_size
+        # 当前应显示的数值、等待令牌的消息和最后一次发送的时间
+        self.value = None
+        self.pending = None
+        self.last_sent = float('-inf')
+        self._handle = None
+        self.updates = 0
+        self.renders = 0
+        self.sent = 0
+        self.deferred = 0
+        self.replaced = 0
+        self.refreshes = 0
+
+    def update(self, heart_rate, now: float = None):
+        self.updates += 1
+        value = round(heart_rate)
+        if now is None:
+            now = time.monotonic()
+        if value == self.value:
+            # 显示内容不变，只在需要时重发
+            if (self.refresh_interval and self.pending is None and self._handle is None
+                    and now - self.last_sent >= self.refresh_interval):
+                self.refreshes += 1
+                self._offer(self._message(value), now)
+            return
+        self.value = value
+        self._offer(self._message(value), now)
+
+    def _message(self, value):
+        message = self._cache.get(value)
+        if message is None:
+            self.renders += 1
+            message = self._prefix + osc_string(self.template.format(bpm=value)[:MAX_CHATBOX_LENGTH])
+            if len(self._cache) >= self.cache_size:
+                del self._cache[next(iter(self._cache))]
+            self._cache[value] = message
+        return message
+
+    def _offer(self, message, now):
+        if self._handle is not None:
+            # 已经在等待令牌，只替换要发送的内容
+            self.pending = message
+            self.replaced += 1
+            return
+        if self.bucket.take(now):
+            self._send(message, now)
+            return
+        self.pending = message
+        self.deferred += 1
+        self._schedule(now)
+
+    def _schedule(self, now):
+        loop = asyncio.get_running_loop()
+        self._handle = loop.call_later(self.bucket.delay(now), self._send_pending)
+
+    def _send_pending(self):
+        self._handle = None
+        message = self.pending
+        if message is None:
+            return
+        now = time.monotonic()
+        if not self.bucket.take(now):
+            # 定时器比令牌早到（时钟精度），再等一次
+            self._schedule(now)
+            return
+        self.pending = None
+        self._send(message, now)
+
+    def _send(self, message, now):
+        self.last_sent = now
+        if self.send(message):
+            self.sent += 1
+
+    def stop(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        self.pending = None
+
+    def stats(self):
+        return {
+            "updates": self.updates,
+            "renders": self.renders,
+            "sent": self.sent,
+            "deferred": self.deferred,
+            "replaced": self.replaced,
+            "refreshes": self.refreshes,
+        }
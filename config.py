@@ -1,44 +1,204 @@
-import base64
-import uuid
+import binascii
 
 class Config:
     # Pulsoid API配置
     PULSOID_BASE_URL = "https://pulsoid.net/oauth2/authorize"
-    PULSOID_CLIENT_ID = base64.b64decode("ZGZhY2U5Y2EtMGZjYi00YjMxLTg4NzQtZGQ0YWRhZGJiYjA3").decode()
+    # binascii是内置模块，避免启动时导入base64
+    PULSOID_CLIENT_ID = binascii.a2b_base64("ZGZhY2U5Y2EtMGZjYi00YjMxLTg4NzQtZGQ0YWRhZGJiYjA3").decode()
     PULSOID_REDIRECT_URI = ""
     PULSOID_RESPONSE_TYPE = "token"
     PULSOID_SCOPE = "data:heart_rate:read"
     PULSOID_RESPONSE_MODE = "web_page"
     
+    # 本地认证监听：浏览器把token提交到这里（端口0表示随机端口）
+    AUTH_CALLBACK_HOST = "127.0.0.1"
+    AUTH_CALLBACK_PORT = 0
+    # 让Pulsoid直接重定向到本地监听，token自动提交（需要固定端口，并在Pulsoid应用中登记 http://127.0.0.1:<端口>/callback）
+    AUTH_LOCAL_REDIRECT = False
+    # 启动时向Pulsoid校验保存的token（与WebSocket连接同时进行），被拒绝时重新认证
+    AUTH_VALIDATE_TOKEN = True
+    PULSOID_VALIDATE_URL = "https://dev.pulsoid.net/api/v1/token/validate"
+    AUTH_VALIDATE_TIMEOUT = 5
+    
     # WebSocket配置
     WEBSOCKET_URL = "wss://dev.pulsoid.net/api/v1/data/real_time"
+    # WebSocket帧解码：JSON后端（auto / orjson / json），auto时安装了orjson就使用orjson
+    FRAME_JSON_BACKEND = "auto"
+    # 按固定格式直接取出心率的快速路径，None表示只在使用标准库json时启用
+    FRAME_FAST_PATH = None
+    
+    # 输入源：websocket / auto（WebSocket为主，没有新鲜数据时自动改用HTTP轮询）/ poll
+    INPUT_SOURCE = "websocket"
+    # 主输入源超过该秒数没有送出新鲜样本时启动备用输入源
+    SOURCE_STALE_AFTER = 3
+    # HTTP轮询：Pulsoid最新心率接口
+    POLL_URL = "https://dev.pulsoid.net/api/v1/data/heart_rate/latest"
+    # 没有取到新样本时从 POLL_MIN_INTERVAL 秒开始重试，逐次加倍到 POLL_MAX_INTERVAL 秒
+    POLL_MIN_INTERVAL = 0.05
+    POLL_MAX_INTERVAL = 3
+    # 按下一个样本的预计时间请求，每次命中后提前的试探步长（秒）
+    POLL_PROBE_STEP = 0.01
+    POLL_TIMEOUT = 5
+    # 连续 POLL_IDLE_AFTER 次按 POLL_MAX_INTERVAL 轮询都没有新样本（传感器没有数据）时，改为每 POLL_IDLE_INTERVAL 秒一次
+    POLL_IDLE_AFTER = 10
+    POLL_IDLE_INTERVAL = 30
+    
+    # 按measured_at丢弃过时的样本（例如网络卡顿后补发的一批帧），以及乱序和重复的帧
+    STALENESS_ENABLED = True
+    # 样本比最快到达的样本多延迟超过该秒数时丢弃
+    MAX_SAMPLE_AGE = 3
+    # 按短期心率趋势外推，补偿样本的剩余延迟（最多外推 EXTRAPOLATE_LIMIT 秒）
+    STALENESS_EXTRAPOLATE = False
+    EXTRAPOLATE_LIMIT = 1.5
+    # 心率趋势的平滑系数
+    TREND_SMOOTHING = 0.2
+    # 时钟偏移估计每秒允许上升的秒数，以及样本连续多少秒都过时后重新对齐
+    CLOCK_OFFSET_CREEP = 0.001
+    CLOCK_OFFSET_RESYNC = 10
     
     # OSC配置
     OSC_IP = "127.0.0.1"
     OSC_PORT = 9000
+    # 同时发送到多个OSC目标，格式为 "host:port" 或 "host:port=参数名,参数名"（只发送列出的参数）
+    # 为空时只发送到 OSC_IP:OSC_PORT
+    OSC_DESTINATIONS = []
+    # 使用预编码的OSC bundle，每个样本只发送一个UDP数据报
+    OSC_USE_BUNDLE = True
+    # 变化驱动发送：只发送量化值发生变化的参数
+    OSC_CHANGE_DRIVEN = True
+    # float参数变化检测的量化步长，0表示按float32编码值精确比较
+    OSC_FLOAT_QUANTUM = 0
+    # 每个参数每秒最多发送次数，0表示不限制
+    OSC_MAX_SEND_RATE = 10
+    # 未变化的参数也会定期重发（秒），保证后加入的接收端能同步
+    OSC_REFRESH_INTERVAL = 10
+    # HeartBeatToggle按 60/BPM 秒的节拍切换，与实际心跳同步
+    HEARTBEAT_SYNC = True
+    # 节拍提前唤醒后忙等的时长（秒），用于把抖动压到亚毫秒，0表示不忙等。
+    # 忙等会阻塞事件循环，只适合单个桥接（--beat-spin），多租户和监督模式下强制为0
+    HEARTBEAT_SPIN_MARGIN = 0
+    # 固定频率插值输出：把约1Hz的心率样本重采样为平滑的参数变化
+    INTERPOLATION_ENABLED = False
+    # 输出频率（Hz），注意同时受 OSC_MAX_SEND_RATE 限制
+    INTERPOLATION_RATE = 10
+    # 平滑滤波器: linear / ema / spring
+    INTERPOLATION_FILTER = "spring"
+    # 平滑时间常数（秒）
+    INTERPOLATION_SMOOTHING_TIME = 1.0
+    # 保活信号间隔（秒）
+    OSC_KEEPALIVE_INTERVAL = 30
+    # 在VRChat聊天框（/chatbox/input）显示心率，{bpm} 为当前心率
+    CHATBOX_ENABLED = False
+    CHATBOX_TEMPLATE = "❤ {bpm} bpm"
+    # VRChat限制聊天框的发送频率：令牌桶每 CHATBOX_INTERVAL 秒补充一个令牌，最多积累 CHATBOX_BURST 个
+    CHATBOX_INTERVAL = 1.5
+    CHATBOX_BURST = 1
+    # 显示内容不变时的重发间隔（秒），VRChat的聊天框一段时间后会消失，0表示不重发
+    CHATBOX_REFRESH_INTERVAL = 20
+    # 显示时是否播放提示音
+    CHATBOX_SOUND = False
+    
+    # 接收与发送解耦：只保留最新样本，发送不及时时丢弃过时样本
+    PIPELINE_COALESCE = True
     
-    # 重连配置
-    MAX_RECONNECT_ATTEMPTS = 5
+    # 日志配置
+    # 日志处理器在后台线程中运行，事件循环只负责把记录放入队列
+    LOG_QUEUE = True
+    # 每N个心率样本输出一行INFO日志（1表示每个样本都输出）
+    LOG_SAMPLE_EVERY = 1
+    # 日志文件超过该字节数时轮转，保留 LOG_BACKUP_COUNT 个旧文件（0表示不限制大小）
+    LOG_MAX_BYTES = 10 * 1024 * 1024
+    LOG_BACKUP_COUNT = 3
+    
+    # 指标配置
+    METRICS_ENABLED = True
+    # 本地Prometheus指标端点，METRICS_PORT为None时只输出摘要日志
+    METRICS_HOST = "127.0.0.1"
+    METRICS_PORT = 9465
+    # 指标摘要日志间隔（秒），0表示不输出
+    METRICS_LOG_INTERVAL = 60
+    
+    # 重连配置（退避时间带去相关抖动，MAX_RECONNECT_ATTEMPTS为0表示不放弃）
+    MAX_RECONNECT_ATTEMPTS = 0
     INITIAL_RECONNECT_DELAY = 1
     MAX_RECONNECT_DELAY = 30
     
+    # 停滞检测：超过 N 倍观测到的采样间隔没有收到数据时判定连接停滞并切换
+    STALL_INTERVAL_MULTIPLIER = 5
+    # 超过 N 倍采样间隔时预先打开备用连接，切换时无需重新握手
+    STANDBY_INTERVAL_MULTIPLIER = 2
+    STANDBY_ENABLED = True
+    # 停滞判定的下限（秒），以及还没有观测到采样间隔时使用的判定时间
+    STALL_MIN_TIMEOUT = 2
+    STALL_INITIAL_TIMEOUT = 10
+    # 判定停滞前先ping当前连接，没有pong才切换（收到pong说明只是传感器没有数据）；
+    # 等待pong最多该秒数，且不超过停滞判定时间
+    STALL_PING_TIMEOUT = 3
+    
+    # 参数映射文件（见 mapping.py），为None时使用内置的心率参数
+    MAPPING_FILE = None
+    MAPPING_PROFILE = "default"
+    
+    # 额外发送的统计参数（HeartRateMin / HeartRateMax / HeartRateAvg / HeartRateAvg1m / HeartRateAvg5m），
+    # 为空时不统计也不发送
+    STATS_PARAMETERS = []
+    
+    # 会话录制：RECORD_FILE不为None时把每个心率样本追加到该二进制文件，可用 --replay 回放
+    RECORD_FILE = None
+    # 录制缓冲区写盘间隔（秒）
+    RECORDER_FLUSH_INTERVAL = 5
+    
+    # 监听VRChat的OSC输出（/avatar/change），只发送当前模型拥有的参数
+    # 默认关闭：9001端口常被其他OSC工具占用，可用 --avatar-filter 开启
+    AVATAR_FILTER_ENABLED = False
+    AVATAR_LISTEN_IP = "127.0.0.1"
+    AVATAR_LISTEN_PORT = 9001
+    # VRChat写出模型OSC配置的目录，为None时使用 %USERPROFILE%\AppData\LocalLow\VRChat\VRChat\OSC
+    VRCHAT_OSC_DIR = None
+    # 缓存的模型参数列表个数（LRU）
+    AVATAR_CACHE_SIZE = 32
+    # 切换模型时找不到OSC配置文件，隔多少秒再查找一次（0表示不重试）
+    AVATAR_CONFIG_RETRY = 2
+    
+    # 多租户模式资源统计日志间隔（秒）
+    TENANT_REPORT_INTERVAL = 60
+    
+    # supervisor.py：工作进程数（0表示CPU核数）、汇报间隔、多久没有汇报视为卡死（秒）
+    SUPERVISOR_WORKERS = 0
+    SUPERVISOR_REPORT_INTERVAL = 5
+    SUPERVISOR_HEALTH_TIMEOUT = 30
+    # 工作进程异常退出后的重启等待（秒），连续失败时翻倍
+    SUPERVISOR_RESTART_DELAY = 1
+    SUPERVISOR_MAX_RESTART_DELAY = 30
+    # 关闭时等待工作进程退出的时间（秒），超时后强制结束
+    SUPERVISOR_STOP_TIMEOUT = 10
+    
+    # --profile：快照输出目录、是否同时运行cProfile、tracemalloc保存的调用栈深度（0表示不跟踪内存分配）
+    PROFILE_DIR = "profiles"
+    PROFILE_CPROFILE = True
+    PROFILE_TRACEMALLOC_FRAMES = 1
+    
     # 文件路径
     TOKEN_FILE = "token.txt"
     
     @staticmethod
     def get_uuid(short=False):
         """生成UUID"""
+        import uuid
         uid = str(uuid.uuid4())
         return uid.replace('-', '') if short else uid
     
     @staticmethod
-    def get_auth_url():
-        """获取认证URL"""
-        state = Config.get_uuid(True)
-        return (f"{Config.PULSOID_BASE_URL}?"
-                f"client_id={Config.PULSOID_CLIENT_ID}&"
-                f"redirect_uri={Config.PULSOID_REDIRECT_URI}&"
-                f"response_type={Config.PULSOID_RESPONSE_TYPE}&"
-                f"scope={Config.PULSOID_SCOPE}&"
-                f"state={state}&"
-                f"response_mode={Config.PULSOID_RESPONSE_MODE}")
\ No newline at end of file
+    def get_auth_url(state=None, redirect_uri=None):
+        """获取认证URL，指定redirect_uri时token通过重定向返回，不显示在Pulsoid页面上"""
+        from urllib.parse import quote
+        state = state or Config.get_uuid(True)
+        url = (f"{Config.PULSOID_BASE_URL}?"
+               f"client_id={Config.PULSOID_CLIENT_ID}&"
+               f"redirect_uri={quote(redirect_uri or Config.PULSOID_REDIRECT_URI, safe='')}&"
+               f"response_type={Config.PULSOID_RESPONSE_TYPE}&"
+               f"scope={Config.PULSOID_SCOPE}&"
+               f"state={state}")
+        if not redirect_uri:
+            url += f"&response_mode={Config.PULSOID_RESPONSE_MODE}"
+        return url
\ No newline at end of file
@@ -0,0 +1,83 @@
+"""
+Pulsoid实时帧解码
+
+心率帧的格式为 {"measured_at": <毫秒时间戳>, "data": {"heart_rate": <bpm>}}。
+FrameDecoder.decode 返回 (heart_rate, measured_at)，不是心率帧时返回None，JSON格式错误时抛出ValueError。
+
+- 快速路径：帧与上面的格式完全一致时（紧凑或json.dumps默认的空格），用一次正则匹配直接取出两个整数，不构建字典
+- 其他帧交给JSON后端完整解析；安装了orjson时使用orjson，否则使用标准库json
+- 默认（auto）在有orjson时不走快速路径：orjson完整解析一帧比Python层的正则匹配更快（见 benchmarks/bench_decode.py）
+"""
+
+import json
+import logging
+import re
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_HEART_RATE_FRAME = re.compile(r'\{"measured_at": ?(\d+), ?"data": ?\{"heart_rate": ?(\d+)\}\}')
+
+
+def load_json_backend(name: str = "auto"):
+    """返回 (后端名称, loads函数)，auto时优先使用orjson"""
+    if name in ("auto", "orjson"):
+        try:
+            import orjson
+            return "orjson", orjson.loads
+        except ImportError:
+            if name == "orjson":
+                logger.warning("未安装orjson，使用标准库json解析")
+    return "json", json.loads
+
+
+def fast_decode(message):
+    """帧格式完全匹配时直接取出 (heart_rate, measured_at)，否则返回None"""
+    if message.__class__ is not str:
+        return None
+    match = _HEART_RATE_FRAME.fullmatch(message)
+    if match is None:
+        return None
+    return int(match[2]), int(match[1])
+
+
+class FrameDecoder:
+    """可替换的帧解码器，PulsoidWebSocketClient 只调用 decode(message)"""
+
+    def __init__(self, backend: str = None, fast_path: bool = None):
+        self.backend, self._loads = load_json_backend(backend or Config.FRAME_JSON_BACKEND)
+        if fast_path is None:
+            fast_path = Config.FRAME_FAST_PATH
+        if fast_path is None:
+            fast_path = self.backend == "json"
+        self.fast_path = fast_path
+        self.fast = 0
+        self.parsed = 0
+        self.other = 0
+
+    def decode(self, message):
+        if self.fast_path:
+            sample = fast_decode(message)
+            if sample is not None:
+                self.fast += 1
+                return sample
+
+        data = self._loads(message)
+        if isinstance(data, dict) and 'measured_at' in data and 'data' in data:
+            heart_rate = data['data'].get('heart_rate')
+            if heart_rate is not None:
+                self.parsed += 1
+                return heart_rate, data['measured_at']
+        self.other += 1
+        logger.debug("收到其他消息: %s", message)
+        return None
+
+    def stats(self):
+        return {
+            "backend": self.backend,
+            "fast_path": self.fast_path,
+            "fast": self.fast,
+            "parsed": self.parsed,
+            "other": self.other,
+        }
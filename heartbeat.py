@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import math
+import time
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class JitterStats:
+    """定时器唤醒偏差统计（秒），只保存累加量，内存固定"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.max = 0.0
+
+    def record(self, jitter: float):
+        self.count += 1
+        self.total += jitter
+        self.total_sq += jitter * jitter
+        if jitter > self.max:
+            self.max = jitter
+
+    def summary(self):
+        if not self.count:
+            return {"beats": 0, "mean_ms": 0.0, "stdev_ms": 0.0, "max_ms": 0.0}
+        mean = self.total / self.count
+        variance = max(self.total_sq / self.count - mean * mean, 0.0)
+        return {
+            "beats": self.count,
+            "mean_ms": mean * 1000,
+            "stdev_ms": math.sqrt(variance) * 1000,
+            "max_ms": self.max * 1000,
+        }
+
+
+class HeartBeatScheduler:
+    """按心率节拍触发回调的调度器
+
+    每拍的时刻由上一拍的计划时刻加上 60/BPM 得到（而不是累加sleep），
+    因此唤醒延迟不会累积成漂移。BPM变化时从上一拍重新计算下一拍，相位连续。
+    事件循环的定时器精度约为1毫秒，spin_margin>0时提前这么多秒唤醒，
+    剩余时间用忙等补齐（最多 spin_margin 秒），以换取亚毫秒级的抖动。
+    spin_margin为0时从不忙等：定时器在时钟精度内提前触发（例如Windows上约15.6毫秒）时直接打拍，
+    提前量记为负的抖动。
+    """
+
+    def __init__(self, on_beat: Callable[[], None], min_bpm: int = 30, max_bpm: int = 240,
+                 spin_margin: float = 0.0):
+        self.on_beat = on_beat
+        self.spin_margin = spin_margin
+        self.min_bpm = min_bpm
+        self.max_bpm = max_bpm
+        self.period = None
+        self.last_beat = None
+        self.deadline = None
+        self.handle = None
+        self.loop = None
+        self.jitter = JitterStats()
+        self.skipped = 0
+
+    @property
+    def running(self):
+        return self.handle is not None
+
+    def update(self, bpm):
+        """根据最新心率重新规划下一拍"""
+        if not bpm or bpm <= 0:
+            self.stop()
+            return
+
+        bpm = min(max(bpm, self.min_bpm), self.max_bpm)
+        period = 60.0 / bpm
+        if period == self.period and self.handle is not None:
+            return
+        self.period = period
+
+        if self.loop is None:
+            self.loop = asyncio.get_running_loop()
+        now = self.loop.time()
+        if self.last_beat is None:
+            deadline = now
+        else:
+            deadline = max(self.last_beat + period, now)
+        self._schedule(deadline)
+
+    def stop(self):
+        """停止调度，下一次update会立即打一拍"""
+        if self.handle:
+            self.handle.cancel()
+            self.handle = None
+        self.last_beat = None
+        self.deadline = None
+
+    def _schedule(self, deadline: float):
+        if self.handle:
+            self.handle.cancel()
+        self.deadline = deadline
+        self.handle = self.loop.call_at(deadline - self.spin_margin, self._fire)
+
+    def _fire(self):
+        deadline = self.deadline
+        remaining = min(deadline - self.loop.time(), self.spin_margin)
+        if remaining > 0:
+            target = time.perf_counter() + remaining
+            while time.perf_counter() < target:
+                pass
+        now = self.loop.time()
+        self.jitter.record(now - deadline)
+        self.last_beat = deadline
+
+        try:
+            self.on_beat()
+        except Exception as e:
+            logger.error(f"心跳回调出错: {e}")
+
+        # 从计划时刻而不是实际唤醒时刻推算下一拍；严重落后时跳过错过的拍子
+        next_deadline = deadline + self.period
+        if next_deadline <= now:
+            missed = math.ceil((now - next_deadline) / self.period)
+            self.skipped += missed
+            next_deadline += missed * self.period
+            self.last_beat = next_deadline - self.period
+        self.handle = None
+        self._schedule(next_deadline)
+
+    def stats(self):
+        summary = self.jitter.summary()
+        summary["skipped"] = self.skipped
+        summary["bpm"] = 60.0 / self.period if self.period else 0
+        return summary
@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import math
+
+logger = logging.getLogger(__name__)
+
+
+class LinearInterpolator:
+    """线性插值：在一个样本间隔内从当前值匀速过渡到新目标值"""
+
+    __slots__ = ("dt", "duration", "value", "start", "target", "progress")
+
+    def __init__(self, dt: float, smoothing_time: float):
+        self.dt = dt
+        self.duration = max(smoothing_time, dt)
+        self.value = None
+        self.start = 0.0
+        self.target = 0.0
+        self.progress = 1.0
+
+    def set_target(self, target: float):
+        if self.value is None:
+            self.value = self.start = self.target = float(target)
+            return
+        self.start = self.value
+        self.target = float(target)
+        self.progress = 0.0
+
+    def step(self) -> float:
+        if self.progress < 1.0:
+            self.progress += self.dt / self.duration
+            if self.progress >= 1.0:
+                self.progress = 1.0
+                self.value = self.target
+            else:
+                self.value = self.start + (self.target - self.start) * self.progress
+        return self.value
+
+
+class ExponentialSmoother:
+    """指数移动平均：每个tick向目标值靠近固定比例"""
+
+    __slots__ = ("alpha", "value", "target")
+
+    def __init__(self, dt: float, smoothing_time: float):
+        # tick间隔固定，平滑系数只需计算一次
+        self.alpha = 1.0 - math.exp(-dt / max(smoothing_time, 1e-6))
+        self.value = None
+        self.target = 0.0
+
+    def set_target(self, target: float):
+        self.target = float(target)
+        if self.value is None:
+            self.value = self.target
+
+    def step(self) -> float:
+        self.value += self.alpha * (self.target - self.value)
+        return self.value
+
+
+class CriticallyDampedSpring:
+    """临界阻尼弹簧：无超调地平滑跟随目标值，速度连续"""
+
+    __slots__ = ("dt", "omega", "decay", "value", "velocity", "target")
+
+    def __init__(self, dt: float, smoothing_time: float):
+        self.dt = dt
+        self.omega = 2.0 / max(smoothing_time, 1e-6)
+        self.decay = math.exp(-self.omega * dt)
+        self.value = None
+        self.velocity = 0.0
+        self.target = 0.0
+
+    def set_target(self, target: float):
+        self.target = float(target)
+        if self.value is None:
+            self.value = self.target
+
+    def step(self) -> float:
+        offset = self.value - self.target
+        temp = (self.velocity + self.omega * offset) * self.dt
+        self.velocity = (self.velocity - self.omega * temp) * self.decay
+        self.value = self.target + (offset + temp) * self.decay
+        return self.value
+
+
+FILTERS = {
+    "linear": LinearInterpolator,
+    "ema": ExponentialSmoother,
+    "spring": CriticallyDampedSpring,
+}
+
+
+class InterpolatedOutput:
+    """固定频率的插值输出引擎
+
+    心率样本只更新滤波器的目标值，由定时器按固定tick重新采样并调用output输出平滑后的值。
+    每个tick的计算是O(1)的，不创建新的容器对象。
+    """
+
+    def __init__(self, output, rate: float = 20.0, filter_name: str = "spring", smoothing_time: float = 1.0):
+        if filter_name not in FILTERS:
+            raise ValueError(f"未知的平滑滤波器: {filter_name}（可选: {', '.join(FILTERS)}）")
+        self.output = output
+        self.rate = rate
+        self.period = 1.0 / rate
+        self.filter_name = filter_name
+        self.filter = FILTERS[filter_name](self.period, smoothing_time)
+        self.handle = None
+        self.loop = None
+        self.deadline = None
+        self.ticks = 0
+
+    @property
+    def running(self):
+        return self.handle is not None
+
+    def update(self, value: float):
+        """设置新的目标值，首次调用时启动tick"""
+        self.filter.set_target(value)
+        if self.handle is None:
+            self.start()
+
+    def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.deadline = self.loop.time()
+        self.handle = self.loop.call_at(self.deadline, self._tick)
+
+    def stop(self):
+        if self.handle:
+            self.handle.cancel()
+            self.handle = None
+
+    def _tick(self):
+        try:
+            self.output(self.filter.step())
+        except Exception as e:
+            logger.error(f"插值输出出错: {e}")
+        self.ticks += 1
+
+        # 以计划时刻累加，避免漂移；严重落后时直接从当前时间继续
+        self.deadline += self.period
+        now = self.loop.time()
+        if self.deadline < now:
+            self.deadline = now
+        self.handle = self.loop.call_at(self.deadline, self._tick)
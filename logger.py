@@ -1,74 +1,194 @@
+import atexit
 import logging
+import logging.handlers
+import queue
 import sys
-from datetime import datetime
-from colorama import init, Fore, Back, Style
+import time
 
-# 初始化colorama
-init(autoreset=True)
+from config import Config
 
-class ColoredFormatter(logging.Formatter):
-    """带颜色的日志格式化器"""
-    
-    COLORS = {
+# 队列模式下在后台线程中运行处理器的监听器
+_queue_listener = None
+
+def _load_colors():
+    """按需加载colorama，只有输出到终端时才需要颜色"""
+    from colorama import init, Fore, Back, Style
+
+    # 初始化colorama
+    init(autoreset=True)
+    colors = {
         'DEBUG': Fore.CYAN,
         'INFO': Fore.GREEN,
         'WARNING': Fore.YELLOW,
         'ERROR': Fore.RED,
         'CRITICAL': Fore.RED + Back.WHITE + Style.BRIGHT,
     }
-    
+    return colors, Style.RESET_ALL
+
+class ColoredFormatter(logging.Formatter):
+    """带颜色的日志格式化器"""
+
+    def __init__(self, *args, use_color=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if use_color is None:
+            use_color = sys.stdout is not None and sys.stdout.isatty()
+        if use_color:
+            self.COLORS, self.reset = _load_colors()
+        else:
+            self.COLORS, self.reset = {}, ''
+        self._cached_second = None
+        self._cached_timestamp = ''
+
     def format(self, record):
         # 获取颜色
         color = self.COLORS.get(record.levelname, '')
-        
-        # 格式化时间
-        timestamp = datetime.fromtimestamp(record.created).strftime('%H:%M:%S')
-        
+
+        # 格式化时间（同一秒内的日志复用已格式化的时间）
+        second = int(record.created)
+        if second != self._cached_second:
+            self._cached_second = second
+            self._cached_timestamp = time.strftime('%H:%M:%S', time.localtime(second))
+        timestamp = self._cached_timestamp
+
         # 构建日志消息
         if record.levelname in ['ERROR', 'CRITICAL']:
             # 错误日志显示更多信息
-            log_message = f"{color}[{timestamp}] {record.levelname}: {record.getMessage()}{Style.RESET_ALL}"
+            log_message = f"{color}[{timestamp}] {record.levelname}: {record.getMessage()}{self.reset}"
             if record.exc_info:
                 log_message += f"\n{self.formatException(record.exc_info)}"
         else:
-            log_message = f"{color}[{timestamp}] {record.levelname}: {record.getMessage()}{Style.RESET_ALL}"
-        
+            log_message = f"{color}[{timestamp}] {record.levelname}: {record.getMessage()}{self.reset}"
+
         return log_message
 
-def setup_logging(level=logging.INFO, log_to_file=False):
-    """设置日志配置"""
-    
+class CachedTimeFormatter(logging.Formatter):
+    """按秒缓存asctime的格式化器"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._cached_second = None
+        self._cached_timestamp = ''
+
+    def formatTime(self, record, datefmt=None):
+        if datefmt:
+            return super().formatTime(record, datefmt)
+        second = int(record.created)
+        if second != self._cached_second:
+            self._cached_second = second
+            self._cached_timestamp = time.strftime(self.default_time_format, self.converter(second))
+        return self.default_msec_format % (self._cached_timestamp, record.msecs)
+
+class SizeCappedFileHandler(logging.handlers.RotatingFileHandler):
+    """按大小轮转的日志文件
+
+    标准实现每条记录都先格式化一次、seek到文件末尾再判断大小，写入时又格式化一次；
+    这里在写入时累计字节数，判断只是一次整数比较。
+    """
+
+    def __init__(self, filename, max_bytes, backup_count, encoding='utf-8'):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding=encoding)
+        self.size = self.stream.tell()
+
+    def shouldRollover(self, record):
+        return self.maxBytes > 0 and self.size >= self.maxBytes
+
+    def doRollover(self):
+        super().doRollover()
+        self.size = 0
+
+    def emit(self, record):
+        try:
+            if self.shouldRollover(record):
+                self.doRollover()
+            msg = self.format(record) + self.terminator
+            self.stream.write(msg)
+            self.flush()
+            self.size += len(msg.encode(self.encoding, 'replace'))
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """把日志记录原样放入队列，消息格式化全部留给后台线程
+
+    标准QueueHandler会在调用线程中先格式化消息（为了跨进程序列化），
+    这里的队列只在进程内使用，不需要这一步。
+    """
+
+    def prepare(self, record):
+        return record
+
+def setup_logging(level=logging.INFO, log_to_file=False, use_queue=False, max_bytes=None, backup_count=None,
+                  log_to_console=True):
+    """设置日志配置
+
+    use_queue为True时，调用线程只把日志记录放入队列，
+    控制台和文件输出在后台线程中完成，不阻塞事件循环。
+    日志文件超过max_bytes（默认 Config.LOG_MAX_BYTES）时轮转，长时间运行也不会无限增长。
+    """
+    global _queue_listener
+    stop_logging()
+
     # 创建根日志器
     root_logger = logging.getLogger()
     root_logger.setLevel(level)
-    
+
     # 清除现有的处理器
     for handler in root_logger.handlers[:]:
         root_logger.removeHandler(handler)
-    
-    # 控制台处理器
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(level)
-    console_formatter = ColoredFormatter()
-    console_handler.setFormatter(console_formatter)
-    root_logger.addHandler(console_handler)
-    
+
+    handlers = []
+
+    # 控制台处理器（先创建格式化器，colorama可能会替换sys.stdout）
+    if log_to_console:
+        console_formatter = ColoredFormatter()
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setLevel(level)
+        console_handler.setFormatter(console_formatter)
+        handlers.append(console_handler)
+
     # 文件处理器（可选）
     if log_to_file:
-        file_handler = logging.FileHandler('pulsoid_vrchat.log', encoding='utf-8')
+        file_handler = SizeCappedFileHandler(
+            'pulsoid_vrchat.log',
+            max_bytes=Config.LOG_MAX_BYTES if max_bytes is None else max_bytes,
+            backup_count=Config.LOG_BACKUP_COUNT if backup_count is None else backup_count
+        )
         file_handler.setLevel(logging.DEBUG)
-        file_formatter = logging.Formatter(
+        file_formatter = CachedTimeFormatter(
             '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
         )
         file_handler.setFormatter(file_formatter)
-        root_logger.addHandler(file_handler)
-    
+        handlers.append(file_handler)
+
+    if use_queue:
+        log_queue = queue.SimpleQueue()
+        root_logger.addHandler(DeferredQueueHandler(log_queue))
+        _queue_listener = logging.handlers.QueueListener(
+            log_queue, *handlers, respect_handler_level=True
+        )
+        _queue_listener.start()
+    else:
+        for handler in handlers:
+            root_logger.addHandler(handler)
+
     # 设置第三方库的日志级别
     logging.getLogger('websockets').setLevel(logging.WARNING)
     logging.getLogger('asyncio').setLevel(logging.WARNING)
-    
+
     return root_logger
 
+def stop_logging():
+    """停止后台日志线程，并输出队列中剩余的日志"""
+    global _queue_listener
+    if _queue_listener is not None:
+        _queue_listener.stop()
+        _queue_listener = None
+
+# 退出时先排空日志队列（在logging自身的清理之前执行）
+atexit.register(stop_logging)
+
 def get_logger(name):
     """获取指定名称的日志器"""
-    return logging.getLogger(name)
\ No newline at end of file
+    return logging.getLogger(name)
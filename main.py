@@ -4,9 +4,11 @@ Pulsoid to VRChat OSC Bridge - Python版本
 将Pulsoid心率数据通过OSC发送到VRChat
 """
 
+import argparse
 import asyncio
 import signal
 import sys
+import time
 import logging
 from pathlib import Path
 
@@ -15,15 +17,63 @@ from logger import setup_logging, get_logger
 from config import Config
 from auth import PulsoidAuth
 from websocket_client import PulsoidWebSocketClient
-from osc_client import VRChatOSCClient
+from osc_client import VRChatOSCClient, parse_osc_destination, select_stat_parameters
+from pipeline import CoalescingPipeline
+from metrics import BridgeMetrics, MetricsServer
+from rolling_stats import HeartRateStats
 
 class PulsoidVRChatBridge:
-    def __init__(self):
-        self.logger = get_logger(__name__)
+    def __init__(self, token=None, osc_ip=None, osc_port=None, parameters=None, name=None,
+                 websocket_url=None, serve_metrics=True, record_file=None, replay_file=None,
+                 replay_speed=1.0, destinations=None, track_avatar=None, avatar_port=None, profiler=None,
+                 input_source=None, poll_url=None):
+        self.name = name
+        self.logger = get_logger(f"{__name__}.{name}" if name else __name__)
         self.auth = PulsoidAuth()
+        # --profile：把各阶段替换为计时包装，不开启时热路径保持不变
+        self.profiler = profiler
+        if profiler:
+            profiler.instrument(self, "on_heart_rate_received", "handler")
+            profiler.instrument(self.logger, "info", "log")
+        self.token = token
+        self.osc_ip = osc_ip
+        self.osc_port = osc_port
+        # 多个OSC目标 [(host, port, 参数名列表或None)]，设置时代替 osc_ip/osc_port
+        self.destinations = destinations
+        self.parameters = parameters
+        # 监听VRChat的模型切换，只发送当前模型拥有的参数；会占用VRChat的OSC输出端口，需要显式开启
+        self.track_avatar = Config.AVATAR_FILTER_ENABLED if track_avatar is None else track_avatar
+        self.avatar_port = avatar_port
+        self.avatar_tracker = None
+        self.websocket_url = websocket_url
         self.websocket_client = None
+        # 输入源：auto / websocket / poll（见 sources.py），source为实际运行的输入源
+        self.input_source = input_source or Config.INPUT_SOURCE
+        self.poll_url = poll_url
+        self.polling_client = None
+        self.failover = None
+        self.source = None
+        self.staleness = None
+        # 会话录制和回放（回放时代替WebSocket客户端）
+        self.record_file = record_file
+        self.replay_file = replay_file
+        self.replay_speed = replay_speed
+        self.recorder = None
+        self.replay_source = None
+        self.validation_task = None
         self.osc_client = None
+        self.pipeline = None
+        # 会话统计（最小/最大/平均和滑动平均），只在配置了统计参数时启用
+        self.stat_parameters = select_stat_parameters(Config.STATS_PARAMETERS)
+        self.heart_rate_stats = HeartRateStats() if self.stat_parameters else None
         self.running = False
+        self.metrics = BridgeMetrics(name) if Config.METRICS_ENABLED else None
+        # 多租户模式下由统一的指标端点输出，单个桥接不再单独启动
+        self.serve_metrics = serve_metrics
+        self.metrics_server = None
+        # 每个桥接实例的处理统计
+        self.samples = 0
+        self.handler_ns = 0
         
     def setup_signal_handlers(self):
         """设置信号处理器"""
@@ -36,12 +86,20 @@ class PulsoidVRChatBridge:
     
     def on_heart_rate_received(self, heart_rate: int):
         """处理接收到的心率数据"""
+        started = time.perf_counter_ns()
         try:
-            self.logger.info(f"心率: {heart_rate} bpm")
+            # 每 LOG_SAMPLE_EVERY 个样本输出一行心率日志
+            if self.samples % Config.LOG_SAMPLE_EVERY == 0:
+                self.logger.info("心率: %d bpm", heart_rate)
+            
+            if self.heart_rate_stats:
+                self.heart_rate_stats.update(heart_rate)
             
             # 发送到VRChat
             if self.osc_client and self.osc_client.connected:
                 success = self.osc_client.send_heart_rate(heart_rate)
+                if success and self.metrics:
+                    self.metrics.record_send()
                 if not success:
                     self.logger.warning("发送心率数据到VRChat失败")
             else:
@@ -49,32 +107,144 @@ class PulsoidVRChatBridge:
                 
         except Exception as e:
             self.logger.error(f"处理心率数据时出错: {e}")
+        finally:
+            self.samples += 1
+            self.handler_ns += time.perf_counter_ns() - started
+    
+    async def _validate_token(self, token):
+        """向Pulsoid校验保存的token，被拒绝时重新认证，输入源改用新token重连"""
+        if await self.auth.validate_token(token) is not False:
+            return
+        self.logger.error("保存的token已失效，重新认证")
+        token = await self.auth.start_auth()
+        if self.source:
+            self.source.update_token(token)
+    
+    def _create_source(self, token, on_heart_rate):
+        """按 input_source 创建输入源：auto时WebSocket为主，HTTP轮询为备用"""
+        def websocket_source(on_heart_rate):
+            self.logger.info("正在初始化WebSocket客户端...")
+            self.websocket_client = PulsoidWebSocketClient(
+                token=token,
+                on_heart_rate=on_heart_rate,
+                url=self.websocket_url,
+                metrics=self.metrics,
+                recorder=self.recorder,
+                staleness=self.staleness
+            )
+            return self.websocket_client
+        
+        def polling_source(on_heart_rate):
+            from sources import PulsoidPollingClient
+            self.logger.info("正在初始化HTTP轮询客户端...")
+            self.polling_client = PulsoidPollingClient(
+                token=token,
+                on_heart_rate=on_heart_rate,
+                url=self.poll_url,
+                metrics=self.metrics,
+                recorder=self.recorder,
+                staleness=self.staleness
+            )
+            return self.polling_client
+        
+        if self.input_source == "websocket":
+            return websocket_source(on_heart_rate)
+        if self.input_source == "poll":
+            return polling_source(on_heart_rate)
+        if self.input_source != "auto":
+            raise ValueError(f"未知的输入源: {self.input_source}")
+        from sources import FailoverSource
+        # 两个输入源共用同一个新鲜度过滤，切换时不会重复发送或倒退
+        self.failover = FailoverSource(websocket_source, polling_source, on_heart_rate)
+        return self.failover
     
     async def initialize(self):
         """初始化所有组件"""
         try:
             self.logger.info("=== Pulsoid to VRChat OSC Bridge (Python版) ===")
             
-            # 获取token
-            self.logger.info("正在获取认证token...")
-            token = self.auth.get_valid_token()
-            if not token:
-                self.logger.error("无法获取有效的token")
-                return False
+            # 认证与OSC初始化同时进行：token文件在线程中读取，没有token时等待浏览器或终端提交
+            token_task = None
+            if not self.replay_file and not self.token:
+                self.logger.info("正在获取认证token...")
+                token_task = asyncio.create_task(self.auth.get_valid_token())
             
-            # 初始化OSC客户端
+            # 先初始化OSC客户端，让第一个OSC包尽早发出
             self.logger.info("正在初始化OSC客户端...")
-            self.osc_client = VRChatOSCClient()
-            if not self.osc_client.connect():
+            self.osc_client = VRChatOSCClient(
+                ip=self.osc_ip,
+                port=self.osc_port,
+                parameters=self.parameters,
+                heart_rate_stats=self.heart_rate_stats,
+                stat_parameters=self.stat_parameters,
+                destinations=self.destinations
+            )
+            if not await self.osc_client.connect():
                 self.logger.error("OSC客户端连接失败")
+                if token_task:
+                    token_task.cancel()
                 return False
+            if self.profiler:
+                self.profiler.instrument(self.osc_client, "send_heart_rate", "osc_send")
             
-            # 初始化WebSocket客户端
-            self.logger.info("正在初始化WebSocket客户端...")
-            self.websocket_client = PulsoidWebSocketClient(
-                token=token,
-                on_heart_rate=self.on_heart_rate_received
-            )
+            if self.track_avatar:
+                from avatar import AvatarTracker
+                self.avatar_tracker = AvatarTracker(self.osc_client, port=self.avatar_port)
+                await self.avatar_tracker.start()
+            
+            on_heart_rate = self.on_heart_rate_received
+            if Config.PIPELINE_COALESCE:
+                # 接收端只写入"最新样本"邮箱，由独立任务负责日志和OSC发送
+                self.pipeline = CoalescingPipeline(self.on_heart_rate_received)
+                on_heart_rate = self.pipeline.submit
+            
+            if self.replay_file:
+                # 回放录制的会话，不需要token和WebSocket连接
+                from recorder import ReplaySource
+                self.logger.info("正在初始化会话回放...")
+                self.replay_source = ReplaySource(
+                    self.replay_file,
+                    on_heart_rate,
+                    speed=self.replay_speed,
+                    metrics=self.metrics
+                )
+                if self.replay_speed != 1:
+                    self.osc_client.set_time_scale(self.replay_speed)
+                self.source = self.replay_source
+            else:
+                token = self.token
+                if token_task:
+                    token = await token_task
+                if not token:
+                    self.logger.error("无法获取有效的token")
+                    self.osc_client.disconnect()
+                    return False
+                
+                if self.record_file:
+                    from recorder import SessionRecorder
+                    self.recorder = SessionRecorder(self.record_file)
+                    self.logger.info(f"心率会话录制到 {self.record_file}")
+                
+                if Config.STALENESS_ENABLED:
+                    from staleness import StalenessFilter
+                    self.staleness = StalenessFilter()
+                
+                # 初始化输入源
+                self.source = self._create_source(token, on_heart_rate)
+                
+                if self.profiler:
+                    for client in (self.websocket_client, self.polling_client):
+                        if client:
+                            self.profiler.instrument(client.decoder, "decode", "decode")
+                    if self.staleness:
+                        self.profiler.instrument(self.staleness, "admit", "staleness")
+                
+                if token_task and Config.AUTH_VALIDATE_TOKEN:
+                    # 校验与WebSocket连接同时进行，不推迟第一个样本
+                    self.validation_task = asyncio.create_task(self._validate_token(token))
+            
+            if self.metrics:
+                self.metrics.osc_client = self.osc_client
             
             # 发送连接状态
             self.osc_client.send_connection_status(True)
@@ -96,8 +266,15 @@ class PulsoidVRChatBridge:
             self.running = True
             self.logger.info("程序启动成功，开始接收心率数据...")
             
-            # 运行WebSocket客户端
-            await self.websocket_client.run_with_reconnect()
+            if self.pipeline:
+                self.pipeline.start()
+            
+            if self.metrics and self.serve_metrics:
+                self.metrics_server = MetricsServer([self.metrics])
+                await self.metrics_server.start()
+            
+            # 运行输入源（WebSocket、HTTP轮询、自动切换或会话回放）
+            await self.source.run()
             
         except KeyboardInterrupt:
             self.logger.info("收到键盘中断")
@@ -115,38 +292,207 @@ class PulsoidVRChatBridge:
         self.logger.info("正在关闭程序...")
         
         try:
+            # 停止发送流水线，先送出邮箱中最后一个样本，再发送断开连接状态
+            if self.pipeline:
+                await self.pipeline.stop()
+                stats = self.pipeline.stats()
+                self.logger.info(
+                    "流水线统计: 接收 %d，发送 %d，合并丢弃 %d",
+                    stats["received"], stats["delivered"], stats["coalesced"]
+                )
+            
             # 发送断开连接状态
             if self.osc_client and self.osc_client.connected:
                 self.osc_client.send_connection_status(False)
             
-            # 关闭WebSocket客户端
+            if self.validation_task:
+                self.validation_task.cancel()
+            
+            # 停止输入源
+            if self.source:
+                await self.source.stop()
             if self.websocket_client:
-                await self.websocket_client.stop()
+                stats = self.websocket_client.stats
+                self.logger.info(
+                    "WebSocket统计: 连接 %d 次，停滞 %d 次，切换备用连接 %d 次",
+                    stats["connects"], stats["stalls"], stats["failovers"]
+                )
+            if self.polling_client and self.polling_client.stats["polls"]:
+                stats = self.polling_client.stats
+                self.logger.info(
+                    "HTTP轮询统计: 请求 %d 次，新样本 %d，未变化 %d（304 %d），错误 %d，新建连接 %d 次",
+                    stats["polls"], stats["samples"], stats["unchanged"] + stats["not_modified"],
+                    stats["not_modified"], stats["errors"], stats["connections"]
+                )
+            if self.failover:
+                stats = self.failover.stats
+                self.logger.info(
+                    "输入源切换: 切换到备用 %d 次，恢复 %d 次，备用运行 %.1f 秒（%d 个样本）",
+                    stats["failovers"], stats["recoveries"], stats["fallback_seconds"], stats["fallback_samples"]
+                )
+            if self.staleness:
+                stats = self.staleness.stats()
+                self.logger.info(
+                    "样本新鲜度: 发送 %d，过时丢弃 %d，乱序丢弃 %d，外推 %d",
+                    stats["accepted"], stats["stale"], stats["out_of_order"], stats["extrapolated"]
+                )
+            
+            if self.avatar_tracker:
+                await self.avatar_tracker.stop()
+            
+            # 写出录制缓冲区
+            if self.recorder:
+                self.recorder.close()
+                self.logger.info(f"已录制 {self.recorder.records} 个样本到 {self.record_file}")
+            
+            # 停止指标端点
+            if self.metrics_server:
+                await self.metrics_server.stop()
             
             # 关闭OSC客户端
             if self.osc_client:
                 self.osc_client.disconnect()
+                stats = self.osc_client.get_stats()
+                self.logger.info(
+                    "OSC统计: 样本 %d，发送消息 %d/%d（节省 %.1f%%），数据报 %d",
+                    stats["samples"], stats["messages_sent"], stats["messages_baseline"],
+                    stats["savings_ratio"] * 100, stats["datagrams"]
+                )
+                if "beat_jitter" in stats:
+                    jitter = stats["beat_jitter"]
+                    self.logger.info(
+                        "心跳节拍: %d 拍，抖动 平均 %.3f ms / 最大 %.3f ms，跳过 %d 拍",
+                        jitter["beats"], jitter["mean_ms"], jitter["max_ms"], jitter["skipped"]
+                    )
+                if "chatbox" in stats:
+                    chatbox = stats["chatbox"]
+                    self.logger.info(
+                        "聊天框: 样本 %d，渲染 %d 次，发送 %d 条（限速推迟 %d，合并 %d）",
+                        chatbox["updates"], chatbox["renders"], chatbox["sent"],
+                        chatbox["deferred"], chatbox["replaced"]
+                    )
+                for target, destination in stats.get("destinations", {}).items():
+                    self.logger.info(
+                        "OSC目标 %s: 数据报 %d，错误 %d%s", target, destination["datagrams"],
+                        destination["errors"], "" if destination["enabled"] else "（已停用）"
+                    )
+            
+            if self.heart_rate_stats and self.heart_rate_stats.count:
+                summary = self.heart_rate_stats.summary()
+                self.logger.info(
+                    "心率统计: 最低 %d / 最高 %d / 平均 %.1f bpm（%d 个样本）",
+                    summary["min"], summary["max"], summary["avg"], summary["samples"]
+                )
             
             self.logger.info("程序已安全关闭")
             
         except Exception as e:
             self.logger.error(f"关闭程序时出错: {e}")
 
-async def main():
+def parse_args(argv=None):
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="Pulsoid to VRChat OSC Bridge")
+    parser.add_argument(
+        "--tenants",
+        metavar="FILE",
+        help="多租户模式：从JSON文件加载多个 (token, OSC地址, 参数配置) 并在同一进程中运行"
+    )
+    parser.add_argument("--token", help="直接使用指定的Pulsoid token，不读取token文件")
+    parser.add_argument("--websocket-url", metavar="URL", help=f"WebSocket地址（默认 {Config.WEBSOCKET_URL}）")
+    parser.add_argument("--source", choices=("auto", "websocket", "poll"), default=Config.INPUT_SOURCE,
+                        help="输入源：auto时以WebSocket为主，没有新鲜数据时自动改用HTTP轮询"
+                             f"（默认 {Config.INPUT_SOURCE}）")
+    parser.add_argument("--poll-url", metavar="URL", help=f"HTTP轮询地址（默认 {Config.POLL_URL}）")
+    parser.add_argument("--osc", metavar="HOST:PORT[=参数,...]", action="append",
+                        help=f"OSC目标地址，可重复指定以同时发送到多个目标；"
+                             f"=后列出参数名时该目标只接收这些参数（默认 {Config.OSC_IP}:{Config.OSC_PORT}）")
+    parser.add_argument("--mapping", metavar="FILE", default=Config.MAPPING_FILE,
+                        help="参数映射文件（地址、类型和换算方式，见 mapping.py）")
+    parser.add_argument("--mapping-profile", metavar="NAME", default=Config.MAPPING_PROFILE,
+                        help=f"使用映射文件中的哪个配置（默认 {Config.MAPPING_PROFILE}）")
+    parser.add_argument("--record", metavar="FILE", default=Config.RECORD_FILE,
+                        help="把收到的心率样本录制到二进制会话文件")
+    parser.add_argument("--replay", metavar="FILE", help="回放录制的会话文件，代替连接Pulsoid")
+    parser.add_argument("--replay-speed", type=float, default=1.0, metavar="X",
+                        help="回放速度倍数，0表示尽可能快（默认 1）")
+    parser.add_argument("--chatbox", nargs="?", const=Config.CHATBOX_TEMPLATE, metavar="TEMPLATE",
+                        help=f"同时在VRChat聊天框显示心率，可指定模板（默认 \"{Config.CHATBOX_TEMPLATE}\"）")
+    parser.add_argument("--avatar-filter", nargs="?", type=int, const=Config.AVATAR_LISTEN_PORT, default=None,
+                        metavar="PORT",
+                        help=f"监听VRChat的OSC输出，只发送当前模型拥有的参数（默认端口 {Config.AVATAR_LISTEN_PORT}）")
+    parser.add_argument("--beat-spin", nargs="?", type=float, const=0.002, default=None, metavar="SECONDS",
+                        help="HeartBeatToggle节拍提前唤醒后忙等补齐（默认 0.002 秒），抖动降到亚毫秒但占用事件循环；"
+                             "只用于单个桥接，多租户模式下忽略")
+    parser.add_argument("--profile", action="store_true",
+                        help="性能分析模式：分阶段计时，收到SIGUSR1时输出cProfile和tracemalloc快照")
+    return parser.parse_args(argv)
+
+async def main(argv=None):
     """主函数"""
+    args = parse_args(argv)
+    
     # 设置日志
-    setup_logging(level=logging.INFO, log_to_file=True)
+    setup_logging(level=logging.INFO, log_to_file=True, use_queue=Config.LOG_QUEUE)
     logger = get_logger(__name__)
     
+    if args.chatbox:
+        Config.CHATBOX_ENABLED = True
+        Config.CHATBOX_TEMPLATE = args.chatbox
+    
+    if args.beat_spin is not None:
+        if args.tenants:
+            logger.warning("多租户模式不支持 --beat-spin，已忽略")
+        else:
+            Config.HEARTBEAT_SPIN_MARGIN = args.beat_spin
+    
+    profiler = None
+    if args.profile:
+        from profiling import Profiler
+        profiler = Profiler()
+        profiler.start()
+    
     try:
+        if args.tenants:
+            # 多租户模式
+            from tenants import MultiTenantRunner, load_tenants
+            runner = MultiTenantRunner(load_tenants(args.tenants), profiler=profiler)
+            runner.setup_signal_handlers()
+            await runner.run()
+            return 0
+        
         # 创建并运行桥接程序
-        bridge = PulsoidVRChatBridge()
+        destinations = [parse_osc_destination(value) for value in args.osc] if args.osc else None
+        parameters = None
+        if args.mapping:
+            # 映射配置在启动时编译一次，之后每个样本直接调用编译好的换算函数
+            from mapping import load_profile
+            parameters = load_profile(args.mapping, args.mapping_profile)
+            logger.info(f"使用映射配置 {args.mapping_profile}（{len(parameters)} 个参数）")
+        bridge = PulsoidVRChatBridge(
+            token=args.token,
+            destinations=destinations,
+            parameters=parameters,
+            websocket_url=args.websocket_url,
+            input_source=args.source,
+            poll_url=args.poll_url,
+            record_file=args.record,
+            replay_file=args.replay,
+            replay_speed=args.replay_speed,
+            track_avatar=True if args.avatar_filter is not None else None,
+            avatar_port=args.avatar_filter,
+            profiler=profiler
+        )
         bridge.setup_signal_handlers()
         await bridge.run()
         
     except Exception as e:
         logger.error(f"程序异常退出: {e}")
         return 1
+    finally:
+        if profiler:
+            profiler.log_summary()
+            await profiler.dump()
+            profiler.stop()
     
     return 0
 
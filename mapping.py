@@ -0,0 +1,233 @@
+"""
+参数映射配置：从JSON文件加载心率参数的地址、类型和换算方式，
+启动时编译为 VRChatOSCClient 使用的 (地址, OSC类型, 换算函数) 列表。
+
+文件格式：
+{
+  "profiles": {
+    "default": [
+      {"address": "Heartrate", "type": "f", "expr": "hr / 127 - 1"},
+      {"address": "HeartRatePercent", "type": "f", "range": [40, 200]},
+      {"address": "HeartRateZone", "type": "i", "lut": {"0": 0, "120": 1, "150": 2}, "step": true},
+      {"address": "HeartBeatToggle", "type": "b"}
+    ]
+  }
+}
+
+每个参数：
+- address: 完整OSC地址，或省略 /avatar/parameters/ 前缀的参数名
+- type: f / i / b（也可写 float / int / bool）
+- clamp: [下限, 上限]，换算前先把心率限制在该范围内
+- expr: 以 hr 为变量的算术表达式，可使用 min / max / abs / round
+- range: [下限, 上限]，把该范围线性映射到 to（默认 [0, 1]），超出范围的值取端点
+- lut: 查找表，数组（按bpm下标）或 {bpm: 值} 对象；对象的点之间线性插值，step为true时取阶梯值
+- 都省略时直接使用心率值；b类型都省略时为按节拍切换的HeartBeatToggle
+i类型的结果会取整。
+"""
+
+import ast
+import json
+
+from osc_client import PARAMETER_PREFIX
+
+_TYPES = {"f": "f", "float": "f", "i": "i", "int": "i", "b": "b", "bool": "b"}
+
+# 表达式中可以调用的函数
+_FUNCTIONS = {"min": min, "max": max, "abs": abs, "round": round}
+
+_ALLOWED_NODES = (
+    ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare, ast.IfExp, ast.Call,
+    ast.Constant, ast.Name, ast.Load,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow,
+    ast.USub, ast.UAdd, ast.Not, ast.And, ast.Or,
+    ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.Eq, ast.NotEq,
+)
+
+
+def _number(value, what):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{what} 必须是数字: {value!r}")
+    return value
+
+
+def _pair(value, what):
+    if not isinstance(value, (list, tuple)) or len(value) != 2:
+        raise ValueError(f"{what} 必须是 [下限, 上限]: {value!r}")
+    low, high = (_number(item, what) for item in value)
+    if low >= high:
+        raise ValueError(f"{what} 的下限必须小于上限: {value!r}")
+    return low, high
+
+
+def _validate_expression(node, expr):
+    for child in ast.walk(node):
+        if not isinstance(child, _ALLOWED_NODES):
+            raise ValueError(f"表达式中不允许使用 {type(child).__name__}: {expr}")
+        if isinstance(child, ast.Constant) and (
+                isinstance(child.value, bool) or not isinstance(child.value, (int, float))):
+            raise ValueError(f"表达式中只能使用数字常量: {expr}")
+        if isinstance(child, ast.Name) and child.id != "hr" and child.id not in _FUNCTIONS:
+            raise ValueError(f"表达式中未知的名称 {child.id}: {expr}")
+        if isinstance(child, ast.Call) and (
+                not isinstance(child.func, ast.Name) or child.func.id not in _FUNCTIONS or child.keywords):
+            raise ValueError(f"表达式中只能调用 {', '.join(_FUNCTIONS)}: {expr}")
+
+
+def compile_expression(expr: str, clamp=None, as_int: bool = False, name: str = "transform"):
+    """把表达式编译为单参数函数，限幅和取整直接生成在函数体内"""
+    lines = [f"def {name}(hr):"]
+    if clamp is not None:
+        low, high = clamp
+        lines.append(f"    if hr < {low!r}: hr = {low!r}")
+        lines.append(f"    elif hr > {high!r}: hr = {high!r}")
+    lines.append(f"    return {'round' if as_int else ''}({expr})")
+    source = "\n".join(lines) + "\n"
+
+    try:
+        module = ast.parse(source, filename=f"<{name}>")
+    except SyntaxError as e:
+        raise ValueError(f"表达式语法错误: {expr} ({e.msg})") from None
+    # 整个函数必须是上面生成的结构，防止表达式中的括号改变代码结构
+    function = module.body[0] if len(module.body) == 1 else None
+    if (not isinstance(function, ast.FunctionDef)
+            or len(function.body) != (1 if clamp is None else 2)
+            or not isinstance(function.body[-1], ast.Return)):
+        raise ValueError(f"无效的表达式: {expr}")
+    _validate_expression(function.body[-1].value, expr)
+
+    namespace = {"__builtins__": {}, **_FUNCTIONS}
+    exec(compile(module, f"<{name}>", "exec"), namespace)
+    return namespace[name]
+
+
+def _lookup_table(lut, step: bool, as_int: bool):
+    """把查找表展开为按整数bpm下标的数组"""
+    if isinstance(lut, list):
+        if not lut:
+            raise ValueError("查找表不能为空")
+        table = [_number(value, "查找表的值") for value in lut]
+    elif isinstance(lut, dict) and lut:
+        points = sorted((int(key), _number(value, "查找表的值")) for key, value in lut.items())
+        if points[0][0] < 0:
+            raise ValueError(f"查找表的bpm不能为负: {points[0][0]}")
+        table = []
+        position = 0
+        for bpm in range(points[-1][0] + 1):
+            while position + 1 < len(points) and points[position + 1][0] <= bpm:
+                position += 1
+            low_bpm, low_value = points[position]
+            if bpm <= low_bpm or step or position + 1 == len(points):
+                table.append(low_value)
+            else:
+                high_bpm, high_value = points[position + 1]
+                table.append(low_value + (high_value - low_value) * (bpm - low_bpm) / (high_bpm - low_bpm))
+    else:
+        raise ValueError(f"查找表必须是非空数组或对象: {lut!r}")
+    if as_int:
+        table = [round(value) for value in table]
+    return table
+
+
+def compile_lookup(table, clamp=None):
+    """按整数bpm查表的函数，超出表范围时取两端的值
+
+    限幅直接展开到表中，常见的整数心率只需一次下标访问。
+    """
+    last = len(table) - 1
+    low, high = clamp if clamp is not None else (0, last)
+    low = max(int(low), 0)
+    high = min(int(high), last)
+    first_value = table[low]
+    last_value = table[high]
+    table = [first_value] * low + table[low:high + 1]
+
+    def transform(hr):
+        try:
+            if hr >= 0:
+                return table[hr]
+        except (IndexError, TypeError):
+            # 超出表范围或插值得到的小数心率
+            index = int(hr)
+            if index < len(table):
+                return table[index]
+            return last_value
+        return first_value
+
+    transform.table = table
+    return transform
+
+
+def compile_parameter(entry: dict):
+    """把一个参数配置编译为 (地址, OSC类型, 换算函数)"""
+    if not isinstance(entry, dict) or not entry.get("address"):
+        raise ValueError(f"参数配置缺少address: {entry!r}")
+    address = entry["address"]
+    if not address.startswith("/"):
+        address = PARAMETER_PREFIX + address
+
+    type_tag = _TYPES.get(str(entry.get("type", "f")).lower())
+    if type_tag is None:
+        raise ValueError(f"{address}: 不支持的类型 {entry.get('type')!r}")
+    as_int = type_tag == "i"
+    clamp = _pair(entry["clamp"], f"{address}: clamp") if "clamp" in entry else None
+
+    sources = [key for key in ("expr", "range", "lut") if key in entry]
+    if len(sources) > 1:
+        raise ValueError(f"{address}: expr / range / lut 只能指定一个")
+
+    if not sources:
+        if type_tag == "b":
+            # 没有换算方式的布尔参数按心率节拍切换
+            return address, type_tag, None
+        return address, type_tag, compile_expression("hr", clamp, as_int)
+
+    if sources[0] == "lut":
+        table = _lookup_table(entry["lut"], bool(entry.get("step")), as_int)
+        return address, type_tag, compile_lookup(table, clamp)
+
+    if sources[0] == "range":
+        low, high = _pair(entry["range"], f"{address}: range")
+        out_low, out_high = (_number(value, f"{address}: to") for value in entry.get("to", (0, 1)))
+        # 预先计算斜率，范围本身就是限幅
+        scale = (out_high - out_low) / (high - low)
+        expr = f"{out_low!r} + (hr - {low!r}) * {scale!r}"
+        return address, type_tag, compile_expression(expr, (low, high), as_int)
+
+    expr = entry["expr"]
+    if not isinstance(expr, str):
+        raise ValueError(f"{address}: expr 必须是字符串")
+    return address, type_tag, compile_expression(expr, clamp, as_int)
+
+
+def compile_profile(entries):
+    parameters = [compile_parameter(entry) for entry in entries]
+    if not parameters:
+        raise ValueError("映射配置中没有任何参数")
+    toggles = [address for address, type_tag, transform in parameters if type_tag == "b" and transform is None]
+    if len(toggles) > 1:
+        raise ValueError(f"只能有一个按节拍切换的布尔参数: {', '.join(toggles)}")
+    return parameters
+
+
+def load_profiles(path):
+    """加载映射文件中的全部配置，返回 {名称: 参数列表}"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    profiles = data.get("profiles") if isinstance(data, dict) else None
+    if not isinstance(profiles, dict) or not profiles:
+        raise ValueError(f"映射文件中没有任何配置: {path}")
+    compiled = {}
+    for name, entries in profiles.items():
+        try:
+            compiled[name] = compile_profile(entries)
+        except ValueError as e:
+            raise ValueError(f"映射配置 {name}: {e}") from None
+    return compiled
+
+
+def load_profile(path, name: str = "default"):
+    profiles = load_profiles(path)
+    if name not in profiles:
+        raise ValueError(f"映射文件 {path} 中没有配置 {name}（可选: {', '.join(profiles)}）")
+    return profiles[name]
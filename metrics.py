@@ -0,0 +1,255 @@
+import asyncio
+import logging
+import time
+from bisect import bisect_left
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# 默认桶边界（秒）：100微秒起每次翻倍，共20个桶，最大约52秒
+DEFAULT_BUCKETS = tuple(0.0001 * 2 ** i for i in range(20))
+
+
+class Histogram:
+    """固定内存的直方图，桶边界在构造时确定，observe为O(log 桶数)"""
+
+    __slots__ = ("bounds", "counts", "count", "sum", "max")
+
+    def __init__(self, bounds=DEFAULT_BUCKETS):
+        self.bounds = tuple(bounds)
+        # 最后一个桶对应 +Inf
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """按桶内线性插值估计分位数"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        lower = 0.0
+        for index, bucket_count in enumerate(self.counts):
+            if cumulative + bucket_count >= rank and bucket_count:
+                upper = self.bounds[index] if index < len(self.bounds) else self.max
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+            if index < len(self.bounds):
+                lower = self.bounds[index]
+        return self.max
+
+    def render(self, name: str, labels: str = ""):
+        """输出Prometheus文本格式的行"""
+        separator = "," if labels else ""
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.bounds, self.counts):
+            cumulative += bucket_count
+            lines.append(f'{name}_bucket{{{labels}{separator}le="{bound:g}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels}{separator}le="+Inf"}} {self.count}')
+        label_block = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{label_block} {self.sum}")
+        lines.append(f"{name}_count{label_block} {self.count}")
+        return lines
+
+
+class BridgeMetrics:
+    """单个桥接实例的运行指标"""
+
+    def __init__(self, name: str = None):
+        self.name = name
+        self.sensor_lag = Histogram()
+        self.receive_to_send = Histogram()
+        self.reconnect_duration = Histogram()
+        self.frames = 0
+        self.reconnects = 0
+        self.last_receive_ns = 0
+        self.osc_client = None
+        self._rate_time = time.monotonic()
+        self._rate_frames = 0
+        self._last_rate = 0.0
+
+    def record_frame(self, measured_at):
+        """收到心率帧时调用，measured_at为Pulsoid的毫秒时间戳"""
+        self.last_receive_ns = time.perf_counter_ns()
+        self.frames += 1
+        if measured_at:
+            lag = time.time() - measured_at / 1000
+            # 本机时钟比传感器慢时延迟可能为负，按0计
+            self.sensor_lag.observe(lag if lag > 0 else 0.0)
+
+    def record_send(self):
+        """OSC发送完成时调用，记录最新一帧从接收到发送的延迟"""
+        if self.last_receive_ns:
+            self.receive_to_send.observe((time.perf_counter_ns() - self.last_receive_ns) / 1e9)
+
+    def record_reconnect(self, duration: float):
+        """连接断开后重新连接成功时调用"""
+        self.reconnects += 1
+        self.reconnect_duration.observe(duration)
+
+    @property
+    def osc_send_errors(self):
+        client = self.osc_client
+        if client is None:
+            return 0
+        errors = client.stats.get("send_errors", 0)
+        if client.protocol is not None:
+            errors += client.protocol.errors
+        return errors
+
+    @property
+    def frames_per_second(self):
+        """当前统计窗口内的帧率，窗口不足1秒时返回上一个窗口的值"""
+        elapsed = time.monotonic() - self._rate_time
+        if elapsed >= 1.0:
+            return (self.frames - self._rate_frames) / elapsed
+        return self._last_rate
+
+    def update_rate(self):
+        """结束当前统计窗口并返回窗口内的帧率"""
+        rate = self.frames_per_second
+        self._last_rate = rate
+        self._rate_time = time.monotonic()
+        self._rate_frames = self.frames
+        return rate
+
+    def snapshot(self):
+        return MetricsSnapshot(self)
+
+    def summary(self):
+        return (
+            f"帧率 {self._last_rate:.2f}/s，"
+            f"传感器延迟 p50 {self.sensor_lag.quantile(0.5) * 1000:.0f} ms / p99 {self.sensor_lag.quantile(0.99) * 1000:.0f} ms，"
+            f"接收到发送 p50 {self.receive_to_send.quantile(0.5) * 1e6:.0f} us / p99 {self.receive_to_send.quantile(0.99) * 1e6:.0f} us，"
+            f"重连 {self.reconnects} 次，OSC发送错误 {self.osc_send_errors}"
+        )
+
+
+class MetricsSnapshot:
+    """BridgeMetrics的可序列化快照，用于从工作进程传回监督进程（见 supervisor.py）"""
+
+    def __init__(self, metrics: BridgeMetrics):
+        self.name = metrics.name
+        self.sensor_lag = metrics.sensor_lag
+        self.receive_to_send = metrics.receive_to_send
+        self.reconnect_duration = metrics.reconnect_duration
+        self.frames = metrics.frames
+        self.reconnects = metrics.reconnects
+        self.frames_per_second = metrics._last_rate
+        self.osc_send_errors = metrics.osc_send_errors
+
+    def update_rate(self):
+        # 帧率已在工作进程中按汇报间隔计算
+        return self.frames_per_second
+
+
+_HISTOGRAMS = (
+    ("pulsoid_sensor_lag_seconds", "sensor_lag", "从传感器测量到收到帧的延迟"),
+    ("pulsoid_receive_to_send_seconds", "receive_to_send", "从收到帧到OSC发送的延迟"),
+    ("pulsoid_reconnect_duration_seconds", "reconnect_duration", "重连造成的数据中断时长（断线前最后一帧到新连接第一帧）"),
+)
+
+_SCALARS = (
+    ("pulsoid_frames_total", "counter", "frames", "收到的心率帧数"),
+    ("pulsoid_frames_per_second", "gauge", "frames_per_second", "当前统计窗口内的帧率"),
+    ("pulsoid_reconnects_total", "counter", "reconnects", "重连成功次数"),
+    ("pulsoid_osc_send_errors_total", "counter", "osc_send_errors", "OSC发送错误数"),
+)
+
+
+def render_prometheus(metrics_list):
+    """把一组桥接指标渲染为Prometheus文本格式"""
+    labelled = [
+        (metrics, f'tenant="{metrics.name}"' if metrics.name else "")
+        for metrics in metrics_list
+    ]
+    lines = []
+    for name, attribute, help_text in _HISTOGRAMS:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for metrics, labels in labelled:
+            lines.extend(getattr(metrics, attribute).render(name, labels))
+    for name, kind, attribute, help_text in _SCALARS:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for metrics, labels in labelled:
+            label_block = f"{{{labels}}}" if labels else ""
+            lines.append(f"{name}{label_block} {getattr(metrics, attribute)}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """本地Prometheus指标HTTP端点，并定期输出一行指标摘要日志"""
+
+    def __init__(self, metrics_list, host: str = None, port: int = None, log_interval: float = None):
+        self.metrics_list = metrics_list
+        self.host = host or Config.METRICS_HOST
+        self.port = Config.METRICS_PORT if port is None else port
+        self.log_interval = Config.METRICS_LOG_INTERVAL if log_interval is None else log_interval
+        self.runner = None
+        self.summary_task = None
+
+    async def start(self):
+        if self.log_interval:
+            self.summary_task = asyncio.create_task(self._summary_loop())
+
+        if self.port is None:
+            return
+
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle_metrics)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        try:
+            site = web.TCPSite(self.runner, self.host, self.port)
+            await site.start()
+        except OSError as e:
+            # 端口被占用不影响桥接本身运行
+            logger.warning(f"指标端点启动失败: {e}")
+            await self.runner.cleanup()
+            self.runner = None
+            return
+        # 端口为0时取实际绑定的端口
+        self.port = self.runner.addresses[0][1]
+        logger.info(f"指标端点: http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self.summary_task:
+            self.summary_task.cancel()
+            self.summary_task = None
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
+
+    async def _handle_metrics(self, request):
+        from aiohttp import web
+
+        if not self.log_interval:
+            # 没有周期摘要时，帧率按两次抓取之间的间隔计算
+            for metrics in self.metrics_list:
+                metrics.update_rate()
+        return web.Response(
+            text=render_prometheus(self.metrics_list),
+            content_type="text/plain",
+            charset="utf-8"
+        )
+
+    async def _summary_loop(self):
+        while True:
+            await asyncio.sleep(self.log_interval)
+            for metrics in self.metrics_list:
+                metrics.update_rate()
+                prefix = f"[{metrics.name}] " if metrics.name else ""
+                logger.info("%s指标: %s", prefix, metrics.summary())
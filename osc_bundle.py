@@ -0,0 +1,143 @@
+import struct
+
+# OSC bundle头: "#bundle\0" + 立即执行的时间标签
+BUNDLE_HEADER = b"#bundle\x00" + struct.pack(">Q", 1)
+
+_INT32 = struct.Struct(">i")
+_UINT32 = struct.Struct(">I")
+_FLOAT32 = struct.Struct(">f")
+
+# 布尔值在OSC中直接编码为类型标签 T/F，没有负载
+_TRUE = ord('T')
+_FALSE = ord('F')
+
+
+def osc_string(value: str) -> bytes:
+    """编码OSC字符串（以\\0结尾并补齐到4字节）"""
+    data = value.encode('utf-8') + b"\x00"
+    return data + b"\x00" * (-len(data) % 4)
+
+
+def bool_message(address: str, value: bool) -> bytes:
+    """编码单个布尔参数的OSC消息"""
+    return osc_string(address) + (b",T\x00\x00" if value else b",F\x00\x00")
+
+
+class OscBundleEncoder:
+    """预编码的OSC bundle
+
+    每个参数的地址和类型标签只在构造时编码一次，之后每个样本只修改
+    缓冲区中对应的4字节负载（布尔值修改类型标签中的T/F），
+    整个bundle作为一个UDP数据报发送。
+    """
+
+    def __init__(self, parameters):
+        """parameters: [(address, type_tag), ...]，type_tag为 'f' / 'i' / 'b'"""
+        self.addresses = []
+        self.type_tags = []
+        self._offsets = []
+        self._spans = []
+        self._elements = []
+
+        buffer = bytearray(BUNDLE_HEADER)
+        for address, type_tag in parameters:
+            address_bytes = osc_string(address)
+            if type_tag == 'b':
+                body = address_bytes + b",F\x00\x00"
+                payload_offset = len(address_bytes) + 1
+            elif type_tag in ('f', 'i'):
+                body = address_bytes + osc_string(',' + type_tag) + b"\x00\x00\x00\x00"
+                payload_offset = len(body) - 4
+            else:
+                raise ValueError(f"不支持的OSC类型: {type_tag}")
+
+            buffer += _INT32.pack(len(body))
+            start = len(buffer)
+            buffer += body
+
+            self.addresses.append(address)
+            self.type_tags.append(type_tag)
+            self._offsets.append(start + payload_offset)
+            self._spans.append((start, len(buffer)))
+            # 包含4字节长度前缀的bundle元素，用于拼装只含部分参数的bundle
+            self._elements.append((start - 4, len(buffer)))
+
+        self.buffer = buffer
+        self._view = memoryview(buffer)
+
+    def __len__(self):
+        return len(self.addresses)
+
+    def index(self, address: str) -> int:
+        """获取参数地址对应的序号"""
+        return self.addresses.index(address)
+
+    def set_float(self, index: int, value: float):
+        _FLOAT32.pack_into(self.buffer, self._offsets[index], value)
+
+    def set_int(self, index: int, value: int):
+        _INT32.pack_into(self.buffer, self._offsets[index], value)
+
+    def set_bool(self, index: int, value: bool):
+        self.buffer[self._offsets[index]] = _TRUE if value else _FALSE
+
+    def raw(self, index: int) -> int:
+        """读取参数当前的编码值（布尔值为类型标签字节），用于变化检测"""
+        offset = self._offsets[index]
+        if self.type_tags[index] == 'b':
+            return self.buffer[offset]
+        return _UINT32.unpack_from(self.buffer, offset)[0]
+
+    def get_float(self, index: int) -> float:
+        """读取float参数按float32编码后的值"""
+        return _FLOAT32.unpack_from(self.buffer, self._offsets[index])[0]
+
+    def bundle_of(self, indices) -> bytes:
+        """拼装只包含指定参数的bundle"""
+        view = self._view
+        parts = [BUNDLE_HEADER]
+        for index in indices:
+            start, end = self._elements[index]
+            parts.append(view[start:end])
+        return b"".join(parts)
+
+    def message(self, index: int) -> memoryview:
+        """获取单条OSC消息（不含bundle头），用于逐条发送"""
+        start, end = self._spans[index]
+        return self._view[start:end]
+
+
+def _read_string(data, offset: int):
+    """读取以\\0结尾并补齐到4字节的OSC字符串，返回 (字符串, 下一个偏移)"""
+    end = data.index(b"\x00", offset)
+    return bytes(data[offset:end]).decode('utf-8', 'replace'), (end + 4) & ~3
+
+
+def parse_message(data):
+    """解析单条OSC消息，返回 (地址, 参数列表)
+
+    只支持 s / i / f / T / F 类型，用于读取VRChat的OSC输出；格式错误时抛出ValueError。
+    """
+    try:
+        address, offset = _read_string(data, 0)
+        if offset >= len(data) or data[offset] != ord(','):
+            return address, []
+        tags, offset = _read_string(data, offset)
+        args = []
+        for tag in tags[1:]:
+            if tag == 's':
+                value, offset = _read_string(data, offset)
+            elif tag == 'i':
+                value = _INT32.unpack_from(data, offset)[0]
+                offset += 4
+            elif tag == 'f':
+                value = _FLOAT32.unpack_from(data, offset)[0]
+                offset += 4
+            elif tag in 'TF':
+                value = tag == 'T'
+            else:
+                raise ValueError(f"不支持的OSC类型: {tag}")
+            args.append(value)
+        return address, args
+    except (IndexError, struct.error) as e:
+        raise ValueError(f"无效的OSC消息: {e}") from None
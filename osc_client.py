@@ -1,177 +1,619 @@
+import asyncio
 import logging
-from pythonosc import udp_client
-from pythonosc.osc_message_builder import OscMessageBuilder
-from config import Config
-import threading
+import socket
 import time
+from config import Config
+from osc_bundle import OscBundleEncoder, bool_message
+from heartbeat import HeartBeatScheduler
+from chatbox import ChatboxOutput
+from interpolation import InterpolatedOutput
 
 logger = logging.getLogger(__name__)
 
-class VRChatOSCClient:
+# 心率参数（地址, OSC类型, 换算函数），换算函数为None的布尔参数（HeartBeatToggle）由发送端按节拍切换
+# 其他参数约定可以用映射文件配置，见 mapping.py
+# 参考自该代码：
+# https://github.com/vard88508/vrc-osc-miband-hrm/blob/f60c3422c36921d317168ed38b1362528e8364e9/app.js#L24-L50
+HEART_RATE_PARAMETERS = [
+    ("/avatar/parameters/Heartrate", 'f', lambda hr: hr / 127 - 1),
+    ("/avatar/parameters/HeartRateFloat", 'f', lambda hr: hr / 127 - 1),
+    ("/avatar/parameters/Heartrate2", 'f', lambda hr: hr / 255),
+    ("/avatar/parameters/HeartRateFloat01", 'f', lambda hr: hr / 255),
+    ("/avatar/parameters/Heartrate3", 'i', round),
+    ("/avatar/parameters/HeartRateInt", 'i', round),
+    ("/avatar/parameters/HeartBeatToggle", 'b', None),
+]
+
+# 可选的统计参数（地址, OSC类型, HeartRateStats的属性名），数值取整后发送
+STAT_PARAMETERS = [
+    ("/avatar/parameters/HeartRateMin", 'i', "minimum"),
+    ("/avatar/parameters/HeartRateMax", 'i', "maximum"),
+    ("/avatar/parameters/HeartRateAvg", 'i', "average"),
+    ("/avatar/parameters/HeartRateAvg1m", 'i', "average_1m"),
+    ("/avatar/parameters/HeartRateAvg5m", 'i', "average_5m"),
+]
+
+PARAMETER_PREFIX = "/avatar/parameters/"
+
+
+def _select(entries, names, kind):
+    by_name = {entry[0][len(PARAMETER_PREFIX):]: entry for entry in entries}
+    unknown = [name for name in names if name not in by_name]
+    if unknown:
+        raise ValueError(f"未知的{kind}: {', '.join(unknown)}")
+    return [by_name[name] for name in names]
+
+
+def select_parameters(names=None):
+    """按参数名（不含地址前缀）选出参数子集，names为空时返回全部参数"""
+    if not names:
+        return list(HEART_RATE_PARAMETERS)
+    return _select(HEART_RATE_PARAMETERS, names, "心率参数")
+
+
+def select_stat_parameters(names=None):
+    """按参数名选出要发送的统计参数，names为空时不发送统计参数"""
+    if not names:
+        return []
+    return _select(STAT_PARAMETERS, names, "统计参数")
+
+
+CONNECTED_ADDRESS = "/avatar/parameters/PulsoidConnected"
+
+
+def parse_osc_target(value: str):
+    """解析 host:port 格式的OSC地址"""
+    host, sep, port = value.rpartition(':')
+    if not sep or not host:
+        raise ValueError(f"无效的OSC地址: {value}")
+    return host, int(port)
+
+
+def parse_osc_destination(value: str):
+    """解析 host:port[=参数名,参数名] 格式的OSC目标，返回 (host, port, 参数名列表或None)"""
+    target, sep, names = value.partition('=')
+    host, port = parse_osc_target(target)
+    names = [name.strip() for name in names.split(',') if name.strip()] if sep else None
+    return host, port, names or None
+
+
+class OscDestination:
+    """一个OSC发送目标
+
+    indices为该目标接收的参数序号集合，None表示全部参数；
+    address为解析后的套接字地址，单目标使用已连接的套接字时为None。
+    """
+
+    __slots__ = ("host", "port", "names", "indices", "address", "enabled", "datagrams", "errors")
+
+    def __init__(self, host: str, port: int, names=None):
+        self.host = host
+        self.port = port
+        self.names = names
+        self.indices = None
+        self.address = None
+        self.enabled = True
+        self.datagrams = 0
+        self.errors = 0
+
+    @property
+    def target(self):
+        return f"{self.host}:{self.port}"
+
+    def resolve_parameters(self, encoder):
+        """把参数名（可省略地址前缀）转换为编码器中的序号"""
+        if not self.names:
+            return
+        indices = set()
+        for name in self.names:
+            address = name if name.startswith('/') else PARAMETER_PREFIX + name
+            if address not in encoder.addresses:
+                raise ValueError(f"OSC目标 {self.target} 的参数不存在: {name}")
+            indices.add(encoder.index(address))
+        self.indices = frozenset(indices)
+
+
+def build_message(address: str, value) -> bytes:
+    """编码单条OSC消息（任意类型，只用于不频繁发送的自定义参数）"""
+    from pythonosc.osc_message_builder import OscMessageBuilder
+
+    builder = OscMessageBuilder(address=address)
+    builder.add_arg(value)
+    return builder.build().dgram
+
+
+class OscDatagramProtocol(asyncio.DatagramProtocol):
+    """OSC UDP发送端协议，只负责记录传输层错误"""
+
     def __init__(self):
-        self.client = None
+        self.transport = None
+        self.errors = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def error_received(self, exc):
+        # 目标端口未监听时（例如VRChat未启动）会收到ICMP错误，这里只计数
+        self.errors += 1
+        logger.debug(f"OSC传输错误: {exc}")
+
+
+class VRChatOSCClient:
+    def __init__(self, ip: str = None, port: int = None, parameters=None, heart_rate_stats=None,
+                 stat_parameters=None, destinations=None):
+        # 发送目标：[(host, port, 参数名列表或None)]，省略时使用单个 ip:port
+        if destinations is None and not (ip or port) and Config.OSC_DESTINATIONS:
+            destinations = [parse_osc_destination(value) for value in Config.OSC_DESTINATIONS]
+        if not destinations:
+            destinations = [(ip or Config.OSC_IP, port or Config.OSC_PORT, None)]
+        self.destinations = [OscDestination(host, target_port, names) for host, target_port, names in destinations]
+        self.ip = self.destinations[0].host
+        self.port = self.destinations[0].port
+        self.transport = None
+        self.protocol = None
         self.connected = False
         self.last_heart_rate = 0
-        self.keepalive_thread = None
-        self.running = False
+        self.keepalive_handle = None
         self.hb_toggle = False  # 心跳切换状态
-        
-    def connect(self):
+        self.use_bundle = Config.OSC_USE_BUNDLE
+        self.parameters = parameters or HEART_RATE_PARAMETERS
+        # 统计参数排在心率参数之后，和心率参数编码在同一个bundle中
+        self.heart_rate_stats = heart_rate_stats
+        self.stat_parameters = list(stat_parameters or []) if heart_rate_stats else []
+        all_parameters = list(self.parameters) + self.stat_parameters
+        self.encoder = OscBundleEncoder([(address, type_tag) for address, type_tag, _ in all_parameters])
+        # 当前模型拥有的参数序号，默认全部发送（见 avatar.AvatarTracker）
+        self._active_indices = list(range(len(self.encoder)))
+        self._toggle_active = True
+        self._status_active = True
+        for destination in self.destinations:
+            destination.resolve_parameters(self.encoder)
+        # 预先绑定每个参数的写入函数，发送时不再做类型分发
+        self._fields = []
+        self._toggle_index = None
+        for index, (address, type_tag, transform) in enumerate(self.parameters):
+            if type_tag == 'b' and transform is None:
+                self._toggle_index = index
+            elif type_tag == 'b':
+                self._fields.append((index, self.encoder.set_bool, transform))
+            elif type_tag == 'f':
+                self._fields.append((index, self.encoder.set_float, transform))
+            else:
+                self._fields.append((index, self.encoder.set_int, transform))
+        offset = len(self.parameters)
+        self._stat_fields = [
+            (offset + index, attribute)
+            for index, (_, _, attribute) in enumerate(self.stat_parameters)
+        ]
+        # 变化驱动发送：记录每个参数最后一次发送的编码值和发送时间
+        self.change_driven = Config.OSC_CHANGE_DRIVEN
+        self.min_interval = 1 / Config.OSC_MAX_SEND_RATE if Config.OSC_MAX_SEND_RATE else 0
+        self.refresh_interval = Config.OSC_REFRESH_INTERVAL
+        self._quanta = [
+            Config.OSC_FLOAT_QUANTUM if type_tag == 'f' else 0
+            for _, type_tag, _ in all_parameters
+        ]
+        self._last_keys = [None] * len(self.encoder)
+        self._last_sent = [float('-inf')] * len(self.encoder)
+        self._selected = []
+        self._flush_handle = None
+        # 按实际心率节拍切换HeartBeatToggle，而不是每个样本切换一次
+        self.beat_scheduler = None
+        if Config.HEARTBEAT_SYNC and self._toggle_index is not None:
+            self.beat_scheduler = HeartBeatScheduler(
+                self.send_beat,
+                spin_margin=Config.HEARTBEAT_SPIN_MARGIN
+            )
+        # 可选的固定频率插值输出，心率样本只更新目标值
+        self.interpolator = None
+        if Config.INTERPOLATION_ENABLED:
+            self.interpolator = InterpolatedOutput(
+                self._output_smoothed,
+                rate=Config.INTERPOLATION_RATE,
+                filter_name=Config.INTERPOLATION_FILTER,
+                smoothing_time=Config.INTERPOLATION_SMOOTHING_TIME
+            )
+        # 可选的聊天框输出，显示原始心率（不经过插值）
+        self.chatbox = ChatboxOutput(self._send_chatbox) if Config.CHATBOX_ENABLED else None
+        self.stats = {
+            "samples": 0,
+            "datagrams": 0,
+            "messages_sent": 0,
+            "beats": 0,
+            "send_errors": 0,
+        }
+        # 连接状态消息只编码一次
+        self._status_messages = {
+            True: bool_message(CONNECTED_ADDRESS, True),
+            False: bool_message(CONNECTED_ADDRESS, False),
+        }
+
+    async def connect(self):
         """连接到VRChat OSC"""
         try:
-            self.client = udp_client.SimpleUDPClient(Config.OSC_IP, Config.OSC_PORT)
+            loop = asyncio.get_running_loop()
+            if len(self.destinations) == 1:
+                # 单个目标使用已连接的套接字，可以收到目标端口不可达的错误
+                self.transport, self.protocol = await loop.create_datagram_endpoint(
+                    OscDatagramProtocol,
+                    remote_addr=(self.ip, self.port)
+                )
+            else:
+                await self._open_shared_socket(loop)
             self.connected = True
-            self.running = True
-            logger.info(f"OSC客户端已连接到 {Config.OSC_IP}:{Config.OSC_PORT}")
-            
-            # 启动保活线程
+            # 新连接上的接收端需要收到全部参数
+            self._last_keys = [None] * len(self.encoder)
+            self._last_sent = [float('-inf')] * len(self.encoder)
+            logger.info(f"OSC客户端已连接到 {', '.join(d.target for d in self.destinations if d.enabled)}")
+
+            # 启动保活定时器
             self.start_keepalive()
             return True
-            
+
         except Exception as e:
             logger.error(f"OSC连接失败: {e}")
             self.connected = False
             return False
-    
+
+    async def _open_shared_socket(self, loop):
+        """多个目标共用一个未连接的非阻塞UDP套接字，目标地址预先解析"""
+        family = None
+        for destination in self.destinations:
+            try:
+                infos = await loop.getaddrinfo(destination.host, destination.port, type=socket.SOCK_DGRAM)
+            except OSError as e:
+                # 单个目标无法解析不影响其他目标
+                logger.error(f"无法解析OSC目标 {destination.target}: {e}")
+                destination.enabled = False
+                continue
+            address_family, _, _, _, address = infos[0]
+            if family is None:
+                family = address_family
+            elif address_family != family:
+                logger.error(f"OSC目标 {destination.target} 的地址类型与其他目标不同，已忽略")
+                destination.enabled = False
+                continue
+            destination.address = address
+        if family is None:
+            raise OSError("没有可用的OSC目标")
+        self.transport, self.protocol = await loop.create_datagram_endpoint(
+            OscDatagramProtocol,
+            family=family
+        )
+
     def disconnect(self):
         """断开OSC连接"""
-        self.running = False
         self.connected = False
-        
-        if self.keepalive_thread and self.keepalive_thread.is_alive():
-            self.keepalive_thread.join(timeout=1)
-        
+
+        if self.keepalive_handle:
+            self.keepalive_handle.cancel()
+            self.keepalive_handle = None
+
+        if self._flush_handle:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        if self.beat_scheduler:
+            self.beat_scheduler.stop()
+
+        if self.interpolator:
+            self.interpolator.stop()
+
+        if self.chatbox:
+            self.chatbox.stop()
+
+        if self.transport:
+            self.transport.close()
+            self.transport = None
+
         logger.info("OSC客户端已断开")
-    
+
     def send_heart_rate(self, heart_rate: int):
         """发送心率数据到VRChat - 完全匹配Node.js版本的参数"""
-        if not self.connected or not self.client:
+        if not self.connected or not self.transport:
             logger.warning("OSC未连接，无法发送心率数据")
             return False
-        
+
         try:
-            # 参考自该代码：
-            # https://github.com/vard88508/vrc-osc-miband-hrm/blob/f60c3422c36921d317168ed38b1362528e8364e9/app.js#L24-L50
-            # 完全匹配Node.js版本的心率参数
-            heartrates = [
-                {
-                    'address': '/avatar/parameters/Heartrate',
-                    'args': {
-                        'type': 'f',
-                        'value': heart_rate / 127 - 1
-                    }
-                },
-                {
-                    'address': "/avatar/parameters/HeartRateFloat",
-                    'args': {
-                        'type': "f",
-                        'value': heart_rate / 127 - 1
-                    }
-                },
-                {
-                    'address': "/avatar/parameters/Heartrate2",
-                    'args': {
-                        'type': "f",
-                        'value': heart_rate / 255
-                    }
-                },
-                {
-                    'address': "/avatar/parameters/HeartRateFloat01",
-                    'args': {
-                        'type': "f",
-                        'value': heart_rate / 255
-                    }
-                },
-                {
-                    'address': "/avatar/parameters/Heartrate3",
-                    'args': {
-                        'type': "i",
-                        'value': heart_rate
-                    }
-                },
-                {
-                    'address': "/avatar/parameters/HeartRateInt",
-                    'args': {
-                        'type': "i",
-                        'value': heart_rate
-                    }
-                },
-                {
-                    'address': "/avatar/parameters/HeartBeatToggle",
-                    'args': {
-                        'type': "b",
-                        'value': self.hb_toggle
-                    }
-                }
-            ]
-            
-            # 发送所有心率参数
-            for element in heartrates:
-                try:
-                    address = element['address']
-                    value = element['args']['value']
-                    
-                    self.client.send_message(address, value)
-                    
-                    # 心跳切换参数发送后切换状态
-                    if address == "/avatar/parameters/HeartBeatToggle":
-                        self.hb_toggle = not self.hb_toggle
-                        
-                except Exception as e:
-                    logger.error(f"发送OSC消息失败 {element['address']}: {e}")
-            
+            if self.beat_scheduler:
+                self.beat_scheduler.update(heart_rate)
+            elif self._toggle_index is not None:
+                self.encoder.set_bool(self._toggle_index, self.hb_toggle)
+                # 心跳切换参数发送后切换状态
+                self.hb_toggle = not self.hb_toggle
+
+            if self.interpolator:
+                self.interpolator.update(heart_rate)
+            else:
+                self._output(heart_rate)
+
+            if self.chatbox:
+                self.chatbox.update(heart_rate)
+
             self.last_heart_rate = heart_rate
-            logger.debug(f"已发送心率数据到VRChat: {heart_rate} bpm")
+            logger.debug("已发送心率数据到VRChat: %d bpm", heart_rate)
             return True
-            
+
         except Exception as e:
+            self.stats["send_errors"] += 1
             logger.error(f"发送OSC消息失败: {e}")
             return False
-    
+
+    def _output(self, heart_rate):
+        """编码并发送一个心率值（可以是插值得到的小数）"""
+        for index, setter, transform in self._fields:
+            setter(index, transform(heart_rate))
+        if self._stat_fields:
+            stats = self.heart_rate_stats
+            set_int = self.encoder.set_int
+            for index, attribute in self._stat_fields:
+                set_int(index, round(getattr(stats, attribute)))
+
+        self.stats["samples"] += 1
+        if self.change_driven:
+            self._flush(time.monotonic())
+        else:
+            self._send_all()
+
+    def _output_smoothed(self, value):
+        """插值引擎的tick回调"""
+        if self.connected and self.transport:
+            self._output(value)
+
+    def set_time_scale(self, speed: float):
+        """回放加速时按回放速度缩短每参数的速率上限和刷新间隔（两者按本机时钟计时）
+
+        speed为0（尽可能快）时不限速，刷新间隔不变。
+        """
+        min_interval = 1 / Config.OSC_MAX_SEND_RATE if Config.OSC_MAX_SEND_RATE else 0
+        if speed:
+            self.min_interval = min_interval / speed
+            self.refresh_interval = Config.OSC_REFRESH_INTERVAL / speed
+        else:
+            self.min_interval = 0
+            self.refresh_interval = Config.OSC_REFRESH_INTERVAL
+
+    @property
+    def active_parameter_count(self):
+        return len(self._active_indices)
+
+    def set_avatar_parameters(self, addresses=None):
+        """只发送当前模型拥有的参数，addresses为None时发送全部参数
+
+        切换模型后新模型的参数都是默认值，立即重发当前的全部参数和连接状态。
+        """
+        encoder = self.encoder
+        if addresses is None:
+            self._active_indices = list(range(len(encoder)))
+        else:
+            self._active_indices = [
+                index for index, address in enumerate(encoder.addresses) if address in addresses
+            ]
+        self._toggle_active = self._toggle_index is not None and self._toggle_index in self._active_indices
+        self._status_active = addresses is None or CONNECTED_ADDRESS in addresses
+        self._last_keys = [None] * len(encoder)
+        self._last_sent = [float('-inf')] * len(encoder)
+
+        if not self.connected or not self.transport:
+            return
+        if self.stats["samples"] and self._active_indices:
+            now = time.monotonic()
+            for index in self._active_indices:
+                self._last_keys[index] = self._change_key(index)
+                self._last_sent[index] = now
+            self._send_parameters(self._active_indices)
+        self.send_connection_status(True)
+
+    def send_beat(self):
+        """切换并单独发送HeartBeatToggle，由节拍调度器在每一拍调用"""
+        if not self.connected or not self.transport or not self._toggle_active:
+            return
+
+        index = self._toggle_index
+        encoder = self.encoder
+        encoder.set_bool(index, self.hb_toggle)
+        self.hb_toggle = not self.hb_toggle
+        message = encoder.message(index)
+        sent = 0
+        for destination in self.destinations:
+            if destination.enabled and (destination.indices is None or index in destination.indices):
+                sent += self._sendto(destination, message)
+        if not sent:
+            return
+        # 同步变化检测状态，避免心率样本再次发送同一个值
+        self._last_keys[index] = encoder.raw(index)
+        self._last_sent[index] = time.monotonic()
+        self.stats["datagrams"] += sent
+        self.stats["beats"] += 1
+
+    def _sendto(self, destination, data):
+        """发送到单个目标，出错只记在该目标上，不影响其他目标"""
+        try:
+            self.transport.sendto(data, destination.address)
+        except Exception as e:
+            destination.errors += 1
+            self.stats["send_errors"] += 1
+            logger.debug(f"发送到OSC目标 {destination.target} 失败: {e}")
+            return 0
+        destination.datagrams += 1
+        return 1
+
+    def _broadcast(self, data):
+        """发送到全部目标，返回成功的目标数"""
+        sent = 0
+        for destination in self.destinations:
+            if destination.enabled:
+                sent += self._sendto(destination, data)
+        return sent
+
+    def _send_parameters(self, selected):
+        """把选中的参数发送到每个目标
+
+        每个参数子集只拼装一次，接收相同子集的目标共用同一份编码结果。
+        """
+        encoder = self.encoder
+        payloads = {}
+        datagrams = 0
+        for destination in self.destinations:
+            if not destination.enabled:
+                continue
+            indices = selected
+            key = None
+            if destination.indices is not None:
+                indices = [index for index in selected if index in destination.indices]
+                if not indices:
+                    continue
+                key = tuple(indices)
+
+            if not self.use_bundle:
+                # 逐条发送，兼容不支持bundle的接收端
+                for index in indices:
+                    datagrams += self._sendto(destination, encoder.message(index))
+                continue
+
+            payload = payloads.get(key)
+            if payload is None:
+                if len(indices) == len(encoder):
+                    payload = encoder.buffer
+                else:
+                    payload = encoder.bundle_of(indices)
+                payloads[key] = payload
+            datagrams += self._sendto(destination, payload)
+
+        self.stats["datagrams"] += datagrams
+        self.stats["messages_sent"] += len(selected)
+
+    def _send_all(self):
+        """发送全部参数"""
+        if self._active_indices:
+            self._send_parameters(self._active_indices)
+
+    def _change_key(self, index: int):
+        """参数用于变化检测的量化值"""
+        quantum = self._quanta[index]
+        if quantum:
+            return round(self.encoder.get_float(index) / quantum)
+        return self.encoder.raw(index)
+
+    def _flush(self, now: float):
+        """只发送量化值发生变化（且未超过速率上限）或需要定期刷新的参数"""
+        last_keys = self._last_keys
+        last_sent = self._last_sent
+        selected = self._selected
+        selected.clear()
+        retry_at = None
+
+        for index in self._active_indices:
+            key = self._change_key(index)
+            elapsed = now - last_sent[index]
+            if key != last_keys[index]:
+                if elapsed < self.min_interval:
+                    # 超过速率上限，推迟到允许发送的时刻
+                    due = last_sent[index] + self.min_interval
+                    retry_at = due if retry_at is None else min(retry_at, due)
+                    continue
+            elif elapsed < self.refresh_interval:
+                continue
+            last_keys[index] = key
+            last_sent[index] = now
+            selected.append(index)
+
+        if selected:
+            self._send_parameters(selected)
+
+        if retry_at is not None and self._flush_handle is None:
+            loop = asyncio.get_running_loop()
+            self._flush_handle = loop.call_later(retry_at - now, self._flush_pending)
+
+    def _flush_pending(self):
+        """发送因速率上限被推迟的参数"""
+        self._flush_handle = None
+        if not self.connected or not self.transport:
+            return
+        self._flush(time.monotonic())
+
+    def get_stats(self):
+        """获取发送统计，包括变化驱动节省的包数"""
+        stats = dict(self.stats)
+        # 每个样本都发送全部参数时的消息数
+        baseline = stats["samples"] * len(self.encoder)
+        suppressed = max(baseline - stats["messages_sent"], 0)
+        stats["messages_baseline"] = baseline
+        stats["messages_suppressed"] = suppressed
+        stats["savings_ratio"] = suppressed / baseline if baseline else 0.0
+        if self.beat_scheduler:
+            stats["beat_jitter"] = self.beat_scheduler.stats()
+        if self.chatbox:
+            stats["chatbox"] = self.chatbox.stats()
+        if len(self.destinations) > 1:
+            stats["destinations"] = {
+                destination.target: {
+                    "enabled": destination.enabled,
+                    "datagrams": destination.datagrams,
+                    "errors": destination.errors,
+                }
+                for destination in self.destinations
+            }
+        return stats
+
     def send_keepalive(self):
         """发送保活消息"""
-        if not self.connected or not self.client:
+        if not self.connected or not self.transport or not self._status_active:
             return
-        
-        try:
-            # 发送保活信号
-            self.client.send_message("/avatar/parameters/PulsoidConnected", True)
+
+        # 发送保活信号
+        if self._broadcast(self._status_messages[True]):
             logger.debug("已发送OSC保活信号")
-        except Exception as e:
-            logger.warning(f"发送保活信号失败: {e}")
-    
+        else:
+            logger.warning("发送保活信号失败")
+
+    def _keepalive_tick(self):
+        self.send_keepalive()
+        if self.connected:
+            loop = asyncio.get_running_loop()
+            self.keepalive_handle = loop.call_later(Config.OSC_KEEPALIVE_INTERVAL, self._keepalive_tick)
+
     def start_keepalive(self):
-        """启动保活线程"""
-        def keepalive_worker():
-            while self.running:
-                self.send_keepalive()
-                time.sleep(30)  # 每30秒发送一次保活信号
-        
-        self.keepalive_thread = threading.Thread(target=keepalive_worker, daemon=True)
-        self.keepalive_thread.start()
-        logger.info("OSC保活线程已启动")
-    
+        """启动保活定时器"""
+        loop = asyncio.get_running_loop()
+        self.keepalive_handle = loop.call_soon(self._keepalive_tick)
+        logger.info("OSC保活定时器已启动")
+
     def send_connection_status(self, connected: bool):
         """发送连接状态"""
-        if not self.connected or not self.client:
+        if not self.connected or not self.transport or not self._status_active:
             return
-        
-        try:
-            self.client.send_message("/avatar/parameters/PulsoidConnected", connected)
+
+        if self._broadcast(self._status_messages[bool(connected)]):
             logger.debug(f"已发送连接状态: {connected}")
-        except Exception as e:
-            logger.warning(f"发送连接状态失败: {e}")
-    
+        else:
+            logger.warning("发送连接状态失败")
+
     def send_custom_parameter(self, parameter: str, value):
         """发送自定义参数"""
-        if not self.connected or not self.client:
+        if not self.connected or not self.transport:
             logger.warning("OSC未连接，无法发送自定义参数")
             return False
-        
+
         try:
-            self.client.send_message(f"/avatar/parameters/{parameter}", value)
-            logger.debug(f"已发送自定义参数: {parameter} = {value}")
-            return True
+            message = build_message(f"/avatar/parameters/{parameter}", value)
         except Exception as e:
+            self.stats["send_errors"] += 1
             logger.error(f"发送自定义参数失败: {e}")
-            return False
\ No newline at end of file
+            return False
+        if self._broadcast(message):
+            logger.debug(f"已发送自定义参数: {parameter} = {value}")
+            return True
+        logger.error("发送自定义参数失败")
+        return False
+
+    def _send_chatbox(self, message: bytes):
+        """发送聊天框消息（由ChatboxOutput限速），只列出了部分参数的目标不接收"""
+        if not self.connected or not self.transport:
+            return 0
+        sent = 0
+        for destination in self.destinations:
+            if destination.enabled and destination.indices is None:
+                sent += self._sendto(destination, message)
+        self.stats["datagrams"] += sent
+        return sent
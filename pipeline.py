@@ -0,0 +1,105 @@
+import asyncio
+import logging
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class LatestSampleMailbox:
+    """单槽"最新样本"邮箱
+
+    写入方永远不会阻塞，新样本直接覆盖尚未被取走的旧样本，被覆盖的样本计入coalesced。
+    只支持单个消费者。
+    """
+
+    def __init__(self):
+        self._value = None
+        self._pending = False
+        self._event = asyncio.Event()
+        self.received = 0
+        self.delivered = 0
+        self.coalesced = 0
+
+    def put(self, value):
+        """写入样本，覆盖未被消费的旧样本"""
+        if self._pending:
+            self.coalesced += 1
+        self._value = value
+        self._pending = True
+        self.received += 1
+        self._event.set()
+
+    @property
+    def pending(self):
+        return self._pending
+
+    async def get(self):
+        """等待并取出最新样本"""
+        while not self._pending:
+            self._event.clear()
+            await self._event.wait()
+        return self.take()
+
+    def take(self):
+        """不等待，取出尚未消费的样本（调用前先检查pending）"""
+        value = self._value
+        self._value = None
+        self._pending = False
+        self.delivered += 1
+        return value
+
+
+class CoalescingPipeline:
+    """接收与发送解耦的流水线
+
+    接收端调用submit把样本写入邮箱后立即返回，独立的发送任务取出最新样本并调用handler。
+    发送端处理不过来时（突发或重连后的补发），过时的样本会被丢弃而不是排队。
+    """
+
+    def __init__(self, handler: Callable):
+        self.handler = handler
+        self.mailbox = LatestSampleMailbox()
+        self.task = None
+
+    def submit(self, value):
+        self.mailbox.put(value)
+
+    def start(self):
+        """启动发送任务"""
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+        return self.task
+
+    async def stop(self):
+        """停止发送任务，邮箱中还没有处理的样本（例如回放的最后一个样本）先交给handler"""
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        if self.mailbox.pending:
+            try:
+                self.handler(self.mailbox.take())
+            except Exception as e:
+                logger.error(f"流水线处理样本时出错: {e}")
+
+    async def _run(self):
+        mailbox = self.mailbox
+        handler = self.handler
+        while True:
+            value = await mailbox.get()
+            try:
+                handler(value)
+            except Exception as e:
+                logger.error(f"流水线处理样本时出错: {e}")
+
+    def stats(self):
+        """获取流水线计数"""
+        mailbox = self.mailbox
+        return {
+            "received": mailbox.received,
+            "delivered": mailbox.delivered,
+            "coalesced": mailbox.coalesced,
+        }
@@ -0,0 +1,180 @@
+"""
+--profile 运行模式：分阶段计时，以及按信号输出cProfile和tracemalloc快照
+
+- 分阶段计时：instrument() 把对象上的方法替换为计时包装（perf_counter_ns），
+  不开启分析时不做任何替换，热路径上没有额外的判断，开销为零
+- 收到 SIGUSR1（Windows上为 SIGBREAK，即Ctrl+Break）时把自上次输出以来的cProfile统计、
+  当前的tracemalloc快照和各阶段计时写入 PROFILE_DIR，桥接继续运行
+- 各阶段可以嵌套（handler 包含 log 和 osc_send），耗时分别统计
+"""
+
+import asyncio
+import json
+import logging
+import os
+import signal
+import time
+from pathlib import Path
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def snapshot_signal():
+    """触发输出快照的信号，平台不支持时返回None"""
+    return getattr(signal, "SIGUSR1", None) or getattr(signal, "SIGBREAK", None)
+
+
+class StageTimer:
+    """一个阶段的调用次数、总耗时和最大耗时"""
+
+    __slots__ = ("count", "total_ns", "max_ns")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def summary(self):
+        return {
+            "calls": self.count,
+            "total_ms": self.total_ns / 1e6,
+            "mean_us": self.total_ns / self.count / 1e3 if self.count else 0.0,
+            "max_us": self.max_ns / 1e3,
+        }
+
+
+class Profiler:
+    def __init__(self, directory: str = None, cprofile: bool = None, tracemalloc_frames: int = None):
+        self.directory = Path(directory or Config.PROFILE_DIR)
+        self.cprofile = Config.PROFILE_CPROFILE if cprofile is None else cprofile
+        self.tracemalloc_frames = (
+            Config.PROFILE_TRACEMALLOC_FRAMES if tracemalloc_frames is None else tracemalloc_frames
+        )
+        self.stages = {}
+        self.snapshots = 0
+        self._profile = None
+        self._signal = None
+        self._loop = None
+        self._dumping = False
+
+    def stage(self, name: str):
+        timer = self.stages.get(name)
+        if timer is None:
+            timer = self.stages[name] = StageTimer()
+        return timer
+
+    def instrument(self, obj, attribute: str, stage: str):
+        """把 obj.attribute 替换为记录到 stage 的计时包装，返回包装后的函数"""
+        original = getattr(obj, attribute)
+        timer = self.stage(stage)
+        perf_counter_ns = time.perf_counter_ns
+
+        def timed(*args, **kwargs):
+            # 抛出异常的调用不计入
+            started = perf_counter_ns()
+            result = original(*args, **kwargs)
+            elapsed = perf_counter_ns() - started
+            timer.count += 1
+            timer.total_ns += elapsed
+            if elapsed > timer.max_ns:
+                timer.max_ns = elapsed
+            return result
+
+        timed.__wrapped__ = original
+        setattr(obj, attribute, timed)
+        return timed
+
+    def start(self):
+        """开始cProfile和tracemalloc，并注册快照信号"""
+        if self.tracemalloc_frames:
+            import tracemalloc
+            tracemalloc.start(self.tracemalloc_frames)
+        if self.cprofile:
+            import cProfile
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+        self._loop = asyncio.get_running_loop()
+        self._signal = snapshot_signal()
+        if self._signal is not None:
+            try:
+                self._loop.add_signal_handler(self._signal, self.request_snapshot)
+            except NotImplementedError:
+                # Windows的事件循环不支持add_signal_handler
+                signal.signal(self._signal, lambda signum, frame: self._loop.call_soon_threadsafe(self.request_snapshot))
+            logger.info(f"性能分析已开启，发送 {self._signal.name} 信号（pid {os.getpid()}）输出快照到 {self.directory}")
+        else:
+            logger.info(f"性能分析已开启，快照在退出时输出到 {self.directory}")
+
+    def request_snapshot(self):
+        if not self._dumping:
+            asyncio.create_task(self.dump())
+
+    async def dump(self):
+        """输出快照，返回写出的文件列表"""
+        self._dumping = True
+        try:
+            prefix = self.directory / f"profile-{os.getpid()}-{time.strftime('%Y%m%d-%H%M%S')}-{self.snapshots}"
+            self.snapshots += 1
+            stats = self.summary()
+            # cProfile只记录启用它的线程：在事件循环线程中换成新的实例，已停止的实例交给线程写出
+            profile = self._profile
+            if profile is not None:
+                profile.disable()
+                import cProfile
+                self._profile = cProfile.Profile()
+                self._profile.enable()
+            snapshot = None
+            if self.tracemalloc_frames:
+                import tracemalloc
+                if tracemalloc.is_tracing():
+                    snapshot = tracemalloc.take_snapshot()
+                    stats["tracemalloc"] = dict(zip(("current_bytes", "peak_bytes"), tracemalloc.get_traced_memory()))
+            loop = asyncio.get_running_loop()
+            paths = await loop.run_in_executor(None, self._write, prefix, stats, profile, snapshot)
+            logger.info("性能分析快照: %s", ", ".join(str(path) for path in paths))
+            return paths
+        except Exception as e:
+            logger.error(f"输出性能分析快照失败: {e}")
+            return []
+        finally:
+            self._dumping = False
+
+    def _write(self, prefix, stats, profile, snapshot):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        paths = [prefix.with_suffix(".json")]
+        paths[0].write_text(json.dumps(stats, indent=2), encoding="utf-8")
+        if profile is not None:
+            paths.append(prefix.with_suffix(".prof"))
+            profile.dump_stats(paths[-1])
+        if snapshot is not None:
+            paths.append(prefix.with_suffix(".tracemalloc"))
+            snapshot.dump(paths[-1])
+        return paths
+
+    def stop(self):
+        if self._signal is not None and self._loop is not None:
+            try:
+                self._loop.remove_signal_handler(self._signal)
+            except NotImplementedError:
+                signal.signal(self._signal, signal.SIG_DFL)
+            self._signal = None
+        if self._profile is not None:
+            self._profile.disable()
+            self._profile = None
+        if self.tracemalloc_frames:
+            import tracemalloc
+            tracemalloc.stop()
+
+    def summary(self):
+        return {name: timer.summary() for name, timer in self.stages.items()}
+
+    def log_summary(self):
+        for name, timer in self.stages.items():
+            stats = timer.summary()
+            logger.info(
+                "阶段 %s: %d 次，平均 %.1f us，最大 %.1f us，合计 %.1f ms",
+                name, stats["calls"], stats["mean_us"], stats["max_us"], stats["total_ms"]
+            )
@@ -0,0 +1,180 @@
+import asyncio
+import logging
+import mmap
+import struct
+import time
+from pathlib import Path
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# 文件头: 魔数 + 版本 + 单条记录长度，补齐到16字节
+HEADER = struct.Struct("<8sHH4x")
+MAGIC = b"PHRREC\x00\x00"
+VERSION = 1
+
+# 单条记录: measured_at（Pulsoid毫秒时间戳，缺失为0）、received_at（本机微秒时间戳）、bpm
+RECORD = struct.Struct("<qqH")
+
+
+class SessionRecorder:
+    """把心率样本追加到定长二进制文件
+
+    记录先写入预分配的缓冲区，缓冲区写满或距上次写盘超过
+    RECORDER_FLUSH_INTERVAL 秒时批量写入文件。
+    """
+
+    def __init__(self, path, buffer_records: int = 256, flush_interval: float = None):
+        self.path = Path(path)
+        self.flush_interval = Config.RECORDER_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self.buffer = bytearray(RECORD.size * buffer_records)
+        self.pending = 0
+        self.records = 0
+        self.last_flush = time.monotonic()
+
+        new_file = not self.path.exists() or self.path.stat().st_size == 0
+        if not new_file:
+            with open(self.path, "rb") as f:
+                _check_header(f.read(HEADER.size), self.path)
+        self.file = open(self.path, "ab")
+        if new_file:
+            self.file.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+
+    def record(self, heart_rate: int, measured_at=None, received_at: int = None):
+        """追加一个样本，received_at为微秒时间戳，省略时取当前时间"""
+        if received_at is None:
+            received_at = time.time_ns() // 1000
+        RECORD.pack_into(self.buffer, self.pending * RECORD.size,
+                         measured_at or 0, received_at, heart_rate)
+        self.pending += 1
+        self.records += 1
+        if self.pending * RECORD.size == len(self.buffer):
+            self.flush()
+        elif self.flush_interval and time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            self.file.write(memoryview(self.buffer)[:self.pending * RECORD.size])
+            self.pending = 0
+        self.file.flush()
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        if self.file.closed:
+            return
+        try:
+            self.flush()
+        finally:
+            self.file.close()
+
+
+def _check_header(data, path):
+    if len(data) < HEADER.size:
+        raise ValueError(f"会话文件不完整: {path}")
+    magic, version, record_size = HEADER.unpack(data)
+    if magic != MAGIC:
+        raise ValueError(f"不是心率会话文件: {path}")
+    if version != VERSION or record_size != RECORD.size:
+        raise ValueError(f"不支持的会话文件版本: {path} (版本 {version}，记录长度 {record_size})")
+
+
+class SessionFile:
+    """以mmap方式只读打开会话文件，按下标或迭代访问记录，不整体载入内存"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.file = open(self.path, "rb")
+        try:
+            _check_header(self.file.read(HEADER.size), self.path)
+            size = self.path.stat().st_size
+            # 写入中断时末尾可能有不完整的记录，忽略
+            self.count = (size - HEADER.size) // RECORD.size
+            self.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if self.count else None
+        except Exception:
+            self.file.close()
+            raise
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        return RECORD.unpack_from(self.mmap, HEADER.size + index * RECORD.size)
+
+    def __iter__(self):
+        """依次产出 (measured_at, received_at, bpm)"""
+        if not self.count:
+            return iter(())
+        end = HEADER.size + self.count * RECORD.size
+        return RECORD.iter_unpack(memoryview(self.mmap)[HEADER.size:end])
+
+    def close(self):
+        if self.mmap is not None:
+            self.mmap.close()
+            self.mmap = None
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ReplaySource:
+    """按记录时的时间间隔回放会话文件，代替WebSocket客户端驱动桥接
+
+    speed为1时按原速回放，大于1时加速，为0时尽可能快地回放。
+    """
+
+    def __init__(self, path, on_heart_rate, speed: float = 1.0, metrics=None):
+        self.path = Path(path)
+        self.on_heart_rate = on_heart_rate
+        self.speed = speed
+        self.metrics = metrics
+        self.running = False
+        self.replayed = 0
+        self._stop_event = None
+
+    async def run(self):
+        self.running = True
+        self._stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        with SessionFile(self.path) as session:
+            logger.info(f"开始回放 {self.path}（{len(session)} 个样本，速度 {self.speed or '最快'}）")
+            started = loop.time()
+            first = None
+            for measured_at, received_at, heart_rate in session:
+                if not self.running:
+                    break
+                if first is None:
+                    first = received_at
+                if self.speed:
+                    delay = started + (received_at - first) / 1e6 / self.speed - loop.time()
+                    if delay > 0:
+                        try:
+                            await asyncio.wait_for(self._stop_event.wait(), delay)
+                            break
+                        except asyncio.TimeoutError:
+                            pass
+                else:
+                    # 全速回放时每个样本让出一次事件循环，让发送流水线跟上
+                    await asyncio.sleep(0)
+
+                if self.metrics:
+                    # 回放数据的测量时间是过去的，不计入传感器延迟
+                    self.metrics.record_frame(None)
+                self.on_heart_rate(heart_rate)
+                self.replayed += 1
+        logger.info(f"回放结束，共 {self.replayed} 个样本，用时 {loop.time() - started:.2f} 秒")
+        self.running = False
+
+    async def stop(self):
+        self.running = False
+        if self._stop_event:
+            self._stop_event.set()
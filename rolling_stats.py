@@ -0,0 +1,115 @@
+import time
+from array import array
+
+
+class RollingAverage:
+    """时间窗口内的滑动平均
+
+    样本按秒聚合，每秒的和与样本数保存在长度为窗口秒数的环形数组中（第 秒 % 窗口 个位置），
+    同时维护窗口内的累加和与样本数。进入新的一秒时清空期间经过的位置，均摊O(1)；
+    内存在创建时一次分配，之后不随样本频率和会话长度变化，也不产生新对象。
+    """
+
+    __slots__ = ("window", "sums", "counts", "latest", "total", "count")
+
+    def __init__(self, window: float):
+        self.window = size = max(1, int(window))
+        self.sums = array("d", bytes(8 * size))
+        self.counts = array("l", bytes(array("l").itemsize * size))
+        # 最近一个样本所在的秒
+        self.latest = None
+        self.total = 0
+        self.count = 0
+
+    def add(self, now: float, value):
+        second = int(now)
+        size = self.window
+        sums = self.sums
+        counts = self.counts
+        slot = second % size
+        latest = self.latest
+        if second != latest:
+            if latest is None or second - latest >= size:
+                # 第一个样本，或者窗口内的数据已经全部过期
+                for index in range(size):
+                    sums[index] = 0.0
+                    counts[index] = 0
+                self.total = 0
+                self.count = 0
+                self.latest = second
+            elif second > latest:
+                # 清空从上一个样本到现在经过的秒（通常只有一秒）
+                passed = latest + 1
+                while True:
+                    index = passed % size
+                    self.total -= sums[index]
+                    self.count -= counts[index]
+                    sums[index] = 0.0
+                    counts[index] = 0
+                    if passed == second:
+                        break
+                    passed += 1
+                self.latest = second
+            elif second <= latest - size:
+                # 比窗口还早的样本
+                return
+
+        sums[slot] += value
+        counts[slot] += 1
+        self.total += value
+        self.count += 1
+
+    @property
+    def value(self):
+        return self.total / self.count if self.count else 0.0
+
+
+class HeartRateStats:
+    """会话最小值/最大值/平均值，以及1分钟和5分钟滑动平均"""
+
+    __slots__ = ("minimum", "maximum", "total", "count", "window_1m", "window_5m")
+
+    def __init__(self):
+        self.minimum = 0
+        self.maximum = 0
+        self.total = 0
+        self.count = 0
+        self.window_1m = RollingAverage(60)
+        self.window_5m = RollingAverage(300)
+
+    def update(self, heart_rate, now: float = None):
+        if now is None:
+            now = time.monotonic()
+        if self.count:
+            if heart_rate < self.minimum:
+                self.minimum = heart_rate
+            elif heart_rate > self.maximum:
+                self.maximum = heart_rate
+        else:
+            self.minimum = self.maximum = heart_rate
+        self.total += heart_rate
+        self.count += 1
+        self.window_1m.add(now, heart_rate)
+        self.window_5m.add(now, heart_rate)
+
+    @property
+    def average(self):
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def average_1m(self):
+        return self.window_1m.value
+
+    @property
+    def average_5m(self):
+        return self.window_5m.value
+
+    def summary(self):
+        return {
+            "samples": self.count,
+            "min": self.minimum,
+            "max": self.maximum,
+            "avg": self.average,
+            "avg_1m": self.average_1m,
+            "avg_5m": self.average_5m,
+        }
@@ -0,0 +1,385 @@
+"""
+心率输入源
+
+输入源是桥接的数据入口，约定的接口为：
+- 构造时传入 on_heart_rate，每个要发送的心率样本调用一次
+- async run()：开始接收，直到 stop() 被调用（或输入源放弃）时返回
+- async stop()：停止接收
+- update_token(token)（可选）：重新认证后更换token
+
+现有的实现：PulsoidWebSocketClient（实时推送）、recorder.ReplaySource（会话回放），
+以及这里的 PulsoidPollingClient（HTTP轮询，用于WebSocket被网络屏蔽的场合）和
+FailoverSource（以一个输入源为主，数据不新鲜时自动启用备用输入源）。
+"""
+
+import asyncio
+import logging
+import time
+from typing import Callable, Optional
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class PulsoidPollingClient:
+    """轮询Pulsoid最新心率接口的输入源
+
+    - 一个轮询期间复用同一个 aiohttp 会话和保活连接（连接池大小为1），不为每次请求重新握手
+    - 带条件请求头（If-None-Match / If-Modified-Since），服务器支持时数据未变化只返回304；
+      204/404/412（暂时没有心率）和 measured_at 未变化同样视为没有新样本
+    - 自适应间隔：按 measured_at 估计传感器的采样间隔，在下一个样本预计可取到时再请求；
+      落空后从 POLL_MIN_INTERVAL 开始重试并逐次加倍到 POLL_MAX_INTERVAL。
+      可取到的时间由命中和落空的请求夹逼估计；命中后提前一步试探，连续命中时步长加倍，落空后恢复为 POLL_PROBE_STEP
+    - 传感器长时间没有新样本时放宽到 POLL_IDLE_INTERVAL；token被拒绝（401/403）后停止请求，直到 update_token()
+    """
+
+    def __init__(self, token: str, on_heart_rate: Callable[[int], None], url: Optional[str] = None,
+                 metrics=None, recorder=None, decoder=None, staleness=None):
+        self.token = token
+        self.url = url or Config.POLL_URL
+        self.metrics = metrics
+        self.recorder = recorder
+        self.on_heart_rate = on_heart_rate
+        # 与WebSocket帧格式相同，使用同一种解码器
+        if decoder is None:
+            from frame_decoder import FrameDecoder
+            decoder = FrameDecoder()
+        self.decoder = decoder
+        self.staleness = staleness
+        self.min_interval = Config.POLL_MIN_INTERVAL
+        self.max_interval = Config.POLL_MAX_INTERVAL
+        self.probe_step = Config.POLL_PROBE_STEP
+        self.idle_after = Config.POLL_IDLE_AFTER
+        self.idle_interval = Config.POLL_IDLE_INTERVAL
+        self._probe = self.probe_step
+        self.running = False
+        # token被拒绝，等待update_token()
+        self.rejected = False
+        # 轮询循环是否还在执行（stop()后可能还在等待请求返回）
+        self.polling = False
+        # 上一个样本的 measured_at（毫秒）和平滑后的采样间隔（秒）
+        self.last_measured_at = None
+        self.sample_interval = None
+        # 样本可以取到的时间相对 measured_at 的提前量估计（秒，本机时钟 - 传感器时钟）
+        self.lead = None
+        self.misses = 0
+        # 按最长间隔轮询仍没有新样本的次数
+        self.idle_polls = 0
+        # 当前等待的样本最后一次落空的请求时间
+        self._missed_at = None
+        # 条件请求的校验值
+        self.etag = None
+        self.last_modified = None
+        self._stop_event = None
+        self.stats = {
+            "polls": 0,
+            "samples": 0,
+            "not_modified": 0,
+            "unchanged": 0,
+            "errors": 0,
+            "connections": 0,
+            "idle_polls": 0,
+        }
+
+    async def _on_connection(self, session, context, params):
+        self.stats["connections"] += 1
+
+    def _session(self):
+        import aiohttp
+
+        trace = aiohttp.TraceConfig()
+        trace.on_connection_create_end.append(self._on_connection)
+        # 保活时间长于最长轮询间隔，轮询之间连接不会被关闭
+        connector = aiohttp.TCPConnector(limit=1, keepalive_timeout=self.max_interval + 10)
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=Config.POLL_TIMEOUT),
+            trace_configs=[trace]
+        )
+
+    async def _poll(self, session):
+        """请求一次最新心率，返回到下一次请求的秒数，None表示等到update_token()或stop()"""
+        import aiohttp
+
+        headers = {"Authorization": f"Bearer {self.token}"}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        self.stats["polls"] += 1
+        sent_at = time.time()
+        try:
+            async with session.get(self.url, headers=headers) as response:
+                status = response.status
+                if status == 200:
+                    body = await response.text(encoding="utf-8")
+                    self.etag = response.headers.get("ETag")
+                    self.last_modified = response.headers.get("Last-Modified")
+                retry_after = response.headers.get("Retry-After")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.stats["errors"] += 1
+            logger.warning(f"轮询心率失败: {e}")
+            return self._miss()
+
+        if status == 200:
+            try:
+                sample = self.decoder.decode(body)
+            except ValueError as e:
+                logger.warning(f"JSON解析失败: {e}")
+                sample = None
+            if sample is None or sample[1] == self.last_measured_at:
+                self.stats["unchanged"] += 1
+                return self._miss(sent_at)
+            return self._deliver(sample[0], sample[1], sent_at)
+        if status == 304:
+            self.stats["not_modified"] += 1
+            return self._miss(sent_at)
+        if status in (204, 404, 412):
+            # 暂时没有心率数据（例如传感器未连接）
+            self.stats["unchanged"] += 1
+            return self._miss(sent_at)
+
+        self.stats["errors"] += 1
+        if status in (401, 403):
+            logger.error(f"轮询心率被拒绝（HTTP {status}），更换token前停止轮询")
+            self.rejected = True
+            return None
+        logger.warning(f"轮询心率失败: HTTP {status}")
+        if retry_after and retry_after.isdigit():
+            return max(float(retry_after), self._miss())
+        return self._miss()
+
+    def _deliver(self, heart_rate, measured_at, sent_at):
+        """处理新样本，返回按下一个样本的预计时间计算的等待秒数"""
+        measured = measured_at / 1000
+        if self.last_measured_at is not None and measured_at > self.last_measured_at:
+            interval = (measured_at - self.last_measured_at) / 1000
+            if self.sample_interval is None:
+                self.sample_interval = interval
+            elif interval < 1.5 * self.sample_interval:
+                # 漏掉的样本会让间隔成倍，不计入
+                self.sample_interval += 0.1 * (interval - self.sample_interval)
+        self.last_measured_at = measured_at
+        self.misses = 0
+        self.idle_polls = 0
+
+        # 本次请求发出时样本已经可以取到，上一次落空时还取不到：可取到的时间在两者之间
+        bound = sent_at - measured
+        if self._missed_at is None:
+            self.lead = bound - self._probe
+            self._probe = min(self._probe * 2, self.max_interval)
+        else:
+            self.lead = min(bound - self.probe_step, (self._missed_at - measured + bound) / 2)
+            self._probe = self.probe_step
+            self._missed_at = None
+
+        self.stats["samples"] += 1
+        if self.metrics:
+            self.metrics.record_frame(measured_at)
+        if self.recorder:
+            self.recorder.record(heart_rate, measured_at)
+        deliver = True
+        if self.staleness:
+            heart_rate = self.staleness.admit(heart_rate, measured_at)
+            deliver = heart_rate is not None
+        if deliver:
+            logger.debug("轮询到心率数据: %s bpm", heart_rate)
+            try:
+                self.on_heart_rate(heart_rate)
+            except Exception as e:
+                logger.error(f"处理心率数据时出错: {e}")
+
+        if self.sample_interval is None:
+            # 还不知道采样间隔，按落空重试的方式轮询直到取到第二个样本
+            return self.min_interval
+        delay = measured + self.sample_interval + self.lead - time.time()
+        return min(max(delay, self.min_interval), self.max_interval)
+
+    def _miss(self, sent_at: float = None):
+        """没有取到新样本，返回重试的等待秒数：短间隔开始逐次加倍
+
+        sent_at 为None表示请求失败（网络或服务器错误），不计入传感器空闲
+        """
+        if sent_at is not None:
+            self._missed_at = sent_at
+        self.misses += 1
+        delay = self.min_interval * 2 ** min(self.misses - 1, 32)
+        if delay < self.max_interval:
+            return delay
+        if sent_at is None:
+            return self.max_interval
+        self.idle_polls += 1
+        if self.idle_polls < self.idle_after:
+            return self.max_interval
+        if self.idle_polls == self.idle_after:
+            logger.info(f"已连续 {self.idle_polls} 次没有新样本（传感器没有数据），改为每 {self.idle_interval} 秒轮询一次")
+        self.stats["idle_polls"] += 1
+        return max(self.idle_interval, self.max_interval)
+
+    async def _sleep(self, delay):
+        """可被stop()或update_token()打断的等待，delay为None时一直等待"""
+        try:
+            await asyncio.wait_for(self._stop_event.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+        if self.running:
+            self._stop_event.clear()
+
+    def update_token(self, token: str):
+        """重新认证后更换token，立即用新token请求"""
+        self.token = token
+        self.misses = 0
+        self.idle_polls = 0
+        self.rejected = False
+        if self._stop_event:
+            self._stop_event.set()
+
+    async def run(self):
+        if self.polling:
+            # 两个轮询循环会共用 etag/lead/misses 等状态
+            logger.error("轮询已在运行，忽略重复的 run()")
+            return
+        self.polling = True
+        self.running = True
+        self._stop_event = asyncio.Event()
+        logger.info(f"开始轮询 {self.url}")
+        try:
+            async with self._session() as session:
+                while self.running:
+                    delay = await self._poll(session)
+                    if self.running:
+                        await self._sleep(delay)
+        except Exception as e:
+            logger.error(f"轮询心率时出错: {e}")
+        finally:
+            self.running = False
+            self.polling = False
+        logger.info("轮询已停止")
+
+    async def stop(self):
+        self.running = False
+        if self._stop_event:
+            self._stop_event.set()
+
+
+class FailoverSource:
+    """主输入源一直运行；超过 stale_after 秒没有送出新鲜样本时启动备用输入源，
+    主输入源重新送出样本时立即切回并停止备用输入源
+
+    新鲜度按实际送出的样本计算：两个输入源通常共用同一个 StalenessFilter，
+    过时、乱序和重复的样本在到达这里之前已被丢弃。
+    主输入源的 idle 为真（连接正常、只是传感器没有数据）时不切换，已切换的立即切回。
+    """
+
+    def __init__(self, primary_factory: Callable, fallback_factory: Callable,
+                 on_heart_rate: Callable[[int], None], stale_after: float = None):
+        self.on_heart_rate = on_heart_rate
+        # 工厂接收输入源应使用的on_heart_rate，便于区分样本来自哪个输入源
+        self.primary = primary_factory(self._from_primary)
+        self.fallback = fallback_factory(self._from_fallback)
+        self.stale_after = Config.SOURCE_STALE_AFTER if stale_after is None else stale_after
+        self.active = self.primary
+        self.running = False
+        self.last_primary_at = None
+        self.fallback_task = None
+        self._stopping = None
+        self._stop_event = None
+        self._switched_at = None
+        self.stats = {
+            "fallback_samples": 0,
+            "failovers": 0,
+            "recoveries": 0,
+            "fallback_seconds": 0.0,
+        }
+
+    def _from_primary(self, heart_rate):
+        self.last_primary_at = time.monotonic()
+        if self.active is not self.primary:
+            self._recover()
+        self.on_heart_rate(heart_rate)
+
+    def _from_fallback(self, heart_rate):
+        if self.active is self.fallback:
+            self.stats["fallback_samples"] += 1
+            self.on_heart_rate(heart_rate)
+
+    async def _failover(self, reason):
+        logger.warning(f"{reason}，切换到备用输入源")
+        self.active = self.fallback
+        self.stats["failovers"] += 1
+        self._switched_at = time.monotonic()
+        # 上一次的备用输入源可能还在等待请求返回（POLL_TIMEOUT 比 stale_after 长），结束后再启动
+        if self._stopping is not None:
+            await self._stopping
+            self._stopping = None
+        if self.fallback_task is not None:
+            await asyncio.gather(self.fallback_task, return_exceptions=True)
+            self.fallback_task = None
+        if self.running and self.active is self.fallback:
+            self.fallback_task = asyncio.create_task(self.fallback.run())
+
+    def _recover(self, reason="主输入源恢复"):
+        self.active = self.primary
+        self.stats["recoveries"] += 1
+        self.stats["fallback_seconds"] += time.monotonic() - self._switched_at
+        logger.info(f"{reason}，停止备用输入源")
+        self._stopping = asyncio.create_task(self.fallback.stop())
+
+    async def _monitor(self, started):
+        while self.running:
+            idle = getattr(self.primary, "idle", False)
+            if idle:
+                # 传感器没有数据，轮询也取不到新样本
+                if self.active is not self.primary:
+                    self._recover("主输入源连接正常但传感器没有数据")
+                wait = self.stale_after
+            elif self.active is self.primary:
+                silence = time.monotonic() - (self.last_primary_at or started)
+                if silence >= self.stale_after:
+                    await self._failover(f"主输入源已 {silence:.1f} 秒没有新鲜样本")
+                    wait = self.stale_after
+                else:
+                    wait = self.stale_after - silence
+            else:
+                wait = self.stale_after
+            try:
+                await asyncio.wait_for(self._stop_event.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+
+    def update_token(self, token: str):
+        for source in (self.primary, self.fallback):
+            if hasattr(source, "update_token"):
+                source.update_token(token)
+
+    async def run(self):
+        self.running = True
+        self._stop_event = asyncio.Event()
+        monitor = asyncio.create_task(self._monitor(time.monotonic()))
+        try:
+            await self.primary.run()
+            if self.running and self.active is self.primary:
+                # 主输入源放弃（例如达到最大重连次数），改由备用输入源继续
+                await self._failover("主输入源已停止")
+            # 主输入源结束后由备用输入源继续运行，直到stop()
+            if self.running:
+                await self._stop_event.wait()
+        finally:
+            monitor.cancel()
+            self.running = False
+
+    async def stop(self):
+        self.running = False
+        if self._stop_event:
+            self._stop_event.set()
+        await self.primary.stop()
+        await self.fallback.stop()
+        if self._stopping is not None:
+            await self._stopping
+            self._stopping = None
+        if self.fallback_task:
+            await asyncio.gather(self.fallback_task, return_exceptions=True)
+        if self.active is self.fallback and self._switched_at is not None:
+            self.stats["fallback_seconds"] += time.monotonic() - self._switched_at
+            self._switched_at = None
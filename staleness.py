@@ -0,0 +1,121 @@
+"""
+按 measured_at 判断样本新鲜度
+
+传感器时钟与本机时钟不同步，单向延迟无法直接测量。ClockOffsetEstimator 跟踪
+"本机接收时间 - measured_at" 的下包络：新样本更小时立即采用，否则每秒只允许缓慢上升，
+因此网络卡顿后补发的一批延迟帧和偶尔乱序到达的帧都不会把估计值拉高。
+样本的"延迟"为其偏移超出下包络的部分，即比最快的传输多等待了多久。
+"""
+
+import time
+
+from config import Config
+
+
+class ClockOffsetEstimator:
+    """本机时钟与传感器时钟之差（含最小传输延迟）的估计，每个样本O(1)"""
+
+    __slots__ = ("offset", "creep", "_updated_at")
+
+    def __init__(self, creep: float = None):
+        # 下包络每秒允许上升的秒数，用于跟随时钟漂移和路由变化
+        self.creep = Config.CLOCK_OFFSET_CREEP if creep is None else creep
+        self.offset = None
+        self._updated_at = None
+
+    def update(self, measured_at: float, received_at: float):
+        """加入一个样本（两者单位均为秒），返回该样本的延迟（秒）"""
+        sample = received_at - measured_at
+        offset = self.offset
+        if offset is None:
+            self.offset = sample
+            self._updated_at = received_at
+            return 0.0
+
+        elapsed = received_at - self._updated_at
+        if elapsed > 0:
+            offset += self.creep * elapsed
+        self._updated_at = received_at
+        if sample <= offset:
+            self.offset = sample
+            return 0.0
+        self.offset = offset
+        return sample - offset
+
+    def reset(self, measured_at: float, received_at: float):
+        """以该样本为新的基准"""
+        self.offset = received_at - measured_at
+        self._updated_at = received_at
+
+
+class StalenessFilter:
+    """丢弃过时和乱序的样本，可选按短期趋势外推补偿剩余延迟"""
+
+    def __init__(self, max_age: float = None, extrapolate: bool = None, extrapolate_limit: float = None,
+                 estimator: ClockOffsetEstimator = None, resync_after: float = None):
+        self.max_age = Config.MAX_SAMPLE_AGE if max_age is None else max_age
+        # 样本连续这么久都过时，认为偏移发生了跳变（例如传感器校时），以当前样本为新的基准
+        self.resync_after = Config.CLOCK_OFFSET_RESYNC if resync_after is None else resync_after
+        self._stale_since = None
+        self.extrapolate = Config.STALENESS_EXTRAPOLATE if extrapolate is None else extrapolate
+        self.extrapolate_limit = Config.EXTRAPOLATE_LIMIT if extrapolate_limit is None else extrapolate_limit
+        self.estimator = estimator or ClockOffsetEstimator()
+        self.last_measured_at = None
+        self.last_heart_rate = None
+        # 心率变化趋势（bpm/秒），按传感器时间平滑
+        self.trend = 0.0
+        self.accepted = 0
+        self.stale = 0
+        self.out_of_order = 0
+        self.extrapolated = 0
+        self.resyncs = 0
+
+    def admit(self, heart_rate, measured_at, received_at: float = None):
+        """返回应发送的心率，样本应丢弃时返回None；measured_at为Pulsoid的毫秒时间戳"""
+        if not measured_at:
+            self.accepted += 1
+            return heart_rate
+        if received_at is None:
+            received_at = time.time()
+        measured = measured_at / 1000
+
+        last = self.last_measured_at
+        if last is not None and (measured < last or (measured == last and heart_rate == self.last_heart_rate)):
+            # 比已发送的样本更早（乱序），或与上一个样本相同（备用连接上的重复帧）
+            self.out_of_order += 1
+            self.estimator.update(measured, received_at)
+            return None
+
+        age = self.estimator.update(measured, received_at)
+        if age > self.max_age:
+            if self._stale_since is None:
+                self._stale_since = received_at
+            if received_at - self._stale_since < self.resync_after:
+                self.stale += 1
+                return None
+            self.estimator.reset(measured, received_at)
+            self.resyncs += 1
+            age = 0.0
+        self._stale_since = None
+
+        if last is not None and measured > last:
+            slope = (heart_rate - self.last_heart_rate) / (measured - last)
+            self.trend += Config.TREND_SMOOTHING * (slope - self.trend)
+        self.last_measured_at = measured
+        self.last_heart_rate = heart_rate
+        self.accepted += 1
+
+        if self.extrapolate and age > 0 and self.trend:
+            self.extrapolated += 1
+            return round(heart_rate + self.trend * min(age, self.extrapolate_limit))
+        return heart_rate
+
+    def stats(self):
+        return {
+            "accepted": self.accepted,
+            "stale": self.stale,
+            "out_of_order": self.out_of_order,
+            "extrapolated": self.extrapolated,
+            "resyncs": self.resyncs,
+            "clock_offset": self.estimator.offset,
+        }
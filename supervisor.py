@@ -0,0 +1,417 @@
+"""
+多进程监督模式：把租户分片到多个工作进程，每个进程一个事件循环
+
+租户按名称用一致性哈希（rendezvous hashing）分配到工作进程，
+重启的工作进程重新加载租户文件后接回原来的租户；工作进程数变化时只有少量租户需要迁移。
+工作进程通过管道定期汇报运行状态和指标，由监督进程汇总输出；
+异常退出或长时间没有汇报的工作进程会被单独重启，不影响其他工作进程。
+
+用法：python supervisor.py tenants.json --workers 4
+"""
+
+import argparse
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+
+from config import Config
+from logger import get_logger, setup_logging
+
+logger = logging.getLogger(__name__)
+
+
+def assign_worker(name: str, workers: int) -> int:
+    """租户所属的工作进程序号，只取决于租户名称和工作进程数"""
+    best_slot = 0
+    best_weight = b""
+    for slot in range(workers):
+        weight = hashlib.blake2b(f"{slot}:{name}".encode("utf-8"), digest_size=8).digest()
+        if weight > best_weight:
+            best_slot, best_weight = slot, weight
+    return best_slot
+
+
+def shard_tenants(names, workers: int):
+    """把租户名称分配到各个工作进程，返回每个工作进程的租户名称列表"""
+    shards = [[] for _ in range(workers)]
+    for name in names:
+        shards[assign_worker(name, workers)].append(name)
+    return shards
+
+
+def _worker_report(slot: int, runner):
+    """工作进程的汇报内容：资源占用、样本数和每个租户的指标快照"""
+    report = runner.report()
+    snapshots = []
+    for bridge in runner.bridges:
+        if bridge.metrics:
+            bridge.metrics.update_rate()
+            snapshots.append(bridge.metrics.snapshot())
+    return {
+        "slot": slot,
+        "pid": os.getpid(),
+        "tenants": report["tenants"],
+        "active": report["active"],
+        "samples": sum(bridge.samples for bridge in runner.bridges),
+        "rss_bytes": report["rss_bytes"],
+        "cpu_seconds": time.process_time(),
+        "osc_messages_sent": report["osc_messages_sent"],
+        "metrics": snapshots,
+    }
+
+
+async def _run_worker(slot, tenants, commands, reports, report_interval):
+    from tenants import MultiTenantRunner
+
+    # 每个工作进程的事件循环上有很多租户，节拍不忙等
+    Config.HEARTBEAT_SPIN_MARGIN = 0
+    runner = MultiTenantRunner(tenants, serve_metrics=False)
+    loop = asyncio.get_running_loop()
+
+    def wait_for_stop():
+        # 收到停止命令或监督进程退出（管道关闭）时关闭所有租户
+        try:
+            commands.recv()
+        except (EOFError, OSError):
+            pass
+        loop.call_soon_threadsafe(lambda: loop.create_task(runner.shutdown()))
+
+    threading.Thread(target=wait_for_stop, name="supervisor-commands", daemon=True).start()
+
+    async def report_loop():
+        while True:
+            await asyncio.sleep(report_interval)
+            try:
+                reports.send(("report", _worker_report(slot, runner)))
+            except OSError:
+                await runner.shutdown()
+                return
+
+    reporter = loop.create_task(report_loop())
+    try:
+        await runner.run()
+    finally:
+        reporter.cancel()
+    try:
+        reports.send(("report", _worker_report(slot, runner)))
+    except OSError:
+        pass
+
+
+def worker_main(slot, workers, tenants_path, commands, reports, report_interval, log_level=logging.INFO):
+    """工作进程入口：加载租户文件，只运行分配到本进程的租户"""
+    # Ctrl+C由监督进程处理，再通过管道通知工作进程
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    setup_logging(level=log_level, log_to_file=False, use_queue=Config.LOG_QUEUE)
+
+    from tenants import load_tenants
+    tenants = [
+        tenant for tenant in load_tenants(tenants_path)
+        if assign_worker(tenant.name, workers) == slot
+    ]
+    get_logger(__name__).info(f"工作进程 {slot} 启动（PID {os.getpid()}），{len(tenants)} 个租户")
+    asyncio.run(_run_worker(slot, tenants, commands, reports, report_interval))
+    reports.close()
+
+
+class WorkerHandle:
+    """监督进程中一个工作进程的状态"""
+
+    def __init__(self, slot: int, tenants):
+        self.slot = slot
+        self.tenants = tenants
+        self.process = None
+        self.commands = None
+        self.reports = None
+        self.started_at = None
+        self.last_report_at = None
+        self.report = None
+        self.restarts = 0
+        self.failures = 0
+        self.stopping = False
+        self.finished = False
+
+    @property
+    def alive(self):
+        return self.process is not None and self.process.is_alive()
+
+
+class ShardedSupervisor:
+    """启动并监督工作进程，汇总各进程的汇报"""
+
+    def __init__(self, tenants_path, workers: int = None, report_interval: float = None,
+                 health_timeout: float = None, metrics_port: int = None, log_level=logging.INFO):
+        from tenants import load_tenants
+
+        self.tenants_path = os.path.abspath(tenants_path)
+        # 先在监督进程中加载一次，配置错误时启动即失败
+        names = [tenant.name for tenant in load_tenants(self.tenants_path)]
+        self.workers = workers or Config.SUPERVISOR_WORKERS or os.cpu_count() or 1
+        self.report_interval = report_interval or Config.SUPERVISOR_REPORT_INTERVAL
+        self.health_timeout = health_timeout or Config.SUPERVISOR_HEALTH_TIMEOUT
+        self.metrics_port = metrics_port
+        self.log_level = log_level
+        # 没有分配到租户的工作进程不启动
+        self.handles = [
+            WorkerHandle(slot, shard)
+            for slot, shard in enumerate(shard_tenants(names, self.workers))
+            if shard
+        ]
+        self.tenant_count = len(names)
+        self._context = multiprocessing.get_context("spawn")
+        self._loop = None
+        self._stopped = None
+        self._tasks = set()
+        self.running = False
+        self.metrics_list = []
+        self.metrics_server = None
+
+    def setup_signal_handlers(self):
+        """设置信号处理器"""
+        def signal_handler(signum, frame):
+            logger.info("收到中断信号，正在关闭所有工作进程...")
+            asyncio.create_task(self.shutdown())
+
+        signal.signal(signal.SIGINT, signal_handler)
+        signal.signal(signal.SIGTERM, signal_handler)
+
+    def _start(self, handle: WorkerHandle):
+        context = self._context
+        commands_receiver, commands_sender = context.Pipe(duplex=False)
+        reports_receiver, reports_sender = context.Pipe(duplex=False)
+        process = context.Process(
+            target=worker_main,
+            args=(handle.slot, self.workers, self.tenants_path,
+                  commands_receiver, reports_sender, self.report_interval, self.log_level),
+            name=f"bridge-worker-{handle.slot}",
+            daemon=True
+        )
+        process.start()
+        # 关闭本进程中的子进程一端，子进程退出时读端才能收到EOF
+        commands_receiver.close()
+        reports_sender.close()
+
+        handle.process = process
+        handle.commands = commands_sender
+        handle.reports = reports_receiver
+        handle.started_at = handle.last_report_at = time.monotonic()
+        handle.stopping = False
+        threading.Thread(
+            target=self._read_reports,
+            args=(handle, reports_receiver),
+            name=f"worker-{handle.slot}-reports",
+            daemon=True
+        ).start()
+        logger.info(f"已启动工作进程 {handle.slot}（PID {process.pid}），{len(handle.tenants)} 个租户")
+
+    def _read_reports(self, handle, reports):
+        """在线程中阻塞读取汇报，交给事件循环处理"""
+        while True:
+            try:
+                message = reports.recv()
+            except (EOFError, OSError):
+                break
+            self._loop.call_soon_threadsafe(self._on_report, handle, message)
+        self._loop.call_soon_threadsafe(self._on_exit, handle, reports)
+
+    def _on_report(self, handle, message):
+        kind, payload = message
+        if kind == "report":
+            handle.last_report_at = time.monotonic()
+            handle.report = payload
+            self.metrics_list[:] = [
+                snapshot
+                for worker in self.handles if worker.report
+                for snapshot in worker.report["metrics"]
+            ]
+
+    def _on_exit(self, handle, reports):
+        if handle.reports is not reports:
+            # 已经被新进程替换
+            return
+        self._spawn(self._restart(handle))
+
+    def _spawn(self, coroutine):
+        task = self._loop.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _restart(self, handle: WorkerHandle):
+        process = handle.process
+        await asyncio.get_running_loop().run_in_executor(None, process.join)
+        handle.reports.close()
+        handle.commands.close()
+        handle.reports = handle.commands = None
+        if not self.running or handle.stopping:
+            return
+        if process.exitcode == 0:
+            logger.info(f"工作进程 {handle.slot} 的租户已全部结束")
+            handle.finished = True
+            if all(worker.finished for worker in self.handles):
+                self.running = False
+                self._stopped.set()
+            return
+
+        # 运行足够久之后再退出的不算连续失败
+        if time.monotonic() - handle.started_at > Config.SUPERVISOR_MAX_RESTART_DELAY:
+            handle.failures = 0
+        delay = min(
+            Config.SUPERVISOR_RESTART_DELAY * 2 ** handle.failures,
+            Config.SUPERVISOR_MAX_RESTART_DELAY
+        )
+        handle.failures += 1
+        logger.error(f"工作进程 {handle.slot} 异常退出（退出码 {process.exitcode}），{delay} 秒后重启")
+        try:
+            await asyncio.wait_for(self._stopped.wait(), delay)
+            return
+        except asyncio.TimeoutError:
+            pass
+        handle.restarts += 1
+        self._start(handle)
+
+    async def _health_loop(self):
+        """结束长时间没有汇报的工作进程，随后按异常退出重启"""
+        while self.running:
+            await asyncio.sleep(self.report_interval)
+            now = time.monotonic()
+            for handle in self.handles:
+                if handle.alive and not handle.stopping and now - handle.last_report_at > self.health_timeout:
+                    logger.error(
+                        f"工作进程 {handle.slot} 已 {now - handle.last_report_at:.0f} 秒没有汇报，强制重启"
+                    )
+                    handle.process.kill()
+
+    async def _report_loop(self):
+        while self.running:
+            await asyncio.sleep(Config.TENANT_REPORT_INTERVAL)
+            self.log_report()
+
+    async def run(self):
+        """启动所有工作进程，运行到关闭"""
+        self._loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        self.running = True
+        logger.info(
+            f"监督模式启动：{self.tenant_count} 个租户分配到 {len(self.handles)}/{self.workers} 个工作进程"
+        )
+        if Config.METRICS_ENABLED:
+            from metrics import MetricsServer
+            # 帧率由工作进程计算，这里不再输出周期摘要
+            self.metrics_server = MetricsServer(self.metrics_list, port=self.metrics_port, log_interval=0)
+            await self.metrics_server.start()
+
+        for handle in self.handles:
+            self._start(handle)
+        background = [
+            self._loop.create_task(self._health_loop()),
+            self._loop.create_task(self._report_loop()),
+        ]
+        try:
+            await self._stopped.wait()
+        finally:
+            for task in background:
+                task.cancel()
+            if self.metrics_server:
+                await self.metrics_server.stop()
+            self.log_report()
+
+    async def shutdown(self):
+        """通知所有工作进程关闭，超时未退出的强制结束"""
+        if not self.running:
+            return
+        self.running = False
+        for handle in self.handles:
+            handle.stopping = True
+            if handle.commands is not None:
+                try:
+                    handle.commands.send(("stop",))
+                except OSError:
+                    pass
+
+        async def wait(handle):
+            if handle.process is None:
+                return
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, handle.process.join, Config.SUPERVISOR_STOP_TIMEOUT)
+            if handle.process.is_alive():
+                logger.warning(f"工作进程 {handle.slot} 没有按时退出，强制结束")
+                handle.process.kill()
+                await loop.run_in_executor(None, handle.process.join)
+
+        await asyncio.gather(*(wait(handle) for handle in self.handles))
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._stopped.set()
+
+    def report(self):
+        """汇总各工作进程最近一次汇报"""
+        per_worker = []
+        for handle in self.handles:
+            report = handle.report or {}
+            per_worker.append({
+                "slot": handle.slot,
+                "pid": handle.process.pid if handle.process else None,
+                "alive": handle.alive,
+                "restarts": handle.restarts,
+                "tenants": len(handle.tenants),
+                "active": report.get("active", 0),
+                "samples": report.get("samples", 0),
+                "rss_bytes": report.get("rss_bytes"),
+                "cpu_seconds": report.get("cpu_seconds", 0.0),
+                "last_report_age": time.monotonic() - handle.last_report_at if handle.last_report_at else None,
+            })
+        return {
+            "workers": len(per_worker),
+            "alive": sum(1 for worker in per_worker if worker["alive"]),
+            "tenants": self.tenant_count,
+            "active": sum(worker["active"] for worker in per_worker),
+            "samples": sum(worker["samples"] for worker in per_worker),
+            "rss_bytes": sum(worker["rss_bytes"] or 0 for worker in per_worker),
+            "cpu_seconds": sum(worker["cpu_seconds"] for worker in per_worker),
+            "restarts": sum(worker["restarts"] for worker in per_worker),
+            "per_worker": per_worker,
+        }
+
+    def log_report(self):
+        report = self.report()
+        logger.info(
+            "工作进程 %d/%d 运行中，租户 %d/%d 运行中，样本 %d，内存 %.1f MiB，CPU %.1f 秒，重启 %d 次",
+            report["alive"], report["workers"], report["active"], report["tenants"], report["samples"],
+            report["rss_bytes"] / 1024 / 1024, report["cpu_seconds"], report["restarts"]
+        )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Pulsoid to VRChat OSC Bridge 多进程监督模式")
+    parser.add_argument("tenants", metavar="FILE", help="租户文件（格式见 tenants.py）")
+    parser.add_argument("--workers", type=int, default=Config.SUPERVISOR_WORKERS,
+                        help="工作进程数，0表示CPU核数")
+    return parser.parse_args(argv)
+
+
+async def main(argv=None):
+    args = parse_args(argv)
+    setup_logging(level=logging.INFO, log_to_file=True, use_queue=Config.LOG_QUEUE)
+    log = get_logger(__name__)
+    try:
+        supervisor = ShardedSupervisor(args.tenants, workers=args.workers)
+        supervisor.setup_signal_handlers()
+        await supervisor.run()
+    except Exception as e:
+        log.error(f"监督进程异常退出: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(asyncio.run(main()))
+    except KeyboardInterrupt:
+        print("\n程序被用户中断")
+        sys.exit(0)
@@ -0,0 +1,274 @@
+"""
+多租户模式：在同一个事件循环中为多个Pulsoid token运行桥接
+"""
+
+import asyncio
+import json
+import logging
+import os
+import signal
+import sys
+import time
+
+from config import Config
+from main import PulsoidVRChatBridge
+from metrics import MetricsServer
+from osc_client import parse_osc_destination, select_parameters
+
+logger = logging.getLogger(__name__)
+
+
+class TenantConfig:
+    """单个租户的配置"""
+
+    def __init__(self, name: str, token: str, destinations, profile=None, avatar_port=None,
+                 websocket_url=None):
+        self.name = name
+        self.token = token
+        # [(host, port, 参数名列表或None)]
+        self.destinations = destinations
+        self.profile = profile
+        # 该租户的VRChat OSC输出端口，None表示不按模型过滤参数
+        self.avatar_port = avatar_port
+        self.websocket_url = websocket_url
+
+
+def load_tenants(path):
+    """从JSON文件加载租户列表
+
+    文件格式可以是租户数组，也可以是 {"tenants": [...]}，每个租户为：
+    {"name": "alice", "token": "...", "osc": "127.0.0.1:9000", "profile": ["Heartrate", "HeartBeatToggle"]}
+    其中 osc 和 profile 可省略，分别默认为Config中的OSC地址和全部心率参数。
+    osc 也可以是数组，同时发送到多个目标，每项可写成 "host:port=参数名,参数名" 只发送部分参数。
+    profile 也可以是映射文件（Config.MAPPING_FILE）中的配置名。
+    avatar_port 为该租户的VRChat OSC输出端口，设置后只发送当前模型拥有的参数。
+    websocket_url 可以替换该租户的WebSocket地址（例如本地替身服务器）。
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    entries = data.get("tenants", []) if isinstance(data, dict) else data
+    tenants = []
+    names = set()
+    mapping_profiles = None
+    for index, entry in enumerate(entries):
+        name = entry.get("name") or f"tenant{index + 1}"
+        if name in names:
+            raise ValueError(f"租户名称重复: {name}")
+        names.add(name)
+
+        token = entry.get("token")
+        if not token:
+            raise ValueError(f"租户 {name} 缺少token")
+
+        osc = entry.get("osc")
+        if isinstance(osc, str):
+            osc = [osc]
+        if osc:
+            destinations = [parse_osc_destination(value) for value in osc]
+        else:
+            destinations = [(Config.OSC_IP, Config.OSC_PORT, None)]
+
+        profile = entry.get("profile")
+        if profile == "full":
+            profile = None
+        # 提前解析参数配置，配置错误时启动即失败
+        if isinstance(profile, str):
+            if not Config.MAPPING_FILE:
+                raise ValueError(f"租户 {name} 使用映射配置 {profile}，但没有设置MAPPING_FILE")
+            if mapping_profiles is None:
+                from mapping import load_profiles
+                mapping_profiles = load_profiles(Config.MAPPING_FILE)
+            if profile not in mapping_profiles:
+                raise ValueError(f"租户 {name} 的映射配置不存在: {profile}")
+            profile = mapping_profiles[profile]
+        else:
+            profile = select_parameters(profile)
+
+        tenants.append(TenantConfig(
+            name, token, destinations, profile,
+            avatar_port=entry.get("avatar_port"),
+            websocket_url=entry.get("websocket_url")
+        ))
+
+    if not tenants:
+        raise ValueError(f"租户文件中没有任何租户: {path}")
+    return tenants
+
+
+def current_rss():
+    """当前进程常驻内存（字节），无法获取时返回None"""
+    try:
+        if sys.platform.startswith("linux"):
+            with open("/proc/self/statm", "r") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+        if sys.platform == "win32":
+            import ctypes
+            from ctypes import wintypes
+
+            class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+                _fields_ = [
+                    ("cb", wintypes.DWORD),
+                    ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t),
+                    ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t),
+                    ("PeakPagefileUsage", ctypes.c_size_t),
+                ]
+
+            counters = PROCESS_MEMORY_COUNTERS()
+            counters.cb = ctypes.sizeof(counters)
+            handle = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+                return counters.WorkingSetSize
+            return None
+
+        import resource
+        # macOS上ru_maxrss单位为字节（峰值）
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except Exception:
+        return None
+
+
+class MultiTenantRunner:
+    """在同一事件循环中运行多个桥接实例，每个租户的重连状态互相独立"""
+
+    def __init__(self, tenants, serve_metrics=True, profiler=None):
+        self.tenants = tenants
+        # 节拍忙等会阻塞同一事件循环上的所有租户，开销随租户数增长
+        if Config.HEARTBEAT_SPIN_MARGIN:
+            logger.warning("多租户模式不支持节拍忙等，已关闭 HEARTBEAT_SPIN_MARGIN")
+            Config.HEARTBEAT_SPIN_MARGIN = 0
+        # 由 supervisor.py 运行时，指标汇总到监督进程统一输出
+        self.serve_metrics = serve_metrics
+        # --profile 时所有租户共用一个分析器，各阶段耗时合并统计
+        self.bridges = [
+            PulsoidVRChatBridge(
+                token=tenant.token,
+                destinations=tenant.destinations,
+                track_avatar=tenant.avatar_port is not None,
+                avatar_port=tenant.avatar_port,
+                parameters=tenant.profile,
+                websocket_url=tenant.websocket_url,
+                name=tenant.name,
+                serve_metrics=False,
+                profiler=profiler
+            )
+            for tenant in tenants
+        ]
+        self.running = False
+        self.metrics_server = None
+        self._baseline_rss = None
+        self._started_at = None
+        self._cpu_started = None
+
+    def setup_signal_handlers(self):
+        """设置信号处理器"""
+        def signal_handler(signum, frame):
+            logger.info("收到中断信号，正在关闭所有租户...")
+            asyncio.create_task(self.shutdown())
+
+        signal.signal(signal.SIGINT, signal_handler)
+        signal.signal(signal.SIGTERM, signal_handler)
+
+    async def _run_bridge(self, bridge):
+        """运行单个租户，异常不影响其他租户"""
+        try:
+            await bridge.run()
+        except Exception as e:
+            logger.error(f"租户 {bridge.name} 异常退出: {e}")
+
+    async def _report_loop(self):
+        while self.running:
+            await asyncio.sleep(Config.TENANT_REPORT_INTERVAL)
+            self.log_report()
+
+    async def run(self):
+        """运行所有租户直到全部退出"""
+        self.running = True
+        self._baseline_rss = current_rss()
+        self._started_at = time.monotonic()
+        self._cpu_started = time.process_time()
+        logger.info(f"多租户模式启动，共 {len(self.bridges)} 个租户")
+
+        metrics = [bridge.metrics for bridge in self.bridges if bridge.metrics]
+        if metrics and self.serve_metrics:
+            self.metrics_server = MetricsServer(metrics)
+            await self.metrics_server.start()
+
+        reporter = asyncio.create_task(self._report_loop())
+        try:
+            await asyncio.gather(*(self._run_bridge(bridge) for bridge in self.bridges))
+        finally:
+            self.running = False
+            reporter.cancel()
+            if self.metrics_server:
+                await self.metrics_server.stop()
+            self.log_report()
+
+    async def shutdown(self):
+        """关闭所有租户"""
+        self.running = False
+        await asyncio.gather(
+            *(bridge.shutdown() for bridge in self.bridges),
+            return_exceptions=True
+        )
+
+    def report(self):
+        """汇总每个租户的资源占用"""
+        count = len(self.bridges)
+        rss = current_rss()
+        rss_per_tenant = None
+        if rss is not None and self._baseline_rss is not None:
+            rss_per_tenant = max(rss - self._baseline_rss, 0) / count
+
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0
+        cpu = time.process_time() - self._cpu_started if self._cpu_started is not None else 0
+
+        per_tenant = []
+        for bridge in self.bridges:
+            per_tenant.append({
+                "name": bridge.name,
+                "running": bridge.running,
+                "samples": bridge.samples,
+                "handler_us_per_sample": bridge.handler_ns / bridge.samples / 1000 if bridge.samples else 0.0,
+                "cpu_share": bridge.handler_ns / 1e9 / elapsed if elapsed else 0.0,
+                "coalesced": bridge.pipeline.mailbox.coalesced if bridge.pipeline else 0,
+                "osc": bridge.osc_client.get_stats() if bridge.osc_client else None,
+            })
+
+        osc_sent = sum(entry["osc"]["messages_sent"] for entry in per_tenant if entry["osc"])
+        osc_baseline = sum(entry["osc"]["messages_baseline"] for entry in per_tenant if entry["osc"])
+
+        return {
+            "tenants": count,
+            "active": sum(1 for bridge in self.bridges if bridge.running),
+            "rss_bytes": rss,
+            "rss_per_tenant_bytes": rss_per_tenant,
+            "cpu_seconds": cpu,
+            "cpu_seconds_per_tenant": cpu / count,
+            "elapsed_seconds": elapsed,
+            "osc_messages_sent": osc_sent,
+            "osc_savings_ratio": 1 - osc_sent / osc_baseline if osc_baseline else 0.0,
+            "per_tenant": per_tenant,
+        }
+
+    def log_report(self):
+        report = self.report()
+        rss = report["rss_per_tenant_bytes"]
+        rss_text = f"{rss / 1024:.1f} KiB" if rss is not None else "未知"
+        logger.info(
+            "租户 %d/%d 运行中，每租户内存 %s，每租户CPU %.3f 秒，OSC消息节省 %.1f%%",
+            report["active"], report["tenants"], rss_text, report["cpu_seconds_per_tenant"],
+            report["osc_savings_ratio"] * 100
+        )
+        for entry in report["per_tenant"]:
+            logger.debug(
+                "租户 %s: 样本 %d，处理耗时 %.1f us/样本",
+                entry["name"], entry["samples"], entry["handler_us_per_sample"]
+            )
@@ -1,72 +1,328 @@
 import asyncio
-import websockets
-import json
 import logging
+import random
+import time
 from typing import Callable, Optional
 from config import Config
 
 logger = logging.getLogger(__name__)
 
 class PulsoidWebSocketClient:
-    def __init__(self, token: str, on_heart_rate: Callable[[int], None]):
+    def __init__(self, token: str, on_heart_rate: Callable[[int], None], url: Optional[str] = None,
+                 metrics=None, recorder=None, decoder=None, staleness=None):
         self.token = token
+        self.url = url or Config.WEBSOCKET_URL
+        self.metrics = metrics
+        self.recorder = recorder
         self.on_heart_rate = on_heart_rate
+        # 帧解码器，需要提供 decode(message) -> (heart_rate, measured_at) 或 None
+        if decoder is None:
+            from frame_decoder import FrameDecoder
+            decoder = FrameDecoder()
+        self.decoder = decoder
+        # 可选的过时样本过滤（staleness.StalenessFilter）
+        self.staleness = staleness
         self.websocket = None
         self.running = False
         self.reconnect_attempts = 0
         self.reconnect_delay = Config.INITIAL_RECONNECT_DELAY
-        
-    async def connect(self):
-        """连接到Pulsoid WebSocket"""
+        # 停滞检测：当前连接建立的时间、最近一条消息的时间和平滑后的采样间隔
+        self.activated_at = None
+        self.last_message_at = None
+        self.sample_interval = None
+        self._awaiting_first = False
+        # 当前连接ping正常但传感器没有数据
+        self.idle = False
+        # 数据中断的开始时间（断线前最后一条消息），新连接收到第一条消息时结束
+        self.gap_started_at = None
+        # 连接变慢时预先打开的备用连接
+        self.standby_task = None
+        self._closing = set()
+        self._stop_event = None
+        self.stats = {
+            "connects": 0,
+            "failovers": 0,
+            "stalls": 0,
+            "standby_opened": 0,
+            "standby_discarded": 0,
+            "idle": 0,
+        }
+    
+    async def _open(self):
+        """建立一个新的WebSocket连接，失败时返回None"""
         try:
             headers = {
                 "Authorization": f"Bearer {self.token}"
             }
             
-            logger.info(f"正在连接到 {Config.WEBSOCKET_URL}")
-            self.websocket = await websockets.connect(
-                Config.WEBSOCKET_URL,
+            # websockets导入较慢，推迟到第一次连接时，让OSC先启动
+            import websockets
+            
+            logger.info(f"正在连接到 {self.url}")
+            websocket = await websockets.connect(
+                self.url,
                 extra_headers=headers,
                 ping_interval=30,
                 ping_timeout=10
             )
-            
-            logger.info("WebSocket连接成功")
-            self.reconnect_attempts = 0
-            self.reconnect_delay = Config.INITIAL_RECONNECT_DELAY
-            return True
-            
+            self.stats["connects"] += 1
+            return websocket
+        
         except Exception as e:
             logger.error(f"WebSocket连接失败: {e}")
+            return None
+    
+    async def connect(self):
+        """连接到Pulsoid WebSocket"""
+        websocket = await self._open()
+        if websocket is None:
             return False
+        self._activate(websocket)
+        logger.info("WebSocket连接成功")
+        return True
+    
+    def _activate(self, websocket):
+        """把连接设为当前连接，静默时间从现在开始计算"""
+        self.websocket = websocket
+        self.activated_at = time.monotonic()
+        self._awaiting_first = True
+    
+    def _first_message(self, now):
+        """新连接收到第一条消息：结束数据中断，重置退避"""
+        self._awaiting_first = False
+        if self.gap_started_at is not None:
+            gap = now - self.gap_started_at
+            self.gap_started_at = None
+            if self.metrics:
+                self.metrics.record_reconnect(gap)
+            logger.info(f"数据恢复，中断 {gap:.3f} 秒")
+        self.reconnect_attempts = 0
+        self.reconnect_delay = Config.INITIAL_RECONNECT_DELAY
     
     async def listen(self):
         """监听WebSocket消息"""
+        from websockets.exceptions import ConnectionClosed
+        
+        decode = self.decoder.decode
         try:
             async for message in self.websocket:
+                now = time.monotonic()
+                if self._awaiting_first:
+                    self._first_message(now)
+                elif self.sample_interval is None:
+                    self.sample_interval = now - self.last_message_at
+                else:
+                    self.sample_interval += 0.1 * (now - self.last_message_at - self.sample_interval)
+                self.last_message_at = now
+                
                 try:
-                    data = json.loads(message)
-                    if 'measured_at' in data and 'data' in data:
-                        heart_rate = data['data'].get('heart_rate')
-                        if heart_rate is not None:
-                            logger.debug(f"收到心率数据: {heart_rate} bpm")
-                            self.on_heart_rate(heart_rate)
-                    else:
-                        logger.debug(f"收到其他消息: {data}")
-                        
-                except json.JSONDecodeError as e:
+                    sample = decode(message)
+                    if sample is None:
+                        continue
+                    heart_rate, measured_at = sample
+                    if self.metrics:
+                        self.metrics.record_frame(measured_at)
+                    if self.recorder:
+                        self.recorder.record(heart_rate, measured_at)
+                    if self.staleness:
+                        heart_rate = self.staleness.admit(heart_rate, measured_at)
+                        if heart_rate is None:
+                            continue
+                    logger.debug("收到心率数据: %s bpm", heart_rate)
+                    self.on_heart_rate(heart_rate)
+                
+                except ValueError as e:
                     logger.warning(f"JSON解析失败: {e}")
                 except Exception as e:
                     logger.error(f"处理消息时出错: {e}")
-                    
-        except websockets.exceptions.ConnectionClosed:
+        
+        except ConnectionClosed:
             logger.warning("WebSocket连接已关闭")
         except Exception as e:
             logger.error(f"监听WebSocket时出错: {e}")
     
+    def stall_timeout(self):
+        """判定停滞的静默时间（秒）：观测到的采样间隔的 N 倍"""
+        if self.sample_interval is None:
+            return Config.STALL_INITIAL_TIMEOUT
+        return max(Config.STALL_MIN_TIMEOUT, Config.STALL_INTERVAL_MULTIPLIER * self.sample_interval)
+    
+    async def _ping(self, websocket):
+        pong = await websocket.ping()
+        await pong
+    
+    async def _link_alive(self, timeout: float):
+        """向当前连接发送ping，timeout 秒内收到pong时返回True"""
+        websocket = self.websocket
+        if websocket is None:
+            return False
+        try:
+            await asyncio.wait_for(self._ping(websocket), timeout)
+            return True
+        except Exception:
+            return False
+    
+    async def _watchdog(self, listen_task):
+        """监视当前连接：变慢时ping当前连接并预先打开备用连接，停滞时结束监听
+        
+        收到pong说明连接正常、只是传感器没有数据（例如手表被摘下）：不切换连接，丢弃备用连接，
+        之后每个停滞判定时间再ping一次，直到收到新消息。只有ping超时才判定停滞。
+        等待pong不超过停滞判定时间，半开连接仍在 stall_timeout 时判定停滞。
+        """
+        idle_since = None
+        probe = None
+        try:
+            while not listen_task.done():
+                stall_timeout = self.stall_timeout()
+                standby_after = stall_timeout * Config.STANDBY_INTERVAL_MULTIPLIER / Config.STALL_INTERVAL_MULTIPLIER
+                last = self.activated_at
+                if self.last_message_at is not None and self.last_message_at > last:
+                    last = self.last_message_at
+                if idle_since is not None:
+                    if last > idle_since:
+                        # 收到了新消息，传感器恢复
+                        idle_since = None
+                        self.idle = False
+                    else:
+                        last = idle_since
+                silence = time.monotonic() - last
+                
+                if probe is not None and probe.done():
+                    alive = probe.result()
+                    probe = None
+                    if alive:
+                        if idle_since is None and silence >= standby_after:
+                            self.stats["idle"] += 1
+                            logger.info(f"已 {silence:.1f} 秒未收到数据，但连接正常（传感器没有数据），继续等待")
+                        idle_since = time.monotonic()
+                        self.idle = True
+                        self._discard_standby()
+                        continue
+                    self.stats["stalls"] += 1
+                    logger.warning(f"已 {silence:.1f} 秒未收到数据且ping无响应，判定连接停滞")
+                    listen_task.cancel()
+                    return
+                
+                if silence >= stall_timeout or (idle_since is None and silence >= standby_after):
+                    if probe is None:
+                        timeout = Config.STALL_PING_TIMEOUT
+                        if idle_since is None:
+                            timeout = min(timeout, stall_timeout - silence)
+                        probe = asyncio.create_task(self._link_alive(timeout))
+                    if idle_since is None:
+                        self._start_standby()
+                    wait = max(0.0, stall_timeout - silence)
+                elif idle_since is not None:
+                    wait = stall_timeout - silence
+                else:
+                    # 数据恢复正常，不再需要备用连接
+                    self._discard_standby()
+                    wait = standby_after - silence
+                # 采样间隔的估计会变化，至少每个采样间隔重新检查一次；ping有结果时立即处理
+                wait = min(wait, stall_timeout / Config.STALL_INTERVAL_MULTIPLIER)
+                if probe is not None:
+                    await asyncio.wait((probe,), timeout=wait or None)
+                else:
+                    await asyncio.sleep(wait)
+        finally:
+            self.idle = False
+            if probe is not None:
+                probe.cancel()
+    
+    def _start_standby(self):
+        if self.standby_task is not None or not Config.STANDBY_ENABLED:
+            return
+        logger.info("连接响应变慢，预先打开备用连接")
+        self.stats["standby_opened"] += 1
+        self.standby_task = asyncio.create_task(self._open())
+    
+    def _discard_standby(self):
+        task = self.standby_task
+        if task is None:
+            return
+        self.standby_task = None
+        self.stats["standby_discarded"] += 1
+        if not task.done():
+            task.cancel()
+        elif not task.cancelled() and task.result() is not None:
+            self._close_later(task.result())
+    
+    async def _take_standby(self):
+        """取出备用连接；还在握手时等待它完成，相当于提前开始的重连"""
+        task = self.standby_task
+        if task is None:
+            return None
+        self.standby_task = None
+        return await task
+    
+    def _close_later(self, websocket):
+        """在后台关闭连接，停滞的连接关闭握手可能要等到超时，不阻塞切换"""
+        task = asyncio.create_task(self._close(websocket))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+    
+    async def _close(self, websocket):
+        try:
+            await websocket.close()
+        except Exception as e:
+            logger.debug("关闭旧连接时出错: %s", e)
+    
+    def _retire_active(self):
+        """当前连接已断开或停滞：记录数据中断开始的时间并在后台关闭它"""
+        if self.gap_started_at is None:
+            self.gap_started_at = self.last_message_at or time.monotonic()
+        if self.websocket is not None:
+            self._close_later(self.websocket)
+            self.websocket = None
+    
+    def _next_delay(self):
+        """去相关抖动退避：min(上限, random(基础, 上次*3))，第一次在 [0, 基础) 内随机
+        
+        每个客户端的等待时间互不相关，服务恢复后不会同时涌入。
+        """
+        base = Config.INITIAL_RECONNECT_DELAY
+        if self.reconnect_attempts <= 1:
+            self.reconnect_delay = base
+            return random.uniform(0, base)
+        self.reconnect_delay = min(
+            Config.MAX_RECONNECT_DELAY,
+            random.uniform(base, self.reconnect_delay * 3)
+        )
+        return self.reconnect_delay
+    
+    async def _serve(self):
+        """监听当前连接，直到连接断开或被判定停滞"""
+        listen_task = asyncio.create_task(self.listen())
+        watchdog = asyncio.create_task(self._watchdog(listen_task))
+        try:
+            await asyncio.wait((listen_task,))
+        finally:
+            watchdog.cancel()
+            listen_task.cancel()
+    
+    async def _sleep(self, delay):
+        """可被stop()或update_token()打断的等待"""
+        try:
+            await asyncio.wait_for(self._stop_event.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+        if self.running:
+            self._stop_event.clear()
+    
+    def update_token(self, token: str):
+        """重新认证后更换token，结束正在进行的重连等待，立即用新token连接"""
+        self.token = token
+        self.reconnect_attempts = 0
+        self.reconnect_delay = Config.INITIAL_RECONNECT_DELAY
+        if self._stop_event:
+            self._stop_event.set()
+    
     async def disconnect(self):
         """断开WebSocket连接"""
         self.running = False
+        if self._stop_event:
+            self._stop_event.set()
+        self._discard_standby()
         if self.websocket:
             try:
                 await self.websocket.close()
@@ -75,48 +331,58 @@ class PulsoidWebSocketClient:
                 logger.error(f"关闭WebSocket时出错: {e}")
     
     async def run_with_reconnect(self):
-        """运行WebSocket客户端，支持自动重连"""
+        """运行WebSocket客户端，断线或停滞时优先切换到备用连接，否则带抖动退避重连"""
         self.running = True
+        self._stop_event = asyncio.Event()
         
         while self.running:
             try:
-                # 尝试连接
-                if await self.connect():
-                    # 连接成功，开始监听
-                    await self.listen()
+                standby = await self._take_standby()
+                if standby is not None:
+                    self._activate(standby)
+                    self.stats["failovers"] += 1
+                    logger.info("已切换到备用连接")
+                    connected = True
+                else:
+                    connected = await self.connect()
+                
+                if connected and self.running:
+                    await self._serve()
                 
                 # 如果到这里说明连接断开了
                 if not self.running:
                     break
+                # 一条消息也没有收到的连接，切换时同样计入重连次数并退避
+                silent = connected and self._awaiting_first
+                self._retire_active()
                 
-                # 检查是否需要重连
-                if self.reconnect_attempts < Config.MAX_RECONNECT_ATTEMPTS:
-                    self.reconnect_attempts += 1
-                    logger.info(f"准备重连 (尝试 {self.reconnect_attempts}/{Config.MAX_RECONNECT_ATTEMPTS})")
-                    logger.info(f"等待 {self.reconnect_delay} 秒后重连...")
-                    
-                    await asyncio.sleep(self.reconnect_delay)
-                    
-                    # 指数退避
-                    self.reconnect_delay = min(
-                        self.reconnect_delay * 2, 
-                        Config.MAX_RECONNECT_DELAY
-                    )
-                else:
+                # 备用连接已打开或正在握手，直接切换
+                if self.standby_task is not None and not silent:
+                    continue
+                
+                if Config.MAX_RECONNECT_ATTEMPTS and self.reconnect_attempts >= Config.MAX_RECONNECT_ATTEMPTS:
                     logger.error("达到最大重连次数，停止重连")
                     break
-                    
+                self.reconnect_attempts += 1
+                delay = self._next_delay()
+                logger.info(f"{delay:.2f} 秒后重连（第 {self.reconnect_attempts} 次）")
+                await self._sleep(delay)
+            
             except KeyboardInterrupt:
                 logger.info("收到中断信号，正在关闭...")
                 break
             except Exception as e:
                 logger.error(f"WebSocket运行时出错: {e}")
                 if self.running:
-                    await asyncio.sleep(self.reconnect_delay)
+                    await self._sleep(self._next_delay())
         
         await self.disconnect()
     
+    async def run(self):
+        """输入源接口（见 sources.py）"""
+        await self.run_with_reconnect()
+    
     async def stop(self):
         """停止WebSocket客户端"""
         logger.info("正在停止WebSocket客户端...")
-        await self.disconnect()
\ No newline at end of file
+        await self.disconnect()